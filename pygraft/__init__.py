@@ -1,4 +1,15 @@
-from .pygraft import create_template, create_json_template, create_yaml_template, generate_schema, generate_kg, generate
+from .pygraft import (
+    create_template,
+    create_json_template,
+    create_yaml_template,
+    generate_schema,
+    generate_kg,
+    extend_kg,
+    iter_triples,
+    get_negative_sampler,
+    generate,
+    sweep,
+)
 
 __all__ = [
     "create_template",
@@ -6,5 +17,9 @@ __all__ = [
     "create_yaml_template",
     "generate_schema",
     "generate_kg",
+    "extend_kg",
+    "iter_triples",
+    "get_negative_sampler",
     "generate",
+    "sweep",
 ]
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pygraft.rdf_writer import get_shard_files
+
+# bump when the layout of cached artifacts changes, to invalidate older entries
+CACHE_VERSION = 2
+
+SCHEMA_PARAMS = [
+    "format",
+    "num_classes",
+    "max_hierarchy_depth",
+    "avg_class_depth",
+    "class_inheritance_ratio",
+    "avg_disjointness",
+    "num_relations",
+    "relation_specificity",
+    "prop_profiled_relations",
+    "profile_side",
+    "prop_symmetric_relations",
+    "prop_inverse_relations",
+    "prop_transitive_relations",
+    "prop_asymmetric_relations",
+    "prop_reflexive_relations",
+    "prop_irreflexive_relations",
+    "prop_functional_relations",
+    "prop_inverse_functional_relations",
+    "prop_subproperties",
+]
+
+KG_PARAMS = [
+    "format",
+    "num_entities",
+    "num_triples",
+    "fast_gen",
+    "oversample",
+    "relation_balance_ratio",
+    "prop_untyped_entities",
+    "avg_depth_specific_class",
+    "multityping",
+    "avg_multityping",
+    "entity_popularity_skew",
+    "time_budget_s",
+    "id_format",
+    "split_ratios",
+    "split_remove_leakage",
+    "num_output_shards",
+    "output_compression",
+    "separate_types_file",
+    "kg_store",
+    "kg_check_reasoner",
+]
+
+METADATA_FILE = "metadata.json"
+
+
+def get_output_file(name, format):
+    """
+    Returns the name of an RDF output file, following the naming used by the SchemaBuilder and InstanceGenerator.
+
+    Args:
+        name (str): The base name of the file, e.g. 'schema' or 'full_graph'.
+        format (str): The output format.
+
+    Returns:
+        str: The file name, e.g. 'schema.rdf'.
+    """
+    return f"{name}.rdf" if format == "xml" else f"{name}.{format}"
+
+
+def get_schema_files(format):
+    """
+    Returns the names of the files produced by the schema generation stage.
+
+    Args:
+        format (str): The output format.
+
+    Returns:
+        list: The file names.
+    """
+    return ["class_info.json", "relation_info.json", get_output_file("schema", format)]
+
+
+def get_kg_files(config):
+    """
+    Returns the names of the files produced by the KG generation stage, including the KG store
+    from which the KG can be extended, if kg_store is set.
+
+    Args:
+        config (dict): The configuration dictionary.
+
+    Returns:
+        list: The file names, relative to the output folder.
+    """
+    kg_store_files = ["manifest.json", "typing_0.pkl", "state_0.pkl", "triples.bin"]
+    if config.get("num_output_shards"):
+        kg_files = get_shard_files(
+            "full_graph", config["format"], config["num_output_shards"], config.get("output_compression")
+        )
+    else:
+        kg_files = [get_output_file("full_graph", config["format"])]
+    files = ["kg_info.json"] + kg_files
+    if config.get("separate_types_file"):
+        files.append("types.nt")
+    if config.get("kg_store"):
+        files += [f"kg_store/{f}" for f in kg_store_files]
+
+    id_format = config.get("id_format") or ("tsv" if config.get("split_ratios") else None)
+    if id_format is not None:
+        splits = ["train", "valid", "test"] if config.get("split_ratios") else ["train"]
+        extension = "txt" if id_format == "tsv" else "npy"
+        files += ["entities.tsv", "relations.tsv"] + [f"{split}.{extension}" for split in splits]
+
+    return files
+
+
+class ArtifactCache:
+    def __init__(self, cache_dir=".pygraft_cache", max_size_mb=1024):
+        """
+        Initializes a content-addressed cache of generated artifacts.
+        Each entry is a folder named after a hash of everything that determines its content.
+
+        Args:
+            self (object): The instance of the ArtifactCache.
+            cache_dir (str): The folder where cache entries are stored.
+            max_size_mb (float): The maximum size of the cache, in megabytes. Least recently used entries are evicted first.
+
+        Returns:
+            None
+        """
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, stage, config, params, extra=None):
+        """
+        Hashes the parameters of a generation stage into a cache key.
+
+        Args:
+            self (object): The instance of the ArtifactCache.
+            stage (str): The name of the generation stage, e.g. 'schema' or 'kg'.
+            config (dict): The configuration dictionary.
+            params (list): The names of the configuration parameters the stage depends on.
+            extra (str): Any additional content the stage depends on.
+
+        Returns:
+            str: The cache key.
+        """
+        content = {
+            "version": CACHE_VERSION,
+            "stage": stage,
+            "seed": config.get("seed"),
+            "params": {p: config.get(p) for p in params},
+            "extra": extra,
+        }
+        return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def schema_key(self, config):
+        """
+        Computes the cache key of a schema.
+
+        Args:
+            self (object): The instance of the ArtifactCache.
+            config (dict): The configuration dictionary.
+
+        Returns:
+            str: The cache key.
+        """
+        return self.make_key("schema", config, SCHEMA_PARAMS)
+
+    def kg_key(self, config, schema_directory):
+        """
+        Computes the cache key of a KG.
+        The key depends on the content of the schema the KG is generated from, so that it also holds
+        for schemas that were not generated through the cache.
+
+        Args:
+            self (object): The instance of the ArtifactCache.
+            config (dict): The configuration dictionary.
+            schema_directory (str): The folder containing the schema files.
+
+        Returns:
+            str: The cache key.
+        """
+        schema_hash = hashlib.sha256()
+        for file_name in get_schema_files(config["format"]):
+            with open(os.path.join(schema_directory, file_name), "rb") as file:
+                for chunk in iter(lambda: file.read(1 << 20), b""):
+                    schema_hash.update(chunk)
+
+        return self.make_key("kg", config, KG_PARAMS, extra=schema_hash.hexdigest())
+
+    def load(self, key, directory):
+        """
+        Copies the artifacts of a cache entry to the given folder.
+
+        Args:
+            self (object): The instance of the ArtifactCache.
+            key (str): The cache key.
+            directory (str): The destination folder.
+
+        Returns:
+            dict: The metadata stored with the entry (e.g. the reasoner verdict), or None on a cache miss.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        metadata_file = os.path.join(entry, METADATA_FILE)
+        if not os.path.isfile(metadata_file):
+            return None
+
+        with open(metadata_file, "r") as file:
+            metadata = json.load(file)
+
+        for file_name in metadata["files"]:
+            os.makedirs(os.path.dirname(os.path.join(directory, file_name)), exist_ok=True)
+            shutil.copyfile(os.path.join(entry, file_name), os.path.join(directory, file_name))
+
+        # the modification time of the entry records its last use, for eviction
+        os.utime(entry)
+        return metadata
+
+    def store(self, key, directory, files, **metadata):
+        """
+        Stores artifacts under the given key, then evicts old entries if the cache is too large.
+
+        Args:
+            self (object): The instance of the ArtifactCache.
+            key (str): The cache key.
+            directory (str): The folder containing the artifacts.
+            files (list): The names of the artifact files.
+            metadata (dict): Additional information to store with the entry, e.g. the reasoner verdict.
+
+        Returns:
+            None
+        """
+        entry = os.path.join(self.cache_dir, key)
+        tmp_entry = f"{entry}.{os.getpid()}.tmp"
+        os.makedirs(tmp_entry, exist_ok=True)
+
+        for file_name in files:
+            os.makedirs(os.path.dirname(os.path.join(tmp_entry, file_name)), exist_ok=True)
+            shutil.copyfile(os.path.join(directory, file_name), os.path.join(tmp_entry, file_name))
+
+        metadata.update({"files": list(files), "created": time.time()})
+        with open(os.path.join(tmp_entry, METADATA_FILE), "w") as file:
+            json.dump(metadata, file, indent=4)
+
+        # entries are written to a temporary folder first, so that concurrent runs never see a partial entry
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.replace(tmp_entry, entry)
+        except OSError:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits within its maximum size.
+
+        Args:
+            self (object): The instance of the ArtifactCache.
+
+        Returns:
+            None
+        """
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir() or entry.name.endswith(".tmp"):
+                continue
+            size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(entry.path) for f in files)
+            entries.append((entry.stat().st_mtime, size, entry.path))
+            total_size += size
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
@@ -0,0 +1,174 @@
+import os
+import pickle
+import shutil
+import numpy as np
+
+STATIC_FILE = "static.pkl"
+STATE_FILE = "state.pkl"
+TRIPLES_FILE = "triples.bin"
+
+# triples are stored as rows of three integers: the numeric parts of "E<h>", "R<r>" and "E<t>"
+TRIPLE_DTYPE = np.dtype("<i4")
+
+
+def encode_triples(triples):
+    """
+    Encodes triples of entity and relation names as a compact array of integers.
+
+    Args:
+        triples (list): The triples, e.g. [('E1', 'R2', 'E3')].
+
+    Returns:
+        np.ndarray: An array of shape (n, 3).
+    """
+    return np.array([(int(h[1:]), int(r[1:]), int(t[1:])) for h, r, t in triples], dtype=TRIPLE_DTYPE).reshape(-1, 3)
+
+
+def decode_triples(array):
+    """
+    Decodes an array of integers back into triples of entity and relation names.
+
+    Args:
+        array (np.ndarray): An array of shape (n, 3).
+
+    Returns:
+        list: The triples, e.g. [('E1', 'R2', 'E3')].
+    """
+    return [(f"E{h}", f"R{r}", f"E{t}") for h, r, t in array.tolist()]
+
+
+def dump_pickle(obj, path):
+    """
+    Pickles an object to a file, atomically: the file is written under a temporary name, then renamed.
+
+    Args:
+        obj (object): The object to pickle.
+        path (str): The path of the file.
+
+    Returns:
+        None
+    """
+    with open(f"{path}.tmp", "wb") as file:
+        pickle.dump(obj, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_pickle(path):
+    """
+    Unpickles an object from a file.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        object: The unpickled object.
+    """
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+class Checkpointer:
+    def __init__(self, directory):
+        """
+        Initializes a checkpointer, which saves the state of a KG generation to a folder.
+        The state is split in three parts:
+            - the static part, which does not change once triples start being generated (e.g. entity typing),
+              written once;
+            - the triples, appended to a binary file as they are generated;
+            - the dynamic part (e.g. the random generator and the unseen entity pools), overwritten atomically
+              at each checkpoint.
+
+        Args:
+            self (object): The instance of the Checkpointer.
+            directory (str): The folder where checkpoint files are written.
+
+        Returns:
+            None
+        """
+        self.directory = directory
+
+    def exists(self):
+        """
+        Checks whether a complete checkpoint is available.
+
+        Args:
+            self (object): The instance of the Checkpointer.
+
+        Returns:
+            bool: True if a checkpoint can be resumed from, False otherwise.
+        """
+        return os.path.isfile(os.path.join(self.directory, STATIC_FILE)) and os.path.isfile(
+            os.path.join(self.directory, STATE_FILE)
+        )
+
+    def start(self, static_state):
+        """
+        Starts a new checkpoint: removes any previous one and saves the static part of the state.
+
+        Args:
+            self (object): The instance of the Checkpointer.
+            static_state (dict): The static part of the state.
+
+        Returns:
+            None
+        """
+        self.clear()
+        os.makedirs(self.directory, exist_ok=True)
+        open(os.path.join(self.directory, TRIPLES_FILE), "wb").close()
+        self.num_triples = 0
+        dump_pickle(static_state, os.path.join(self.directory, STATIC_FILE))
+
+    def save(self, new_triples, dynamic_state):
+        """
+        Appends the triples generated since the last checkpoint, then saves the dynamic part of the state.
+        The state records how many triples it accounts for, so that triples appended after it
+        (e.g. if the process died in between) are ignored when resuming.
+
+        Args:
+            self (object): The instance of the Checkpointer.
+            new_triples (list): The triples generated since the last checkpoint.
+            dynamic_state (dict): The dynamic part of the state.
+
+        Returns:
+            None
+        """
+        with open(os.path.join(self.directory, TRIPLES_FILE), "ab") as file:
+            encode_triples(new_triples).tofile(file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self.num_triples += len(new_triples)
+        dump_pickle({"num_triples": self.num_triples, "state": dynamic_state}, os.path.join(self.directory, STATE_FILE))
+
+    def restore(self):
+        """
+        Loads the last checkpoint.
+
+        Args:
+            self (object): The instance of the Checkpointer.
+
+        Returns:
+            tuple: The static state (dict), the dynamic state (dict) and the triples generated so far (list).
+        """
+        static_state = load_pickle(os.path.join(self.directory, STATIC_FILE))
+        checkpoint = load_pickle(os.path.join(self.directory, STATE_FILE))
+        self.num_triples = checkpoint["num_triples"]
+
+        triples_file = os.path.join(self.directory, TRIPLES_FILE)
+        # drop the triples appended after the last complete checkpoint
+        os.truncate(triples_file, self.num_triples * 3 * TRIPLE_DTYPE.itemsize)
+        triples = decode_triples(np.fromfile(triples_file, dtype=TRIPLE_DTYPE).reshape(-1, 3))
+
+        return static_state, checkpoint["state"], triples
+
+    def clear(self):
+        """
+        Removes the checkpoint folder.
+
+        Args:
+            self (object): The instance of the Checkpointer.
+
+        Returns:
+            None
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,8 +1,9 @@
-import random
 import copy
 import numpy as np
 from collections import defaultdict
 from pygraft.utils_schema import *
+from pygraft.utils import random_choice
+from pygraft.profiler import Profiler
 from tabulate import tabulate
 
 
@@ -28,6 +29,8 @@ class ClassGenerator:
         self.class_inheritance_ratio = kwargs.get("class_inheritance_ratio")
         self.avg_disjointness = kwargs.get("avg_disjointness")
         self.verbose = kwargs.get("verbose")
+        self.rng = kwargs.get("rng") or np.random.default_rng()
+        self.profiler = kwargs.get("profiler") or Profiler()
 
     def init_class_structures(self):
         """
@@ -56,13 +59,16 @@ class ClassGenerator:
         Returns:
             class_info (dict): A dictionary containing various information about the class.
         """
-        self.generate_class_hierarchy()
-        self.generate_class_disjointness()
+        with self.profiler.stage("generate_class_hierarchy", num_items=self.num_classes):
+            self.generate_class_hierarchy()
+        with self.profiler.stage("generate_class_disjointness", num_items=self.num_classes):
+            self.generate_class_disjointness()
 
         if self.verbose:
             self.print_schema()
 
-        class_info = self.assemble_class_info()
+        with self.profiler.stage("assemble_class_info"):
+            class_info = self.assemble_class_info()
 
         return class_info
 
@@ -91,7 +97,7 @@ class ClassGenerator:
             "avg_class_disjointness": round(calculate_class_disjointness(self.disjointwith, len(self.classes)), 2),
             "class2disjoints": self.disjointwith,
             "class2disjoints_symmetric": self.mutual_disjointness,
-            "class2disjoints_extended": {c: list(set(classes)) for c, classes in self.disjointwith_extended.items()},
+            "class2disjoints_extended": self.disjointwith_extended,
             "layer2classes": {int(k): v for k, v in self.layer2classes.items()},
             "class2layer": generate_class2layer(self.layer2classes),
         }
@@ -147,7 +153,7 @@ class ClassGenerator:
             c = unconnected_classes.pop()
 
             if (
-                random.random() < 0.35
+                self.rng.random() < 0.35
                 and len(unconnected_classes) >= stochastic_noise_until
                 and self.max_hierarchy_depth > 3
             ):
@@ -207,8 +213,8 @@ class ClassGenerator:
         focus_layers = [l for l in focus_layers if l not in [0, 1, self.max_hierarchy_depth - 1]]
 
         if focus_layers:
-            layer = random.choice(focus_layers)
-            parent = random.choice(self.layer2classes[layer])
+            layer = random_choice(self.rng, focus_layers)
+            parent = random_choice(self.rng, self.layer2classes[layer])
             self.link_child2parent(c, parent, layer=layer + 1)
         else:
             self.smart_placing(c, current_avg_depth, current_inheritance_ratio)
@@ -228,13 +234,13 @@ class ClassGenerator:
             None
         """
         deep_layers = [key - 1 for key, value in self.layer2classes.items() if value and key >= self.avg_class_depth]
-        layer = random.choice(deep_layers)
+        layer = random_choice(self.rng, deep_layers)
 
         while True:
             current_parents = [c for c in self.layer2classes[layer] if c in self.class2subclasses_direct.keys()]
 
             if current_parents:
-                parent = random.choice(current_parents)
+                parent = random_choice(self.rng, current_parents)
                 self.link_child2parent(c, parent, layer=layer + 1)
                 break
             else:
@@ -262,7 +268,7 @@ class ClassGenerator:
 
             if current_parents:
                 found = True
-                parent = random.choice(current_parents)
+                parent = random_choice(self.rng, current_parents)
                 self.link_child2parent(c, parent, layer=layer + 1)
             else:
                 layer -= 1
@@ -283,14 +289,14 @@ class ClassGenerator:
         """
         found = False
         deep_layers = [key - 1 for key, value in self.layer2classes.items() if value and key >= self.avg_class_depth]
-        layer = random.choice(deep_layers)
+        layer = random_choice(self.rng, deep_layers)
 
         while not found:
             current_leaves = [c for c in self.layer2classes[layer] if c not in self.class2subclasses_direct.keys()]
 
             if current_leaves:
                 found = True
-                parent = random.choice(current_leaves)
+                parent = random_choice(self.rng, current_leaves)
                 self.link_child2parent(c, parent, layer=layer + 1)
             else:
                 layer -= 1
@@ -317,7 +323,7 @@ class ClassGenerator:
 
             if current_leaves:
                 found = True
-                parent = random.choice(current_leaves)
+                parent = random_choice(self.rng, current_leaves)
                 self.link_child2parent(c, parent, layer=layer + 1)
             else:
                 layer -= 1
@@ -334,7 +340,7 @@ class ClassGenerator:
             None
         """
         layer = 1
-        parent = random.choice(self.layer2classes[layer])
+        parent = random_choice(self.rng, self.layer2classes[layer])
         self.link_child2parent(c, parent, layer=layer + 1)
 
     def create_shallow_leaf_root(self, c):
@@ -356,6 +362,9 @@ class ClassGenerator:
         Updates the class mappings and extend the incompatibilities to subclasses.
         Calculates the current class disjointness and stops when average disjointness threshold is reached.
 
+        Disjointness is stored as one integer bitset per class (bit i stands for the class of index i),
+        so that extending a pair to all its descendants boils down to a few bitwise OR operations.
+
         Args:
             self (object): The instance of the ClassGenerator.
 
@@ -366,38 +375,119 @@ class ClassGenerator:
         self.class2superclasses_transitive, self.class2subclasses_transitive = extend_class_mappings(
             self.class2superclass_direct
         )
-        self.disjointwith, self.disjointwith_extended, self.mutual_disjointness = {}, {}, set()
+        self.init_disjointness_masks()
+        self.init_disjointness_candidates()
+        num_disjoint_classes = 0
 
         while current_class_disjointness < self.avg_disjointness:
-            found = False
-            while not found:
-                # pick one class A randomly
-                A = random.choice(self.classes)
-                # pick another class B randomly that is neither a transitive parent nor child of A
-                B = random.choice(self.classes)
-                while (
-                    B == A
-                    or (A in self.class2superclasses_transitive and B in self.class2superclasses_transitive[A])
-                    or (A in self.class2subclasses_transitive and B in self.class2subclasses_transitive[A])
-                ):
-                    B = random.choice(self.classes)
-                found = True
+            # pick one class A randomly among the classes that can be disjoint with another class
+            idx_A = random_choice(self.rng, self.disjointable_classes)
+            # pick another class B randomly that is neither a transitive parent nor child of A
+            idx_B = self.sample_disjoint_candidate(idx_A)
+            self.profiler.count("disjoint_pairs_drawn")
 
             # make A and B incompatible
-            self.disjointwith.setdefault(A, []).append(B)
-            self.disjointwith.setdefault(B, []).append(A)
-            self.disjointwith_extended.setdefault(A, []).append(B)
-            self.disjointwith_extended.setdefault(B, []).append(A)
-            mutual_disj_key = f"{A}-{B}" if int(A[1:]) < int(B[1:]) else f"{B}-{A}"
-            self.mutual_disjointness.add(mutual_disj_key)
+            for idx_1, idx_2 in ((idx_A, idx_B), (idx_B, idx_A)):
+                if not self.disjointwith_masks[idx_1]:
+                    num_disjoint_classes += 1
+                self.disjointwith_masks[idx_1] |= 1 << idx_2
             # iterate through subclasses of A and B, and make them incompatible
-            self.extend_incompatibilities(A, B)
-            # update current class disjointness
-            current_class_disjointness = calculate_class_disjointness(self.disjointwith, self.num_classes)
+            self.extend_incompatibilities(self.classes[idx_A], self.classes[idx_B])
+            # update current class disjointness (same measure as calculate_class_disjointness)
+            current_class_disjointness = num_disjoint_classes / (2 * self.num_classes)
+
+        self.propagate_incompatibilities()
+
+    def init_disjointness_masks(self):
+        """
+        Initializes the bitsets used to generate class disjointness.
+        The subtree mask of a class has the bits of the class itself and of all its transitive subclasses set.
+
+        Args:
+            self (object): The instance of the ClassGenerator.
+
+        Returns:
+            None
+        """
+        self.class2index = {c: i for i, c in enumerate(self.classes)}
+        self.subtree_masks = [1 << i for i in range(len(self.classes))]
+        self.disjointwith_masks = [0] * len(self.classes)
+        self.disjoint_subtree_masks = [0] * len(self.classes)
+
+        # bottom-up: each class passes its subtree on to its direct superclass
+        for layer in sorted(self.layer2classes, reverse=True):
+            for c in self.layer2classes[layer]:
+                parent = self.class2superclass_direct[c]
+                if parent != "owl:Thing":
+                    self.subtree_masks[self.class2index[parent]] |= self.subtree_masks[self.class2index[c]]
+
+    def init_disjointness_candidates(self):
+        """
+        Precomputes, for each class, the set of classes it cannot be disjoint with, i.e. itself
+        and its transitive superclasses and subclasses. Disjoint classes are then drawn from the complement
+        of these sets. Also checks upfront that the requested average disjointness can be reached.
+
+        Args:
+            self (object): The instance of the ClassGenerator.
+
+        Raises:
+            ValueError: If avg_disjointness cannot be reached with the generated class hierarchy.
+
+        Returns:
+            None
+        """
+        num_classes = len(self.classes)
+        self.class2related = []
+        self.class2candidates = {}
+
+        for idx, c in enumerate(self.classes):
+            related = {idx}
+            related.update(
+                self.class2index[sc] for sc in self.class2superclasses_transitive.get(c, []) if sc != "owl:Thing"
+            )
+            related.update(self.class2index[sc] for sc in self.class2subclasses_transitive.get(c, []))
+            self.class2related.append(related)
+            # such classes are few (they are nested in one another), so their candidates can be listed explicitly
+            if 2 * len(related) > num_classes:
+                self.class2candidates[idx] = [i for i in range(num_classes) if i not in related]
+
+        self.disjointable_classes = [i for i, related in enumerate(self.class2related) if len(related) < num_classes]
+        max_disjointness = len(self.disjointable_classes) / (2 * num_classes)
+
+        if max_disjointness < self.avg_disjointness:
+            raise ValueError(
+                f"avg_disjointness cannot be set to {self.avg_disjointness} with this class hierarchy: "
+                f"only {len(self.disjointable_classes)} out of {num_classes} classes can be disjoint with another class, "
+                f"i.e. the average disjointness cannot exceed {round(max_disjointness, 2)}."
+            )
+
+    def sample_disjoint_candidate(self, idx):
+        """
+        Samples a class which is neither the given class nor one of its transitive superclasses or subclasses.
+
+        Args:
+            self (object): The instance of the ClassGenerator.
+            idx (int): The index of the given class.
+
+        Returns:
+            int: The index of the sampled class.
+        """
+        if idx in self.class2candidates:
+            return random_choice(self.rng, self.class2candidates[idx])
+
+        # at least half of the classes are candidates, hence at most two draws on average
+        related = self.class2related[idx]
+        while True:
+            candidate = int(self.rng.integers(len(self.classes)))
+            if candidate not in related:
+                return candidate
+            self.profiler.count("disjoint_candidate_retries")
 
     def extend_incompatibilities(self, class_A, class_B):
         """
         Extends the incompatibilities between two classes.
+        Each class becomes disjoint with the whole subtree of the other one. Subclasses inherit
+        these incompatibilities in `propagate_incompatibilities`.
 
         Args:
             self (object): The instance of the ClassGenerator.
@@ -407,39 +497,41 @@ class ClassGenerator:
         Returns:
             None
         """
-        children_A = self.class2subclasses_transitive.get(class_A, [])
-        children_B = self.class2subclasses_transitive.get(class_B, [])
-
-        # Iterate over the transitive children of class A
-        for child_A in children_A:
-            # Iterate over the transitive children of class B
-            for child_B in children_B:
-                self.disjointwith_extended.setdefault(child_A, []).append(child_B)
-                self.disjointwith_extended.setdefault(child_B, []).append(child_A)
-                mutual_disj_key = (
-                    f"{child_A}-{child_B}" if int(child_A[1:]) < int(child_B[1:]) else f"{child_B}-{child_A}"
-                )
-                self.mutual_disjointness.add(mutual_disj_key)
-
-        # Handle the case where class A has no children
-        if not children_A:
-            for child_B in children_B:
-                self.disjointwith_extended.setdefault(class_A, []).append(child_B)
-                self.disjointwith_extended.setdefault(child_B, []).append(class_A)
-                mutual_disj_key = (
-                    f"{class_A}-{child_B}" if int(class_A[1:]) < int(child_B[1:]) else f"{child_B}-{class_A}"
-                )
-                self.mutual_disjointness.add(mutual_disj_key)
-
-        # Handle the case where class B has no children
-        if not children_B:
-            for child_A in children_A:
-                self.disjointwith_extended.setdefault(child_A, []).append(class_B)
-                self.disjointwith_extended.setdefault(class_B, []).append(child_A)
-                mutual_disj_key = (
-                    f"{class_B}-{child_A}" if int(class_B[1:]) < int(child_A[1:]) else f"{child_A}-{class_B}"
-                )
-                self.mutual_disjointness.add(mutual_disj_key)
+        idx_A, idx_B = self.class2index[class_A], self.class2index[class_B]
+        self.disjoint_subtree_masks[idx_A] |= self.subtree_masks[idx_B]
+        self.disjoint_subtree_masks[idx_B] |= self.subtree_masks[idx_A]
+
+    def propagate_incompatibilities(self):
+        """
+        Propagates incompatibilities top-down through the class hierarchy and decodes the bitsets
+        into the class2disjoints, class2disjoints_extended and class2disjoints_symmetric mappings.
+
+        Args:
+            self (object): The instance of the ClassGenerator.
+
+        Returns:
+            None
+        """
+        extended_masks = [0] * len(self.classes)
+
+        # top-down: each class inherits the incompatibilities of its direct superclass
+        for layer in sorted(self.layer2classes):
+            for c in self.layer2classes[layer]:
+                idx = self.class2index[c]
+                parent = self.class2superclass_direct[c]
+                inherited = extended_masks[self.class2index[parent]] if parent != "owl:Thing" else 0
+                extended_masks[idx] = self.disjoint_subtree_masks[idx] | inherited
+
+        self.disjointwith, self.disjointwith_extended, self.mutual_disjointness = {}, {}, set()
+        direct_indices = masks_to_indices(self.disjointwith_masks, len(self.classes))
+        extended_indices = masks_to_indices(extended_masks, len(self.classes))
+
+        for idx, c in enumerate(self.classes):
+            if direct_indices[idx]:
+                self.disjointwith[c] = [self.classes[i] for i in direct_indices[idx]]
+            if extended_indices[idx]:
+                self.disjointwith_extended[c] = [self.classes[i] for i in extended_indices[idx]]
+                self.mutual_disjointness.update(f"{c}-{self.classes[i]}" for i in extended_indices[idx] if i > idx)
 
     def link_child2parent(self, child, parent, layer):
         self.class2subclasses_direct[parent] = [child]
@@ -1,5 +1,7 @@
 import copy
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from collections import Counter
 import json
@@ -8,7 +10,54 @@ from owlready2 import *
 from rdflib import Graph as RDFGraph, Namespace, URIRef, RDF, OWL
 from tqdm.auto import tqdm
 from pygraft.utils_kg import *
-from pygraft.utils import reasoner
+from pygraft.utils import reasoner, random_choice, save_set_ids_to_text
+from pygraft.rdf_writer import RDFWriter, STREAMING_FORMATS, SCHEMA, SHARD_MANIFEST_FILE, RDF as RDF_NS
+from pygraft.rdf_writer import get_shard_files, write_shard, KGStreamWriter
+from pygraft.schema_constructor import ontology_axioms, class_axioms, relation_axioms
+from pygraft.checkpoint import Checkpointer, encode_triples
+from pygraft.kg_store import KGStore, TripleIndex, CompactTripleSet
+from pygraft.profiler import Profiler
+
+# state which does not change once triples start being generated, saved once per checkpoint
+CHECKPOINT_STATIC_ATTRIBUTES = [
+    "entities",
+    "typed_entities",
+    "is_typed",
+    "layer2classes",
+    "class2layer",
+    "class2disjoints_extended",
+    "classes",
+    "non_disjoint_classes",
+    "ent2layer_specific",
+    "current_avg_depth_specific_class",
+    "ent2classes_specific",
+    "ent2classes_transitive",
+    "badly_typed",
+    "class2entities",
+    "flattened_unseen",
+    "untyped_entities",
+    "num_relations",
+    "rel2capacity",
+    "triples_per_rel",
+    "ent2popularity",
+    "last_oversample",
+]
+
+# state updated while generating triples, overwritten at each checkpoint (the triples themselves are appended)
+CHECKPOINT_DYNAMIC_ATTRIBUTES = [
+    "rng",
+    "class2unseen",
+    "untyped_entities_priority",
+    "relation_weights",
+    "relation_sampler",
+    "sampler_weight",
+    "saturated_weight",
+    "entity_samplers",
+    "rel2count",
+    "rel2failures",
+    "num_proposals",
+    "rejections",
+]
 
 
 class InstanceGenerator:
@@ -37,6 +86,9 @@ class InstanceGenerator:
         self.avg_multityping = kwargs.get("avg_multityping")
         self.multityping = False if self.avg_multityping == 0.0 else self.multityping
         self.kg_check_reasoner = kwargs.get("kg_check_reasoner")
+        self.entity_popularity_skew = kwargs.get("entity_popularity_skew") or 0.0
+        self.time_budget_s = kwargs.get("time_budget_s")
+        self.rng = kwargs.get("rng") or np.random.default_rng()
 
     def init_utils(self, **kwargs):
         """
@@ -50,28 +102,60 @@ class InstanceGenerator:
             None
         """
         self.directory = f"output/{self.schema}/"
+        self.schema_directory = kwargs.get("schema_directory") or self.directory
         self.format = kwargs.get("format")
         self.fast_gen = kwargs.get("fast_gen")
         self.oversample = kwargs.get("oversample")
         self.fast_ratio = get_fast_ratio(self.num_entities) if self.fast_gen else 1
         self.oversample_every = int(self.num_triples / self.fast_ratio)
-        self.load_schema_info()
+        self.split_ratios = kwargs.get("split_ratios")
+        self.split_remove_leakage = kwargs.get("split_remove_leakage", False)
+        # splits are written as dictionary-encoded triples
+        self.id_format = kwargs.get("id_format") or ("tsv" if self.split_ratios else None)
+        self.num_output_shards = kwargs.get("num_output_shards")
+        self.separate_types_file = kwargs.get("separate_types_file", False)
+        self.kg_store = kwargs.get("kg_store", False)
+        # the KG as encoded triples, once checked (see `get_encoded_triples`)
+        self.encoded_kg = None
+        self.profiler = kwargs.get("profiler") or Profiler(trace_memory=kwargs.get("profile_memory", False))
+        # number of rejected candidate triples, by reason
+        self.rejections = Counter()
+        # time spent writing the KG in the background, and waiting for the background writer (see `stream_kg`)
+        self.io_time, self.io_wait_time = None, None
+        # writer of the KG while it is generated, if its format allows it (see `start_kg_stream`)
+        self.kg_stream = None
+        self.output_compression = kwargs.get("output_compression")
+        self.checkpoint_every = kwargs.get("checkpoint_every")
+        self.resume = kwargs.get("resume", False)
+        self.checkpointer = (
+            Checkpointer(f"{self.directory}checkpoint/") if self.checkpoint_every or self.resume else None
+        )
+        # triples of the KG being extended, if any (see `extend_kg`)
+        self.base_kg = None
+        with self.profiler.stage("load_schema_info"):
+            self.load_schema_info(kwargs.get("class_info"), kwargs.get("relation_info"))
 
-    def load_schema_info(self):
+    def load_schema_info(self, class_info=None, relation_info=None):
         """
-        Loads schema information from class_info and relation_info json files.
+        Loads schema information from class_info and relation_info json files, unless it is already provided.
 
         Args:
             self (object): The instance of the InstanceGenerator.
+            class_info (dict): The class information, as saved in class_info.json.
+            relation_info (dict): The relation information, as saved in relation_info.json.
 
         Returns:
             None
         """
+        if class_info is None:
+            with open(f"{self.schema_directory}class_info.json", "r") as file:
+                class_info = json.load(file)
+        if relation_info is None:
+            with open(f"{self.schema_directory}relation_info.json", "r") as file:
+                relation_info = json.load(file)
 
-        with open(f"{self.directory}class_info.json", "r") as file:
-            self.class_info = json.load(file)
-        with open(f"{self.directory}relation_info.json", "r") as file:
-            self.relation_info = json.load(file)
+        self.class_info = class_info
+        self.relation_info = relation_info
 
         if self.avg_depth_specific_class > (self.class_info["hierarchy_depth"] + 1):
             self.avg_depth_specific_class = self.class_info["hierarchy_depth"] - 1
@@ -100,6 +184,8 @@ class InstanceGenerator:
                 "avg_depth_specific_class": self.avg_depth_specific_class,
                 "multityping": self.multityping,
                 "avg_multityping": self.avg_multityping,
+                "entity_popularity_skew": self.entity_popularity_skew,
+                "time_budget_s": self.time_budget_s,
             },
             "statistics": {
                 "num_entities": len(observed_entities),
@@ -108,6 +194,9 @@ class InstanceGenerator:
                 "prop_untyped_entities": round(1 - (len(typed_observed) / len(observed_entities)), 2),
                 "avg_depth_specific_class": self.current_avg_depth_specific_class,
                 "avg_multityping": round(self.calculate_avg_multityping(), 2) if len(self.is_typed) > 0 else 0.0,
+                "prop_target_triples": round(len(self.kg) / self.num_triples, 4),
+                "generation_time_s": round(self.generation_time, 3),
+                "triples_per_s": round(len(self.kg) / self.generation_time, 1) if self.generation_time > 0 else None,
             },
         }
 
@@ -116,64 +205,868 @@ class InstanceGenerator:
 
         return kg_info
 
-    def write_kg(self):
+    def write_kg(self, triples=None, name="full_graph", observed=None, types_name="types"):
         """
-        Writes the KG to a file.
-        Initializes a new RDFGraph object and parses the schema.
-        Each triple in the KG is added to the full graph.
-        The full graph is then serialized to a file and checked for consistency.
+        Writes the KG to a file, along with the schema, once it is generated.
+        N-Triples files are normally written while the KG is generated instead (see `start_kg_stream`),
+        and only written here if the global checks removed triples that were already written.
+        For the "xml", "ttl" and "nt" formats, the schema axioms and the instance triples are streamed to the file
+        (see `stream_kg`). Otherwise, the schema is parsed into an rdflib graph, to which each triple of the KG
+        is added, followed by the types of the entities observed in the KG, and the full graph is then serialized.
+        When writing a shard of an extended KG, only the given triples are written, without the schema.
+        If num_output_shards is set, the KG is written as several files instead (see `write_kg_shards`).
+        If separate_types_file is set, entity types are written to their own N-Triples file instead (see `write_types`).
 
         Args:
             self (object): The instance of the InstanceGenerator.
+            triples (set): The triples to write. If None, the whole KG is written.
+            name (str): The name of the output file, without its extension.
+            observed (np.ndarray): For a shard, the mask of the entities already typed in previous shards.
+            types_name (str): The name of the types file, without its extension.
 
         Returns:
-            str(kg_file): The resulting KG file path, e.g. 'output/template/full_graph.rdf'.
+            str(kg_file): The resulting KG file path, e.g. 'output/template/full_graph.rdf',
+            or the folder of the KG files if it is sharded, e.g. 'output/template/full_graph'.
         """
+        triples = self.kg if triples is None else triples
+        kg_file = f"{self.directory}{name}.rdf" if self.format == "xml" else f"{self.directory}{name}.{self.format}"
+
+        if self.separate_types_file:
+            entity_mask = self.get_entity_mask(self.get_encoded_triples(triples))
+            self.write_types(f"{self.directory}{types_name}.nt", entity_mask, observed)
+
+        if self.num_output_shards and self.format in STREAMING_FORMATS:
+            return self.write_kg_shards(triples, name, observed)
+
+        if self.format in STREAMING_FORMATS:
+            self.stream_kg(kg_file, triples, observed)
+            return kg_file
+
         self.graph = RDFGraph()
-        self.graph.parse(f"{self.directory}schema.rdf") if self.format == "xml" else self.graph.parse(
-            f"{self.directory}schema.{self.format}"
-        )
+        if observed is None:
+            self.graph.parse(f"{self.schema_directory}schema.{self.format}")
 
-        schema = Namespace("http://pygraf.t/")
+        schema = Namespace(SCHEMA)
         self.graph.bind("sc", schema)
 
-        for h, r, t in tqdm(self.kg, desc="Writing instance triples", unit="triples", colour="red"):
+        for h, r, t in tqdm(sorted(triples), desc="Writing instance triples", unit="triples", colour="red"):
             self.graph.add((URIRef(schema + h), URIRef(schema + r), URIRef(schema + t)))
 
-            if h in self.ent2classes_specific:
-                for c in self.ent2classes_specific[h]:
-                    self.graph.add((URIRef(schema + h), RDF.type, URIRef(schema + c)))
+        # each entity observed in the triples is typed once
+        for e in np.flatnonzero(self.get_entity_mask(self.get_encoded_triples(triples))).tolist():
+            for c in self.get_entity_types(f"E{e}", observed):
+                self.graph.add((URIRef(schema + f"E{e}"), RDF.type, URIRef(schema + c)))
 
-            if t in self.ent2classes_specific:
-                for c in self.ent2classes_specific[t]:
-                    self.graph.add((URIRef(schema + t), RDF.type, URIRef(schema + c)))
+        self.graph.serialize(kg_file, format=self.format)
 
-        self.graph.serialize(
-            f"{self.directory}full_graph.rdf", format="xml"
-        ) if self.format == "xml" else self.graph.serialize(
-            f"{self.directory}full_graph.{self.format}", format=self.format
-        )
+        return kg_file
+
+    def get_encoded_triples(self, triples):
+        """
+        Returns the given triples as encoded triples (see `encode_triples`), in the order of their names.
+        The KG itself is only encoded once its checks are done, and its encoding is then shared by the writers,
+        the ID export and the KG store.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            triples (set): The triples.
+
+        Returns:
+            np.ndarray: The encoded triples, of shape (n, 3).
+        """
+        if triples is not self.kg:
+            return encode_triples(sorted(triples))
+
+        if self.encoded_kg is None:
+            self.encoded_kg = encode_triples(sorted(self.kg))
+
+        return self.encoded_kg
+
+    def get_entity_mask(self, encoded):
+        """
+        Returns a bitmap of the entities observed in the given triples, indexed by entity number.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            encoded (np.ndarray): The encoded triples.
+
+        Returns:
+            np.ndarray: The boolean mask.
+        """
+        mask = np.zeros(int(encoded[:, [0, 2]].max()) + 1 if len(encoded) else 0, dtype=bool)
+        mask[encoded[:, 0]] = True
+        mask[encoded[:, 2]] = True
+
+        return mask
+
+    def write_types(self, types_file, entity_mask, observed=None):
+        """
+        Writes the types of the entities observed in the KG to a separate N-Triples file, in a single pass
+        over the entities, so that the KG file only holds the relation triples.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            types_file (str): The path of the types file, e.g. 'output/template/types.nt'.
+            entity_mask (np.ndarray): The bitmap of the entities observed in the KG (see `get_entity_mask`).
+            observed (np.ndarray): For a shard, the mask of the entities already typed in previous shards.
+
+        Returns:
+            None
+        """
+        rdf_type = RDF_NS + "type"
+        if observed is not None:
+            entity_mask = entity_mask.copy()
+            num_observed = min(len(observed), len(entity_mask))
+            entity_mask[:num_observed] &= ~observed[:num_observed]
+
+        with RDFWriter(types_file, "nt") as writer:
+            for e in np.flatnonzero(entity_mask).tolist():
+                classes = self.ent2classes_specific.get(f"E{e}", [])
+                writer.write_subject(f"{SCHEMA}E{e}", [(rdf_type, SCHEMA + c) for c in classes])
+
+    def write_kg_shards(self, triples, name="full_graph", observed=None):
+        """
+        Writes the KG as num_output_shards standalone files (e.g. 'output/template/full_graph/part-00000.nt.gz'),
+        optionally compressed, in parallel by a pool of writer processes.
+        Triples are sorted and cut into contiguous ranges of heads holding about the same number of triples,
+        so that all the triples of a subject are in the same shard; the schema axioms are written to the first shard.
+        A manifest lists the number of triples, the size and the SHA-256 checksum of each shard.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            triples (set): The triples to write.
+            name (str): The name of the output folder.
+            observed (np.ndarray): For a shard, the mask of the entities already typed in previous shards.
+
+        Returns:
+            str: The folder of the KG files, e.g. 'output/template/full_graph'.
+        """
+        kg_folder = f"{self.directory}{name}"
+        os.makedirs(kg_folder, exist_ok=True)
+        shard_files = get_shard_files(name, self.format, self.num_output_shards, self.output_compression)[:-1]
+
+        encoded = self.get_encoded_triples(triples)
+        heads = encoded[:, 0]
+        # triple positions where a new head starts, i.e. the positions where the triples can be cut
+        head_starts = np.append(np.flatnonzero(np.r_[True, heads[1:] != heads[:-1]]), len(encoded))
+        targets = np.linspace(0, len(encoded), self.num_output_shards + 1)[1:-1]
+        bounds = np.r_[0, head_starts[np.searchsorted(head_starts, targets)], len(encoded)]
+
+        # entities only observed as tails are spread evenly across shards
+        tail_entities = np.setdiff1d(encoded[:, 2], heads)
+        tail_entities = sorted(tail_entities.tolist(), key=lambda t: f"E{t}")
+        shard_tail_entities = np.array_split(np.array(tail_entities, dtype=np.int64), self.num_output_shards)
+
+        axioms = self.get_schema_axioms() if observed is None else []
+
+        shard_args = []
+        for i, file in enumerate(shard_files):
+            shard_triples = encoded[bounds[i] : bounds[i + 1]]
+            entities = np.union1d(shard_triples[:, 0], shard_tail_entities[i]).tolist()
+            ent2types = {e: self.get_entity_types(f"E{e}", observed) for e in entities}
+            shard_args.append(
+                (
+                    f"{self.directory}{file}",
+                    self.format,
+                    self.output_compression,
+                    shard_triples,
+                    {e: types for e, types in ent2types.items() if types},
+                    shard_tail_entities[i].tolist(),
+                    axioms if i == 0 else (),
+                )
+            )
+
+        num_workers = min(self.num_output_shards, os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(write_shard, *args) for args in shard_args]
+            shards = [
+                future.result() for future in tqdm(futures, desc="Writing KG shards", unit="shards", colour="red")
+            ]
+
+        self.write_shard_manifest(kg_folder, shards, len(encoded))
+
+        return kg_folder
+
+    def write_shard_manifest(self, kg_folder, shards, num_triples):
+        """
+        Writes the manifest of a sharded KG, listing the number of triples, the size and the checksum of each shard.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            kg_folder (str): The folder of the KG files.
+            shards (list): The information of each shard (see `get_shard_info`).
+            num_triples (int): The number of triples of the KG.
+
+        Returns:
+            None
+        """
+        manifest = {
+            "format": self.format,
+            "compression": self.output_compression,
+            "num_triples": num_triples,
+            "shards": shards,
+        }
+        with open(os.path.join(kg_folder, SHARD_MANIFEST_FILE), "w") as file:
+            json.dump(manifest, file, indent=4)
+
+    def get_schema_axioms(self):
+        """
+        Returns the schema axioms written at the beginning of the KG.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            list: The axioms, as (subject, predicate-objects) pairs.
+        """
+        return [
+            (subject, list(predicate_objects))
+            for axiom_set in (ontology_axioms(), class_axioms(self.class_info), relation_axioms(self.relation_info))
+            for subject, predicate_objects in axiom_set
+        ]
+
+    def start_kg_stream(self, name="full_graph", observed=None):
+        """
+        Starts writing the KG while it is generated, if it is written as N-Triples: each triple is a line of its own,
+        so that triples can be written in the order they are generated, as soon as they have passed the consistency
+        checks (see `check_consistency`). They are handed by batches to a writer process (see `KGStreamWriter`),
+        which formats, compresses and writes them while generation continues.
+        RDF/XML and Turtle files group all the triples of a subject, and are only written once the KG is complete.
+        Each entity is typed with its most specific classes the first time it is observed.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            name (str): The name of the output file, without its extension.
+            observed (np.ndarray): For a shard, the mask of the entities already typed in previous shards.
+
+        Returns:
+            None
+        """
+        if self.format != "nt":
+            return
+
+        if self.num_output_shards:
+            os.makedirs(f"{self.directory}{name}", exist_ok=True)
+            shard_files = get_shard_files(name, self.format, self.num_output_shards, self.output_compression)[:-1]
+            file_paths = [f"{self.directory}{file}" for file in shard_files]
+            compression = self.output_compression
+        else:
+            file_paths = [f"{self.directory}{name}.{self.format}"]
+            compression = None
+
+        ent2types = {}
+        for e in self.ent2classes_specific:
+            types = self.get_entity_types(e, observed)
+            if types:
+                ent2types[int(e[1:])] = types
 
-        kg_file = (
-            f"{self.directory}full_graph.rdf" if self.format == "xml" else f"{self.directory}full_graph.{self.format}"
+        axioms = self.get_schema_axioms() if observed is None else []
+        self.kg_stream = KGStreamWriter(file_paths, self.format, compression, ent2types, axioms)
+
+    def finish_kg_stream(self, record, triples=None, name="full_graph", observed=None, types_name="types"):
+        """
+        Waits for the KG written while it was generated to be complete (see `start_kg_stream`), and records how much
+        wall time writing it during generation saved: the CPU time the writer process spent writing, i.e. the estimated
+        time of a serial write, minus the time the generation spent handing it triples and waiting for it to finish.
+        This assumes the writer process runs on a CPU of its own: on a single CPU, it slows generation down instead.
+        If the global checks removed triples that were already written, the KG is written again instead.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            record (dict): The profile record of the write.
+            triples (set): The triples of the KG. If None, the whole KG.
+            name (str): The name of the output file, without its extension.
+            observed (np.ndarray): For a shard, the mask of the entities already typed in previous shards.
+            types_name (str): The name of the types file, without its extension.
+
+        Returns:
+            str: The resulting KG file path, or the folder of the KG files if it is sharded.
+        """
+        stream, self.kg_stream = self.kg_stream, None
+        result = stream.close()
+        triples = self.kg if triples is None else triples
+
+        if sum(file["num_triples"] for file in result["files"]) != len(triples):
+            print("\nThe global checks removed triples that were already written: writing the KG again.\n")
+            return self.write_kg(triples, name, observed, types_name)
+
+        if self.separate_types_file:
+            entity_mask = self.get_entity_mask(self.get_encoded_triples(triples))
+            self.write_types(f"{self.directory}{types_name}.nt", entity_mask, observed)
+
+        if self.num_output_shards:
+            kg_file = f"{self.directory}{name}"
+            self.write_shard_manifest(kg_file, result["files"], len(triples))
+        else:
+            kg_file = f"{self.directory}{name}.{self.format}"
+
+        write_time = stream.send_time + stream.drain_time
+        record["serial_write_time_s"] = round(result["write_time"], 4)
+        record["write_wall_time_s"] = round(write_time, 4)
+        record["overlap_saved_time_s"] = round(result["write_time"] - write_time, 4)
+        record["queue_wait_time_s"] = round(stream.wait_time, 4)
+        print(
+            f"\nKG written during generation: {result['write_time']:.2f}s of writing, "
+            f"{result['write_time'] - write_time:.2f}s of wall time saved by overlapping it with generation.\n"
         )
+
         return kg_file
 
+    def abort_kg_stream(self):
+        """
+        Stops writing the KG while it is generated, if it was, e.g. when the generation is interrupted.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            None
+        """
+        if self.kg_stream is not None:
+            self.kg_stream.abort()
+            self.kg_stream = None
+
+    def write_id_files(self):
+        """
+        Writes the KG as dictionary-encoded triples, as expected by KG embedding frameworks:
+        entities.tsv and relations.tsv map contiguous ids to entity and relation names, and the triples
+        are written as ids to train.txt (one tab-separated triple per line) or to train.npy (an (N, 3) array).
+        Entities observed in the KG are numbered in the order of their names, and relations in the order of the schema.
+        If split ratios are set, the triples are split into train, valid and test files (see `split_triples`).
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            None
+        """
+        triples = self.get_encoded_triples(self.kg)
+        entity_numbers, entity_ids = np.unique(triples[:, [0, 2]], return_inverse=True)
+        entity_ids = entity_ids.reshape(-1, 2)
+
+        relations = self.relation_info["relations"]
+        relation_numbers = np.array([int(r[1:]) for r in relations], dtype=np.int64)
+        relation_ids = np.zeros(relation_numbers.max() + 1, dtype=np.int64)
+        relation_ids[relation_numbers] = np.arange(len(relations))
+
+        dtype = np.int32 if max(len(entity_numbers), len(relations)) < np.iinfo(np.int32).max else np.int64
+        ids = np.stack([entity_ids[:, 0], relation_ids[triples[:, 1]], entity_ids[:, 1]], axis=1).astype(dtype)
+        ids = ids[np.lexsort((ids[:, 2], ids[:, 1], ids[:, 0]))]
+
+        with open(f"{self.directory}entities.tsv", "w", buffering=1 << 20) as file:
+            file.writelines(f"{i}\tE{n}\n" for i, n in enumerate(entity_numbers.tolist()))
+        with open(f"{self.directory}relations.tsv", "w", buffering=1 << 20) as file:
+            file.writelines(f"{i}\t{r}\n" for i, r in enumerate(relations))
+
+        if self.split_ratios:
+            splits = self.split_triples(ids)
+            split2ids = {name: ids[splits == i] for i, name in enumerate(["train", "valid", "test"])}
+            print(f"\nSplit sizes: {', '.join(f'{name}={len(split)}' for name, split in split2ids.items())}.\n")
+        else:
+            split2ids = {"train": ids}
+
+        for name, split_ids in split2ids.items():
+            if self.id_format == "npy":
+                np.save(f"{self.directory}{name}.npy", split_ids)
+            else:
+                # rows are converted to Python integers by chunks, to bound memory
+                chunk_size = 1 << 16
+                rows = (
+                    row
+                    for start in range(0, len(split_ids), chunk_size)
+                    for row in split_ids[start : start + chunk_size].tolist()
+                )
+                save_set_ids_to_text(rows, f"{self.directory}{name}.txt")
+
+    def split_triples(self, ids):
+        """
+        Assigns dictionary-encoded triples to the train (0), valid (1) and test (2) splits, in a single vectorized pass.
+        Each triple is assigned by hashing it, so that its split does not depend on the other triples.
+        The first triple (in id order) of each entity and relation is then forced into the train split,
+        so that every entity and relation of the valid and test splits also appears in the train split.
+        If split_remove_leakage is set, a triple is hashed through a canonical form shared with its symmetric
+        or inverse counterpart, (t, r, h) or (t, r', h), so that both always end up in the same split.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            ids (np.ndarray): The dictionary-encoded triples, of shape (n, 3), sorted.
+
+        Returns:
+            np.ndarray: The split of each triple.
+        """
+        canonical = ids.astype(np.int64)
+
+        if self.split_remove_leakage:
+            rel2id = {r: i for i, r in enumerate(self.relation_info["relations"])}
+            # the canonical relation of a pair of inverse relations is the one with the smallest id
+            canonical_relation = np.arange(len(rel2id))
+            for r, inv_r in self.relation_info["rel2inverse"].items():
+                canonical_relation[rel2id[r]] = min(rel2id[r], rel2id[inv_r])
+            is_symmetric = np.zeros(len(rel2id), dtype=bool)
+            is_symmetric[[rel2id[r] for r in self.relation_info["symmetric_relations"]]] = True
+
+            swap = canonical_relation[canonical[:, 1]] != canonical[:, 1]
+            canonical[:, 1] = canonical_relation[canonical[:, 1]]
+            heads = np.where(swap, canonical[:, 2], canonical[:, 0])
+            tails = np.where(swap, canonical[:, 0], canonical[:, 2])
+            # symmetric triples are oriented from the smallest entity id to the largest
+            symmetric = is_symmetric[canonical[:, 1]]
+            canonical[:, 0] = np.where(symmetric, np.minimum(heads, tails), heads)
+            canonical[:, 2] = np.where(symmetric, np.maximum(heads, tails), tails)
+
+        # the salt is drawn from a copy of the random generator, so that splitting does not change its state
+        hashes = hash_triples(canonical, salt=int(copy.deepcopy(self.rng).integers(1 << 62)))
+        # the 53 most significant bits of the hash give a uniform value in [0, 1)
+        values = (hashes >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+        train_ratio, valid_ratio, _ = self.split_ratios
+        splits = np.where(values < train_ratio, 0, np.where(values < train_ratio + valid_ratio, 1, 2))
+
+        forced = np.zeros(len(ids), dtype=bool)
+        _, first_entities = np.unique(ids[:, [0, 2]].ravel(), return_index=True)
+        forced[first_entities // 2] = True
+        _, first_relations = np.unique(ids[:, 1], return_index=True)
+        forced[first_relations] = True
+
+        if self.split_remove_leakage:
+            # counterparts of a forced triple are forced too
+            _, groups = np.unique(hashes, return_inverse=True)
+            forced_groups = np.zeros(groups.max() + 1 if len(groups) else 0, dtype=bool)
+            forced_groups[groups[forced]] = True
+            forced = forced_groups[groups]
+
+        splits[forced] = 0
+
+        return splits
+
+    def get_entity_types(self, e, observed=None):
+        """
+        Returns the most specific classes an entity must be typed with in the file being written,
+        i.e. none if types are written to a separate file.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            e (str): The entity.
+            observed (np.ndarray): The mask of the entities already typed in previous shards, if any.
+
+        Returns:
+            list: The classes.
+        """
+        if self.separate_types_file:
+            return []
+
+        if observed is not None:
+            index = int(e[1:])
+            if index < len(observed) and observed[index]:
+                return []
+
+        return self.ent2classes_specific.get(e, [])
+
+    def stream_kg(self, kg_file, triples, observed=None):
+        """
+        Streams the schema axioms and the KG to a file, subject by subject.
+        Triples are written in sorted order, so that the file only depends on the content of the KG.
+        Encoding, compression and disk writes run in a background thread while the text is being formatted,
+        and the time spent on them is recorded (see `BackgroundWriter`).
+        Each entity is typed with its most specific classes, once.
+        When writing a shard of an extended KG, the schema axioms are not written.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            kg_file (str): The path of the output file.
+            triples (set): The triples to write.
+            observed (np.ndarray): For a shard, the mask of the entities already typed in previous shards.
+
+        Returns:
+            None
+        """
+        rdf_type = RDF_NS + "type"
+        start = time.perf_counter()
+
+        with RDFWriter(kg_file, self.format) as writer:
+            if observed is None:
+                for axioms in (ontology_axioms(), class_axioms(self.class_info), relation_axioms(self.relation_info)):
+                    for subject, predicate_objects in axioms:
+                        writer.write_subject(subject, predicate_objects)
+
+            heads = set()
+            sorted_kg = tqdm(sorted(triples), desc="Writing instance triples", unit="triples", colour="red")
+
+            for h, h_triples in itertools.groupby(sorted_kg, key=lambda triple: triple[0]):
+                heads.add(h)
+                predicate_objects = [(rdf_type, SCHEMA + c) for c in self.get_entity_types(h, observed)]
+                predicate_objects.extend((SCHEMA + r, SCHEMA + t) for _, r, t in h_triples)
+                writer.write_subject(SCHEMA + h, predicate_objects)
+
+            # entities only observed as tails
+            for t in sorted({t for _, _, t in triples} - heads):
+                writer.write_subject(SCHEMA + t, [(rdf_type, SCHEMA + c) for c in self.get_entity_types(t, observed)])
+
+        self.write_time = time.perf_counter() - start
+        self.io_time = writer.file.io_time
+        self.io_wait_time = writer.file.blocked_time
+        print(
+            f"\nKG written in {self.write_time:.2f}s, with {self.io_time:.2f}s of background encoding and disk I/O "
+            f"({self.io_wait_time:.2f}s spent waiting for it).\n"
+        )
 
     def generate_kg(self):
-        self.pipeline()
-        self.check_asymmetries()
-        self.check_inverseof_asymmetry()
-        self.check_dom_range()
-        self.procedure_1()
-        self.procedure_2()
+        """
+        Generates the KG, checks it and writes it.
+        N-Triples output is written while the KG is generated (see `start_kg_stream`), other formats once it is checked.
+        If a time budget is set, triples are generated until either num_triples or the time budget is reached,
+        whichever comes first; the KG then goes through the same checks and is written as usual.
+        If resume is set and a checkpoint exists, triple generation restarts from the last checkpoint instead.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            None
+        """
+        self.start_time = time.perf_counter()
+        self.deadline = None if self.time_budget_s is None else self.start_time + self.time_budget_s
+
+        try:
+            if self.resume and self.checkpointer.exists():
+                with self.profiler.stage("resume_from_checkpoint"):
+                    self.resume_from_checkpoint()
+                with self.profiler.stage("generate_triples") as record:
+                    num_restored = len(self.kg)
+                    self.run_triple_generation()
+                    record["num_items"] = len(self.kg) - num_restored
+            else:
+                if self.resume:
+                    print("\nNo checkpoint found: starting the KG generation from scratch.\n")
+                self.pipeline()
+
+            self.run_checks()
+        except BaseException:
+            self.abort_kg_stream()
+            raise
+
+        self.generation_time = time.perf_counter() - self.start_time
         kg_info = self.assemble_instance_info()
-        kg_file = self.write_kg()
-        if self.kg_check_reasoner:
-            reasoner(resource_file=kg_file, resource="KG")
+        kg_file = self.profiled_write_kg()
+        if self.id_format is not None:
+            with self.profiler.stage("write_id_files", num_items=len(self.kg)):
+                self.write_id_files()
+        if self.kg_store:
+            with self.profiler.stage("save_kg_store", num_items=len(self.kg)):
+                self.save_kg_store(kg_file)
+        if self.checkpointer is not None:
+            self.checkpointer.clear()
+        if self.kg_check_reasoner and (self.num_output_shards or self.separate_types_file):
+            self.consistent = None
+            print(f"\nSkipping the KG check step with reasoning: the reasoner needs the whole KG in a single file.\n")
+        elif self.kg_check_reasoner:
+            with self.profiler.stage("reasoner"):
+                self.consistent = reasoner(resource_file=kg_file, resource="KG")
         else:
+            self.consistent = None
             print(f"\nSkipping the KG check step with reasoning.\n")
 
+        self.save_profile("kg")
+
+    def run_checks(self):
+        """
+        Runs the checks removing the triples that break the schema constraints once all triples are generated,
+        profiling the number of triples each of them removes.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            None
+        """
+        for check in (
+            self.check_asymmetries,
+            self.check_inverseof_asymmetry,
+            self.check_dom_range,
+            self.procedure_1,
+            self.procedure_2,
+        ):
+            with self.profiler.stage(check.__name__, num_items=len(self.kg)) as record:
+                num_triples = len(self.kg)
+                check()
+                record["num_removed"] = num_triples - len(self.kg)
+        self.encoded_kg = None
+
+    def profiled_write_kg(self, **kwargs):
+        """
+        Writes the KG (see `write_kg`), or completes the write started during generation (see `finish_kg_stream`),
+        profiling the write along with the time spent writing in the background.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            kwargs (dict): The arguments of `write_kg`.
+
+        Returns:
+            str: The resulting KG file path.
+        """
+        with self.profiler.stage("write_kg", num_items=len(kwargs.get("triples") or self.kg)) as record:
+            if self.kg_stream is not None:
+                return self.finish_kg_stream(record, **kwargs)
+
+            kg_file = self.write_kg(**kwargs)
+            if self.io_time is not None:
+                record["background_io_time_s"] = round(self.io_time, 4)
+                record["background_io_wait_time_s"] = round(self.io_wait_time, 4)
+
+        return kg_file
+
+    def save_profile(self, section):
+        """
+        Saves the profile of the generation to profile.json, next to kg_info.json,
+        along with the number of proposed triples and of rejected ones by reason.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            section (str): The section of the profile, e.g. 'kg'.
+
+        Returns:
+            None
+        """
+        self.profiler.count("proposed_triples", self.num_proposals)
+        for reason, count in self.rejections.items():
+            self.profiler.count(f"rejected_{reason}", count)
+        self.profiler.save(self.directory, section)
+
+    def save_kg_store(self, kg_file):
+        """
+        Saves the KG and the typing of its entities to a binary store, so that it can later be extended
+        (see `extend_kg`) without being regenerated, or used to sample negative triples.
+        The store is only saved if kg_store is set, as typing every entity makes it costly for large KGs.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            kg_file (str): The path of the KG file.
+
+        Returns:
+            None
+        """
+        store = KGStore(f"{self.directory}kg_store/")
+        store.clear()
+        store.append_shard(
+            self.get_store_typing(self.entities),
+            self.get_encoded_triples(self.kg),
+            self.get_store_state(),
+            file=os.path.basename(kg_file),
+        )
+
+    def get_store_typing(self, entities):
+        """
+        Returns the typing of the given entities, as saved in the KG store.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            entities (list): The entities.
+
+        Returns:
+            dict: The entities, the typed ones, their classes and their popularity.
+        """
+        typed_entities = [e for e in entities if e in self.is_typed]
+
+        return {
+            "entities": entities,
+            "typed_entities": typed_entities,
+            "ent2classes_specific": {e: self.ent2classes_specific[e] for e in typed_entities},
+            "ent2classes_transitive": {e: self.ent2classes_transitive[e] for e in typed_entities},
+            "ent2popularity": None if self.ent2popularity is None else {e: self.ent2popularity[e] for e in entities},
+        }
+
+    def get_store_state(self):
+        """
+        Returns the state needed to extend the KG, as saved in the KG store.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            dict: The random generator and the pools of entities not observed in any triple yet.
+        """
+        return {
+            "rng": self.rng,
+            "class2unseen": self.class2unseen,
+            "untyped_entities_priority": self.untyped_entities_priority,
+        }
+
+    def extend_kg(self):
+        """
+        Extends the KG previously generated in the output folder, up to num_entities entities and num_triples
+        triples, under the same schema constraints. The existing KG is loaded from its binary store:
+        only the new entities are typed, and only the new triples are generated, checked and written,
+        to a new shard file (e.g. 'output/template/full_graph_1.rdf') which only types the entities
+        that were not observed in the previous shards.
+        Random draws continue the sequence of the previous generation, so that extensions are reproducible.
+        The KG must have been generated with kg_store set.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Raises:
+            ValueError: If there is no KG store to extend in the output folder.
+
+        Returns:
+            None
+        """
+        store = KGStore(f"{self.directory}kg_store/")
+        if not store.exists():
+            raise ValueError(
+                f"No KG store in {self.directory}: the KG can only be extended if it was generated "
+                f"with kg_store set to true."
+            )
+
+        self.start_time = time.perf_counter()
+        self.deadline = None if self.time_budget_s is None else self.start_time + self.time_budget_s
+        # checkpoints only cover the generation of a KG from scratch
+        self.checkpointer = None
+
+        with self.profiler.stage("load_kg_store") as record:
+            typings, triples, state, shards = store.load()
+            self.base_kg = TripleIndex(triples)
+            record["num_items"] = len(self.base_kg)
+        self.rng = state["rng"]
+
+        num_base_entities = sum(len(typing["entities"]) for typing in typings)
+        num_new_entities = max(self.num_entities - num_base_entities, 0)
+        num_new_triples = max(self.num_triples - len(self.base_kg), 0)
+
+        if num_new_entities == 0 and num_new_triples == 0:
+            print(
+                f"\nNothing to extend: the KG already has {num_base_entities} entities "
+                f"and {len(self.base_kg)} triples.\n"
+            )
+            return
+
+        with self.profiler.stage("type_entities", num_items=num_new_entities):
+            self.init_class_info()
+            self.type_new_entities(num_base_entities, num_new_entities)
+        new_entities = self.entities
+
+        # merge the typing of existing entities with the one of new entities
+        self.entities = [e for typing in typings for e in typing["entities"]] + self.entities
+        self.typed_entities = [e for typing in typings for e in typing["typed_entities"]] + self.typed_entities
+        self.is_typed = set(self.typed_entities)
+        for typing in typings:
+            self.ent2classes_specific.update(typing["ent2classes_specific"])
+            self.ent2classes_transitive.update(typing["ent2classes_transitive"])
+
+        self.num_triples = num_new_triples
+        self.init_triple_generation()
+
+        # entities observed in the existing KG are no longer prioritized
+        is_new = set(new_entities)
+        self.class2unseen = {
+            c: state["class2unseen"].get(c, []) + [e for e in entities if e in is_new]
+            for c, entities in self.class2entities.items()
+        }
+        self.untyped_entities_priority = state["untyped_entities_priority"] + [
+            e for e in new_entities if e not in self.is_typed
+        ]
+        if self.ent2popularity is not None:
+            for typing in typings:
+                self.ent2popularity.update(typing["ent2popularity"] or {})
+        new_typing = self.get_store_typing(new_entities)
+
+        shard_index = len(shards)
+        observed = self.base_kg.get_observed_entities()
+        try:
+            self.start_kg_stream(f"full_graph_{shard_index}", observed)
+            with self.profiler.stage("generate_triples") as record:
+                self.run_triple_generation()
+                record["num_items"] = len(self.kg)
+            self.run_checks()
+        except BaseException:
+            self.abort_kg_stream()
+            raise
+        self.generation_time = time.perf_counter() - self.start_time
+
+        kg_file = self.profiled_write_kg(
+            name=f"full_graph_{shard_index}", observed=observed, types_name=f"types_{shard_index}"
+        )
+        with self.profiler.stage("save_kg_store", num_items=len(self.kg)):
+            store.append_shard(
+                new_typing, self.get_encoded_triples(self.kg), self.get_store_state(), file=os.path.basename(kg_file)
+            )
+        self.save_extension_info(shard_index, kg_file, num_new_entities)
+        self.save_profile(f"kg_extension_{shard_index}")
+        self.consistent = None
+
+        print(f"\nKG extended with {num_new_entities} entities and {len(self.kg)} triples, written to {kg_file}.\n")
+
+    def type_new_entities(self, num_base_entities, num_new_entities):
+        """
+        Creates and types the entities added by an extension of the KG, following the same procedure as
+        for the entities of the initial KG.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            num_base_entities (int): The number of entities of the KG being extended.
+            num_new_entities (int): The number of entities to add.
+
+        Returns:
+            None
+        """
+        self.entities = [f"E{i}" for i in range(num_base_entities + 1, num_base_entities + num_new_entities + 1)]
+        entities = list(self.entities)
+        self.rng.shuffle(entities)
+
+        threshold = int(len(self.entities) * (1 - self.prop_untyped_entities))
+        self.typed_entities = entities[:threshold]
+        self.is_typed = set(self.typed_entities)
+        self.ent2classes_specific = {}
+
+        if self.typed_entities:
+            self.assign_most_specific()
+
+            if self.multityping:
+                self.complete_typing()
+
+        self.extend_superclasses()
+        self.check_multityping()
+
+    def save_extension_info(self, shard_index, kg_file, num_new_entities):
+        """
+        Records an extension of the KG in kg_info.json.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            shard_index (int): The index of the shard written by the extension.
+            kg_file (str): The path of the shard file.
+            num_new_entities (int): The number of entities added by the extension.
+
+        Returns:
+            None
+        """
+        with open(self.directory + "kg_info.json", "r") as file:
+            kg_info = json.load(file)
+
+        kg_info.setdefault("extensions", []).append(
+            {
+                "shard": shard_index,
+                "file": os.path.basename(kg_file),
+                "num_new_entities": num_new_entities,
+                "num_new_triples": len(self.kg),
+                "num_triples": len(self.base_kg) + len(self.kg),
+                "generation_time_s": round(self.generation_time, 3),
+            }
+        )
+
+        with open(self.directory + "kg_info.json", "w") as file:
+            json.dump(kg_info, file, indent=4)
+
+    def is_time_over(self):
+        """
+        Checks whether the time budget of the generation is exhausted.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            bool: True if a time budget is set and exhausted, False otherwise.
+        """
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
     def assign_most_specific(self):
         """
         Assigns the most specific class to each entity based on the hierarchy depth.
@@ -186,14 +1079,14 @@ class InstanceGenerator:
         """
         hierarchy_depth = self.class_info["hierarchy_depth"] + 1
         shape = hierarchy_depth / (hierarchy_depth - 1)
-        numbers = np.random.power(shape, size=len(self.is_typed))
+        numbers = self.rng.power(shape, size=len(self.typed_entities))
         scaled_numbers = numbers / np.mean(numbers) * self.avg_depth_specific_class
         generated_numbers = np.clip(np.floor(scaled_numbers), 1, hierarchy_depth).astype(int)
         generated_numbers = [n if n < hierarchy_depth else hierarchy_depth for n in generated_numbers]
         self.current_avg_depth_specific_class = np.mean(generated_numbers)
-        self.ent2layer_specific = {e: l for e, l in zip(self.is_typed, generated_numbers)}
+        self.ent2layer_specific = {e: l for e, l in zip(self.typed_entities, generated_numbers)}
         self.ent2classes_specific = {
-            e: [np.random.choice(self.layer2classes[l])] for e, l in self.ent2layer_specific.items()
+            e: [random_choice(self.rng, self.layer2classes[l])] for e, l in self.ent2layer_specific.items()
         }
 
     def complete_typing(self):
@@ -207,24 +1100,23 @@ class InstanceGenerator:
             None
         """
         current_avg_multityping = 1.0
-        entity_list = list(copy.deepcopy(self.is_typed))
+        entity_list = list(self.typed_entities)
         cpt = 0
 
         if entity_list:
             while current_avg_multityping < self.avg_multityping and cpt < 10:
-                ent = np.random.choice(entity_list)
+                ent = random_choice(self.rng, entity_list)
                 most_specific_classes = self.ent2classes_specific[ent]
                 specific_layer = self.ent2layer_specific[ent]
                 compatible_classes = self.find_compatible_classes(most_specific_classes)
-                specific_compatible_classes = list(
-                    set(self.layer2classes[specific_layer]).intersection(set(compatible_classes))
-                )
                 specific_compatible_classes = [
-                    cl for cl in specific_compatible_classes if cl not in most_specific_classes
+                    cl
+                    for cl in self.layer2classes[specific_layer]
+                    if cl in compatible_classes and cl not in most_specific_classes
                 ]
 
                 if specific_compatible_classes:
-                    other_specific_class = np.random.choice(specific_compatible_classes)
+                    other_specific_class = random_choice(self.rng, specific_compatible_classes)
                     self.ent2classes_specific[ent].append(other_specific_class)
                     current_avg_multityping = self.calculate_avg_multityping()
                     cpt = 0
@@ -249,10 +1141,11 @@ class InstanceGenerator:
                 if set(disj).intersection(classes):
                     self.badly_typed[e] = {"all_classes": classes, "problematic_class": c, "disjointwith": disj}
                     # keep only one of its most_specific classes and update its transitive classes
-                    self.ent2classes_specific[e] = np.random.choice(self.ent2classes_specific[e])
-                    self.ent2classes_transitive[e] = self.class_info["transitive_class2superclasses"][
-                        self.ent2classes_specific[e]
-                    ]
+                    specific_class = random_choice(self.rng, self.ent2classes_specific[e])
+                    self.ent2classes_specific[e] = [specific_class]
+                    self.ent2classes_transitive[e] = [specific_class] + self.class_info[
+                        "transitive_class2superclasses"
+                    ][specific_class]
                     break
 
     def extend_superclasses(self):
@@ -265,15 +1158,14 @@ class InstanceGenerator:
         Returns:
             None
         """
-        self.ent2classes_transitive = {k: set(v) for k, v in self.ent2classes_specific.items()}
+        self.ent2classes_transitive = {}
 
         for ent, specific_cls in self.ent2classes_specific.items():
-            # Extend superclasses recursively
+            # Extend superclasses recursively (deduplicated in a reproducible order)
+            transitive_cls = list(specific_cls)
             for specific_cl in specific_cls:
-                self.ent2classes_transitive[ent].update(
-                    set(self.class_info["transitive_class2superclasses"][specific_cl])
-                )
-            self.ent2classes_transitive[ent] = list(set(self.ent2classes_transitive[ent]))
+                transitive_cls.extend(self.class_info["transitive_class2superclasses"][specific_cl])
+            self.ent2classes_transitive[ent] = list(dict.fromkeys(transitive_cls))
 
     def calculate_avg_multityping(self):
         """
@@ -313,6 +1205,22 @@ class InstanceGenerator:
 
         return set(compatible_classes) - set(class_list) | set(self.non_disjoint_classes)
 
+    def init_class_info(self):
+        """
+        Initializes the class information needed to type entities.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            None
+        """
+        self.layer2classes = {int(k): v for k, v in self.class_info["layer2classes"].items()}
+        self.class2layer = self.class_info["class2layer"]
+        self.class2disjoints_extended = self.class_info["class2disjoints_extended"]
+        self.classes = self.class_info["classes"]
+        self.non_disjoint_classes = set(self.classes) - set(self.class2disjoints_extended.keys())
+
     def pipeline(self):
         """
         Pipeline for processing entities and subsequently generating triples.
@@ -323,24 +1231,36 @@ class InstanceGenerator:
         Return:
             None
         """
+        with self.profiler.stage("type_entities", num_items=self.num_entities):
+            self.type_entities()
+        with self.profiler.stage("generate_triples") as record:
+            self.generate_triples()
+            record["num_items"] = len(self.kg)
 
+    def type_entities(self):
+        """
+        Creates the entities and assigns classes to the typed ones.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Return:
+            None
+        """
         if self.fast_gen:
             self.entities = [f"E{i}" for i in range(1, int(self.num_entities / self.fast_ratio) + 1)]
         else:
             self.entities = [f"E{i}" for i in range(1, self.num_entities + 1)]
 
         entities = copy.deepcopy(self.entities)
-        np.random.shuffle(entities)
+        self.rng.shuffle(entities)
 
         threshold = int(len(self.entities) * (1 - self.prop_untyped_entities))
-        self.is_typed = set(entities[:threshold])
-
-        self.layer2classes = {int(k): v for k, v in self.class_info["layer2classes"].items()}
-        self.class2layer = self.class_info["class2layer"]
-        self.class2disjoints_extended = self.class_info["class2disjoints_extended"]
-        self.classes = self.class_info["classes"]
-        self.non_disjoint_classes = set(self.classes) - set(self.class2disjoints_extended.keys())
+        # typed entities are also kept as a list, since iterating over a set of strings is not reproducible
+        self.typed_entities = entities[:threshold]
+        self.is_typed = set(self.typed_entities)
 
+        self.init_class_info()
         self.assign_most_specific()
 
         if self.multityping:
@@ -358,9 +1278,10 @@ class InstanceGenerator:
                 entity_batch = [
                     f"E{i}" for i in range(last_ent + 1, last_ent + int(self.num_entities / self.fast_ratio) + 1)
                 ]
-                np.random.shuffle(entity_batch)
+                self.rng.shuffle(entity_batch)
                 threshold = int(len(entity_batch) * (1 - self.prop_untyped_entities))
                 typed_entities = entity_batch[:threshold]
+                self.typed_entities.extend(typed_entities)
                 self.is_typed.update(typed_entities)
                 ent2classes_specific = {e: ent2classes_spec_values[idx] for idx, e in enumerate(typed_entities)}
                 ent2classes_transitive = {e: ent2classes_trans_values[idx] for idx, e in enumerate(typed_entities)}
@@ -369,11 +1290,11 @@ class InstanceGenerator:
                 self.entities += entity_batch
                 last_ent = len(self.entities)
 
-        self.generate_triples()
-
     def distribute_relations(self):
         """
         Distributes relations based on the number of triples and the relation balance ratio.
+        The triple budget of each relation is then capped by the number of triples it can actually hold
+        (see `get_relation_capacity`), and the remaining budget is redistributed among the other relations.
 
         Args:
             self (object): The instance of the InstanceGenerator.
@@ -382,22 +1303,188 @@ class InstanceGenerator:
             None
 
         """
-        self.num_relations = len(self.relation_info["relations"])
+        relations = self.relation_info["relations"]
+        self.num_relations = len(relations)
 
         if self.num_triples < self.num_relations:
-            self.triples_per_rel = {f"R{i}": 1 if i < self.num_triples else 0 for i in range(self.num_relations)}
+            relation_weights = [1.0 if i < self.num_triples else 0.0 for i in range(self.num_relations)]
         else:
             mean = int(self.num_triples / len(self.relation_info["relations"]))
             spread_coeff = (1 - self.relation_balance_ratio) * mean
-            self.relation_weights = generate_random_numbers(mean, spread_coeff, self.num_relations)
-            self.triples_per_rel = {
-                r: np.ceil(tpr)
-                for r, tpr in zip(self.relation_info["relations"], np.array(self.relation_weights) * self.num_triples)
-            }
+            relation_weights = generate_random_numbers(mean, spread_coeff, self.num_relations, rng=self.rng)
+
+        self.rel2capacity = {r: self.get_relation_capacity(r) for r in relations}
+        budgets = redistribute_budgets(
+            np.array(relation_weights) * self.num_triples,
+            [max(self.rel2capacity[r] - self.rel2count[r], 0) for r in relations],
+        )
+        self.triples_per_rel = {r: np.ceil(tpr) for r, tpr in zip(relations, budgets)}
+        self.relation_weights = budgets
+        self.update_relation_sampler()
+
+    def update_relation_sampler(self):
+        """
+        (Re)builds the sampler drawing relations according to their weights.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Return:
+            None
+        """
+        total_weight = np.sum(self.relation_weights)
+        self.relation_sampler = AliasSampler(self.relation_weights, self.rng) if total_weight > 0 else None
+        # total weight of the relations in the sampler, and of those saturated since it was built
+        self.sampler_weight, self.saturated_weight = total_weight, 0.0
+
+    def saturate_relation(self, r):
+        """
+        Removes a relation from the sampling weights, once it cannot hold any further triple.
+        The sampler is only rebuilt once saturated relations make up half of its weight:
+        until then, drawn relations with a zero weight are skipped (see `produce_triples`),
+        so that saturating many relations does not cost one rebuild each.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            r (str): The relation.
+
+        Return:
+            None
+        """
+        index = self.rel2index[r]
+        self.saturated_weight += self.relation_weights[index]
+        self.relation_weights[index] = 0.0
+
+        if 2 * self.saturated_weight >= self.sampler_weight:
+            self.update_relation_sampler()
+
+    def get_candidate_entities(self, c):
+        """
+        Returns the entities which can be drawn as heads (resp. tails) of a relation with domain (resp. range) c.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            c (str): The domain or range class, or None for an unconstrained side.
+
+        Return:
+            list: The candidate entities.
+        """
+        if c:
+            return self.class2entities.get(c, [])
+
+        return self.untyped_entities if self.untyped_entities else self.flattened_unseen
+
+    def count_shared_entities(self, r2dom, r2range):
+        """
+        Returns a lower bound of the number of entities that can be drawn both as heads and tails of a relation.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            r2dom (str): The domain of the relation, or None.
+            r2range (str): The range of the relation, or None.
+
+        Return:
+            int: The number of shared entities (lower bound).
+        """
+        if r2dom == r2range:
+            return len(self.get_candidate_entities(r2dom))
+
+        if not r2dom or not r2range:
+            # an unconstrained side draws from all typed entities, unless there are untyped entities
+            return 0 if self.untyped_entities else len(self.get_candidate_entities(r2dom or r2range))
+
+        # entities are typed with the superclasses of their classes
+        if r2dom in self.class_info["transitive_class2superclasses"][r2range]:
+            return len(self.get_candidate_entities(r2range))
+        if r2range in self.class_info["transitive_class2superclasses"][r2dom]:
+            return len(self.get_candidate_entities(r2dom))
+
+        return 0
+
+    def get_relation_capacity(self, r):
+        """
+        Computes an upper bound of the number of distinct triples a relation can hold,
+        given the sizes of its domain and range and its properties.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            r (str): The relation.
+
+        Return:
+            int: The capacity of the relation.
+        """
+        r2dom, r2range = self.rel2dom.get(r), self.rel2range.get(r)
+        num_heads = len(self.get_candidate_entities(r2dom))
+        num_tails = len(self.get_candidate_entities(r2range))
+        capacity = num_heads * num_tails
+
+        if r in self.irreflexive_relations or r in self.asymmetric_relations:
+            shared = self.count_shared_entities(r2dom, r2range)
+            # no (e, r, e) triple
+            capacity -= shared
+            if r in self.asymmetric_relations:
+                # at most one of (e1, r, e2) and (e2, r, e1)
+                capacity -= shared * (shared - 1) // 2
+
+        if r in self.functional_relations:
+            capacity = min(capacity, num_heads)
+
+        if r in self.inversefunctional_relations:
+            capacity = min(capacity, num_tails)
+
+        return max(capacity, 0)
 
     def generate_triples(self):
         """
         Generates triples for the KG.
+        Relations are removed from the sampling weights as soon as they reach their capacity,
+        or when new triples repeatedly fail to be generated for them.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            None
+        """
+        self.init_triple_generation()
+        self.start_kg_stream()
+
+        if self.checkpointer is not None:
+            self.checkpointer.start({name: getattr(self, name) for name in CHECKPOINT_STATIC_ATTRIBUTES})
+            self.save_checkpoint()
+
+        self.run_triple_generation()
+
+    def init_relation_constraints(self):
+        """
+        Initializes the relation information needed to generate triples and check their consistency.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            None
+        """
+        self.rel2dom = self.relation_info["rel2dom"]
+        self.rel2range = self.relation_info["rel2range"]
+        self.rel2patterns = self.relation_info["rel2patterns"]
+        self.rel2index = {r: i for i, r in enumerate(self.relation_info["relations"])}
+        self.irreflexive_relations = set(self.relation_info["irreflexive_relations"])
+        self.asymmetric_relations = set(self.relation_info["asymmetric_relations"])
+        self.functional_relations = set(self.relation_info["functional_relations"])
+        self.inversefunctional_relations = set(self.relation_info["inversefunctional_relations"])
+        self.rel2inverse = self.relation_info["rel2inverse"]
+        # heads of functional relations and tails of inverse functional relations observed so far
+        if self.base_kg is None:
+            self.rel2heads = {r: set() for r in self.functional_relations}
+            self.rel2tails = {r: set() for r in self.inversefunctional_relations}
+        else:
+            self.rel2heads = {r: self.base_kg.get_heads(r) for r in self.functional_relations}
+            self.rel2tails = {r: self.base_kg.get_tails(r) for r in self.inversefunctional_relations}
+
+    def init_triple_generation(self):
+        """
+        Initializes the entity pools, the relation budgets and the counters used to generate triples.
 
         Args:
             self (object): The instance of the InstanceGenerator.
@@ -412,32 +1499,261 @@ class InstanceGenerator:
                 self.class2entities.setdefault(c, []).append(e)
 
         self.class2unseen = copy.deepcopy(self.class2entities)
-        self.flattened_unseen = list(set((itertools.chain(*self.class2entities.values()))))
+        self.flattened_unseen = list(dict.fromkeys(itertools.chain(*self.class2entities.values())))
 
-        self.untyped_entities_priority = set(self.entities) - set(self.is_typed)
-        self.untyped_entities = list(copy.deepcopy(self.untyped_entities_priority))
-
-        self.rel2dom = self.relation_info["rel2dom"]
-        self.rel2range = self.relation_info["rel2range"]
-        self.rel2patterns = self.relation_info["rel2patterns"]
+        self.untyped_entities_priority = [e for e in self.entities if e not in self.is_typed]
+        self.untyped_entities = list(self.untyped_entities_priority)
 
+        self.init_relation_constraints()
         self.kg = set()
+        self.pending_triples = []
+
+        # triples of the KG being extended count towards the capacity of their relation
+        base_counts = {} if self.base_kg is None else self.base_kg.count_relations()
+        self.rel2count = {r: base_counts.get(r, 0) for r in self.relation_info["relations"]}
+        self.rel2failures = dict.fromkeys(self.relation_info["relations"], 0)
+        self.num_proposals = 0
 
         self.distribute_relations()
+        self.init_entity_popularity()
 
         self.last_oversample = 0
 
-        attempt = 0
-        while len(self.kg) < self.num_triples:
-            rnd_r = np.random.choice(self.relation_info["relations"], p=self.relation_weights)
+    def run_triple_generation(self):
+        """
+        Generates triples until num_triples is reached, every relation is saturated or the time budget is over.
+        If checkpoints are enabled, one is saved every checkpoint_every new triples.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            None
+        """
+        for triple in self.produce_triples():
+            if self.checkpointer is not None:
+                self.pending_triples.append(triple)
+                if self.checkpoint_every and len(self.pending_triples) >= self.checkpoint_every:
+                    self.save_checkpoint()
+
+    def produce_triples(self):
+        """
+        Draws relations and generates triples for them until num_triples is reached,
+        every relation is saturated or the time budget is over.
+        Each triple is checked against the constraints of the schema before being added to the KG.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Yields:
+            tuple: Each triple (h, r, t) added to the KG.
+        """
+        while len(self.kg) < self.num_triples and self.relation_sampler is not None:
+            index = self.relation_sampler.sample()
+            if self.relation_weights[index] == 0:
+                # saturated since the sampler was built
+                continue
+
+            self.num_proposals += 1
+            # the clock is only read every 1024 proposals
+            if self.num_proposals % 1024 == 0 and self.is_time_over():
+                print(f"\nTime budget of {self.time_budget_s}s reached: {len(self.kg)} triples generated.\n")
+                return
+
+            rnd_r = self.relation_info["relations"][index]
             new_triple = self.generate_one_triple(rnd_r)
-            attempt += 1
-            is_consistent = self.check_consistency(new_triple) if None not in new_triple else False
-            if is_consistent:
-                self.kg.add(new_triple)
-                attempt = 0
-            if attempt > 10:
-                break
+
+            if None in new_triple:
+                self.rejections["no_candidate_entity"] += 1
+            elif new_triple in self.kg or (self.base_kg is not None and new_triple in self.base_kg):
+                self.rejections["duplicate"] += 1
+            elif self.check_consistency(new_triple):
+                self.add_triple(new_triple)
+                self.rel2count[rnd_r] += 1
+                self.rel2failures[rnd_r] = 0
+                if self.rel2count[rnd_r] >= self.rel2capacity[rnd_r]:
+                    self.saturate_relation(rnd_r)
+
+                yield new_triple
+                continue
+
+            self.rel2failures[rnd_r] += 1
+            if self.rel2failures[rnd_r] > self.get_max_failures(rnd_r):
+                self.saturate_relation(rnd_r)
+
+        if len(self.kg) < self.num_triples:
+            print(
+                f"\nNumber of triples reduced to {len(self.kg)}: "
+                "every relation is saturated given the entities and the schema constraints.\n"
+            )
+
+    def get_max_failures(self, r):
+        """
+        Returns the number of consecutive failures after which a relation is considered saturated.
+        Duplicates and constraint violations become more frequent as a relation fills up,
+        so the threshold grows with the proportion of its capacity already used: 10 attempts for an empty relation,
+        100 once it is 90% full, up to 1000.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            r (str): The relation.
+
+        Returns:
+            float: The maximum number of consecutive failures.
+        """
+        capacity = self.rel2capacity[r]
+
+        return min(10 * capacity / max(capacity - self.rel2count[r], 1), 1000)
+
+    def iter_triples(self, batch_size=10000):
+        """
+        Generates the KG lazily, yielding batches of triples as soon as they are generated.
+        Nothing is written to disk: triples are checked against the schema constraints as they are generated
+        (see `check_consistency`), instead of through the passes run by `generate_kg` once all triples exist.
+        The triples generated so far are only kept as integer keys (see `CompactTripleSet`), to reject duplicates,
+        so that memory still grows with the number of triples, but by about 8 bytes per triple.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            batch_size (int): The number of triples per batch. The last batch may be smaller.
+
+        Yields:
+            np.ndarray: Batches of triples of shape (batch_size, 3), where each triple (Eh, Rr, Et) is encoded
+            as the integers (h, r, t).
+        """
+        self.start_time = time.perf_counter()
+        self.deadline = None if self.time_budget_s is None else self.start_time + self.time_budget_s
+        # checkpoints only cover generate_kg
+        self.checkpointer = None
+
+        self.type_entities()
+        self.init_triple_generation()
+        self.kg = CompactTripleSet(
+            max(int(e[1:]) for e in self.entities) + 1,
+            max(int(r[1:]) for r in self.relation_info["relations"]) + 1,
+        )
+
+        batch = []
+        for triple in self.produce_triples():
+            batch.append(triple)
+            if len(batch) == batch_size:
+                yield encode_triples(batch)
+                batch = []
+
+        if batch:
+            yield encode_triples(batch)
+
+    def save_checkpoint(self):
+        """
+        Saves a checkpoint: the triples generated since the previous checkpoint are appended,
+        and the state needed to continue the generation exactly where it stopped is overwritten.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            None
+        """
+        state = {name: getattr(self, name) for name in CHECKPOINT_DYNAMIC_ATTRIBUTES}
+        state["elapsed_time"] = time.perf_counter() - self.start_time
+        self.checkpointer.save(self.pending_triples, state)
+        self.pending_triples = []
+
+    def resume_from_checkpoint(self):
+        """
+        Restores the state of the triple generation from the last checkpoint.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            None
+        """
+        static_state, dynamic_state, triples = self.checkpointer.restore()
+        elapsed_time = dynamic_state.pop("elapsed_time")
+
+        # samplers are pickled together with the random generator, so they keep sharing it once restored
+        for name, value in itertools.chain(static_state.items(), dynamic_state.items()):
+            setattr(self, name, value)
+
+        # the time spent before the checkpoint counts towards the time budget
+        self.start_time -= elapsed_time
+        if self.deadline is not None:
+            self.deadline -= elapsed_time
+
+        self.init_relation_constraints()
+        self.kg = set()
+        self.pending_triples = []
+        # restored triples are written again, in the order they were generated
+        self.start_kg_stream()
+        for triple in triples:
+            self.add_triple(triple)
+
+        print(f"\nResuming the KG generation from a checkpoint of {len(self.kg)} triples.\n")
+
+    def add_triple(self, triple):
+        """
+        Adds a triple to the KG, updates the indexes used to check its consistency, and hands it to the writer
+        of the KG if it is written while generated (see `start_kg_stream`).
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            triple (tuple): A tuple representing a consistent triple (h, r, t).
+
+        Returns:
+            None
+        """
+        h, r, t = triple
+        self.kg.add(triple)
+        if self.kg_stream is not None:
+            self.kg_stream.add(triple)
+
+        if r in self.rel2heads:
+            self.rel2heads[r].add(h)
+        if r in self.rel2tails:
+            self.rel2tails[r].add(t)
+
+    def init_entity_popularity(self):
+        """
+        Initializes the popularity of entities, which governs how often they are drawn as heads or tails.
+        With entity_popularity_skew > 0, popularity follows a Zipf-like law over randomly ranked entities,
+        which yields skewed degree distributions. Otherwise, all entities are equally popular.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+
+        Returns:
+            None
+        """
+        if self.entity_popularity_skew > 0:
+            weights = zipf_weights(len(self.entities), self.entity_popularity_skew, rng=self.rng)
+            self.ent2popularity = dict(zip(self.entities, weights.tolist()))
+        else:
+            self.ent2popularity = None
+
+        self.entity_samplers = {}
+
+    def sample_entity(self, pool_name, entities):
+        """
+        Draws an entity from a pool of entities according to their popularity, in constant time.
+        An alias sampler is built the first time a pool is drawn from: pools must not change afterwards.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            pool_name (str): The name of the pool, e.g. a class.
+            entities (list): The entities of the pool.
+
+        Returns:
+            str: The drawn entity.
+        """
+        sampler = self.entity_samplers.get(pool_name)
+
+        if sampler is None:
+            weights = None if self.ent2popularity is None else [self.ent2popularity[e] for e in entities]
+            sampler = AliasSampler(weights, self.rng, size=len(entities))
+            self.entity_samplers[pool_name] = sampler
+
+        return entities[sampler.sample()]
 
     def generate_one_triple(self, r):
         """
@@ -456,7 +1772,7 @@ class InstanceGenerator:
 
         if r2dom:
             h_list = self.class2unseen.get(r2dom, [])
-            h = np.random.choice(h_list) if h_list else None
+            h = random_choice(self.rng, h_list) if h_list else None
             if h is not None and self.check_class_disjointness(h, r2dom):
                 token_dom = True
             else:
@@ -466,7 +1782,7 @@ class InstanceGenerator:
                     attempt += 1
                     class2entities = self.class2entities.get(r2dom, [])
                     if class2entities:
-                        h = np.random.choice(class2entities)
+                        h = self.sample_entity(r2dom, class2entities)
                         is_valid = self.check_class_disjointness(h, r2dom)
                     else:
                         h = None
@@ -478,14 +1794,14 @@ class InstanceGenerator:
                 h = (
                     self.untyped_entities_priority.pop()
                     if self.untyped_entities_priority
-                    else np.random.choice(self.untyped_entities)
+                    else self.sample_entity("untyped", self.untyped_entities)
                 )
             else:
-                h = np.random.choice(self.flattened_unseen)
+                h = self.sample_entity("all", self.flattened_unseen)
 
         if r2range:
             t_list = self.class2unseen.get(r2range, [])
-            t = np.random.choice(t_list) if t_list else None
+            t = random_choice(self.rng, t_list) if t_list else None
             if t is not None and self.check_class_disjointness(t, r2range) and h is not None:
                 self.class2unseen[r2range].remove(t)
                 if token_dom and h in self.class2unseen[r2dom]:
@@ -497,7 +1813,7 @@ class InstanceGenerator:
                     attempt += 1
                     class2entities = self.class2entities.get(r2range, [])
                     if class2entities:
-                        t = np.random.choice(class2entities)
+                        t = self.sample_entity(r2range, class2entities)
                         is_valid = self.check_class_disjointness(t, r2range)
                     else:
                         t = None
@@ -509,16 +1825,17 @@ class InstanceGenerator:
                 t = (
                     self.untyped_entities_priority.pop()
                     if self.untyped_entities_priority
-                    else np.random.choice(self.untyped_entities)
+                    else self.sample_entity("untyped", self.untyped_entities)
                 )
             else:
-                t = np.random.choice(self.flattened_unseen)
+                t = self.sample_entity("all", self.flattened_unseen)
 
         return (h, r, t)
 
     def check_consistency(self, triple):
         """
         Checks the consistency of a triple before adding it to the KG.
+        Rejected triples are counted by reason, for profiling.
 
         Args:
             self (object): The instance of the InstanceGenerator.
@@ -530,23 +1847,59 @@ class InstanceGenerator:
         h, r, t = triple[0], triple[1], triple[2]
 
         if not h or not t:
+            self.rejections["no_candidate_entity"] += 1
             return False
 
-        if r in self.relation_info["irreflexive_relations"] and h == t:
+        if r in self.irreflexive_relations and h == t:
+            self.rejections["irreflexive"] += 1
             return False
 
-        if r in self.relation_info["asymmetric_relations"]:
-            if h == t or (t, r, h) in self.kg:
+        if r in self.asymmetric_relations:
+            if h == t or (t, r, h) in self.kg or (self.base_kg is not None and (t, r, h) in self.base_kg):
+                self.rejections["asymmetric"] += 1
                 return False
 
-        if r in self.relation_info["functional_relations"]:
-            selected_triples = [triple for triple in self.kg if triple[:2] == (h, r)]
-            if selected_triples:
-                return False
+        if r in self.functional_relations and h in self.rel2heads[r]:
+            self.rejections["functional"] += 1
+            return False
+
+        if r in self.inversefunctional_relations and t in self.rel2tails[r]:
+            self.rejections["inverse_functional"] += 1
+            return False
+
+        if r in self.rel2inverse and not self.check_inverse_consistency(triple):
+            return False
+
+        return True
+
+    def check_inverse_consistency(self, triple):
+        """
+        Checks that a triple (h, r, t) is consistent with the inverse r' of its relation, i.e. that:
+            - h is not disjoint with the range of r', nor t with its domain, since (t, r', h) is entailed;
+            - (h, r', t) is not in the KG if r or r' is asymmetric, since (t, r, h) would then be entailed.
+
+        Args:
+            self (object): The instance of the InstanceGenerator.
+            triple (tuple): A tuple representing a candidate triple (h, r, t).
+
+        Returns:
+            bool: True if the triple is consistent, False otherwise.
+        """
+        h, r, t = triple
+        inv_r = self.rel2inverse[r]
+
+        inv_range, inv_dom = self.rel2range.get(inv_r), self.rel2dom.get(inv_r)
+        if inv_range and h in self.ent2classes_transitive and not self.check_class_disjointness(h, inv_range):
+            self.rejections["inverse_disjointness"] += 1
+            return False
+        if inv_dom and t in self.ent2classes_transitive and not self.check_class_disjointness(t, inv_dom):
+            self.rejections["inverse_disjointness"] += 1
+            return False
 
-        if r in self.relation_info["inversefunctional_relations"]:
-            selected_triples = [triple for triple in self.kg if triple[1:] == (r, t)]
-            if selected_triples:
+        if r in self.asymmetric_relations or inv_r in self.asymmetric_relations:
+            inv_triple = (h, inv_r, t)
+            if inv_triple in self.kg or (self.base_kg is not None and inv_triple in self.base_kg):
+                self.rejections["inverse_asymmetric"] += 1
                 return False
 
         return True
@@ -691,9 +2044,9 @@ class InstanceGenerator:
 
         while len(self.kg) < self.num_triples:
             attempt += 1
-            chosen_id = np.random.randint(1, len(id2pattern) + 1)
+            chosen_id = int(self.rng.integers(1, len(id2pattern) + 1))
             pattern2rels = id2pattern[chosen_id]
-            np.random.shuffle(pattern2rels)
+            self.rng.shuffle(pattern2rels)
 
             if pattern2rels:
                 rel = pattern2rels[0]
@@ -720,7 +2073,7 @@ class InstanceGenerator:
                     if len(self.kg) >= self.num_triples:
                         return
 
-            if attempt > 1000:
+            if attempt > 1000 or self.is_time_over():
                 break
 
     def procedure_1(self):
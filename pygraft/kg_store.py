@@ -0,0 +1,287 @@
+import os
+import json
+import shutil
+import numpy as np
+from pygraft.checkpoint import TRIPLE_DTYPE, dump_pickle, load_pickle
+
+MANIFEST_FILE = "manifest.json"
+TRIPLES_FILE = "triples.bin"
+
+
+class TripleIndex:
+    def __init__(self, triples):
+        """
+        Initializes a read-only index of encoded triples, supporting membership tests in O(log n)
+        without materializing the triples as Python objects.
+
+        Args:
+            self (object): The instance of the TripleIndex.
+            triples (np.ndarray): The encoded triples, of shape (n, 3).
+
+        Returns:
+            None
+        """
+        self.triples = triples
+        self.num_slots = int(triples[:, [0, 2]].max()) + 1 if len(triples) else 1
+        # one sorted array of (head, tail) keys per relation
+        self.rel2keys = {}
+        keys = triples[:, 0].astype(np.int64) * self.num_slots + triples[:, 2]
+        for r in np.unique(triples[:, 1]).tolist():
+            self.rel2keys[f"R{r}"] = np.sort(keys[triples[:, 1] == r])
+
+    def __len__(self):
+        return len(self.triples)
+
+    def __contains__(self, triple):
+        h, r, t = triple
+        keys = self.rel2keys.get(r)
+        if keys is None:
+            return False
+
+        h, t = int(h[1:]), int(t[1:])
+        if h >= self.num_slots or t >= self.num_slots:
+            return False
+
+        key = h * self.num_slots + t
+        position = np.searchsorted(keys, key)
+        return position < len(keys) and keys[position] == key
+
+    def get_heads(self, r):
+        """
+        Returns the entities observed as heads of a relation.
+
+        Args:
+            self (object): The instance of the TripleIndex.
+            r (str): The relation.
+
+        Returns:
+            set: The head entities.
+        """
+        return {f"E{h}" for h in np.unique(self.rel2keys.get(r, np.empty(0, dtype=np.int64)) // self.num_slots)}
+
+    def get_tails(self, r):
+        """
+        Returns the entities observed as tails of a relation.
+
+        Args:
+            self (object): The instance of the TripleIndex.
+            r (str): The relation.
+
+        Returns:
+            set: The tail entities.
+        """
+        return {f"E{t}" for t in np.unique(self.rel2keys.get(r, np.empty(0, dtype=np.int64)) % self.num_slots)}
+
+    def count_relations(self):
+        """
+        Counts the triples of each relation.
+
+        Args:
+            self (object): The instance of the TripleIndex.
+
+        Returns:
+            dict: The number of triples of each relation.
+        """
+        return {r: len(keys) for r, keys in self.rel2keys.items()}
+
+    def get_observed_entities(self):
+        """
+        Returns a boolean mask of the entities observed in the triples, indexed by entity number.
+
+        Args:
+            self (object): The instance of the TripleIndex.
+
+        Returns:
+            np.ndarray: The mask.
+        """
+        observed = np.zeros(self.num_slots, dtype=bool)
+        observed[self.triples[:, 0]] = True
+        observed[self.triples[:, 2]] = True
+
+        return observed
+
+
+class CompactTripleSet:
+    def __init__(self, num_entity_slots, num_relation_slots, min_buffer_size=1 << 16):
+        """
+        Initializes a growable set of triples, which stores each triple as a single integer key instead of
+        a tuple of names: (h * num_relation_slots + r) * num_entity_slots + t.
+        New keys go to a small Python set, merged into a sorted np.int64 array once it grows past 1/16 of
+        the array, so that the set takes about 8 bytes per triple plus the buffer.
+
+        Args:
+            self (object): The instance of the CompactTripleSet.
+            num_entity_slots (int): One more than the largest entity number.
+            num_relation_slots (int): One more than the largest relation number.
+            min_buffer_size (int): The minimum number of keys buffered before a merge.
+
+        Returns:
+            None
+        """
+        self.num_entity_slots = num_entity_slots
+        self.num_relation_slots = num_relation_slots
+        self.min_buffer_size = min_buffer_size
+        self.keys = np.empty(0, dtype=np.int64)
+        self.buffer = set()
+        # keys too large for np.int64 are kept in the buffer
+        self.mergeable = num_entity_slots**2 * num_relation_slots <= np.iinfo(np.int64).max
+
+    def get_key(self, triple):
+        h, r, t = triple
+        return (int(h[1:]) * self.num_relation_slots + int(r[1:])) * self.num_entity_slots + int(t[1:])
+
+    def __len__(self):
+        return len(self.keys) + len(self.buffer)
+
+    def __contains__(self, triple):
+        return self.has_key(self.get_key(triple))
+
+    def has_key(self, key):
+        if key in self.buffer:
+            return True
+        if len(self.keys) == 0:
+            return False
+
+        position = np.searchsorted(self.keys, key)
+        return position < len(self.keys) and self.keys[position] == key
+
+    def add(self, triple):
+        """
+        Adds a triple to the set.
+
+        Args:
+            self (object): The instance of the CompactTripleSet.
+            triple (tuple): The triple (h, r, t).
+
+        Returns:
+            None
+        """
+        key = self.get_key(triple)
+        if self.has_key(key):
+            return
+
+        self.buffer.add(key)
+        if self.mergeable and len(self.buffer) >= max(self.min_buffer_size, len(self.keys) // 16):
+            new_keys = np.sort(np.fromiter(self.buffer, dtype=np.int64, count=len(self.buffer)))
+            self.keys = np.insert(self.keys, np.searchsorted(self.keys, new_keys), new_keys)
+            self.buffer = set()
+
+
+class KGStore:
+    def __init__(self, directory):
+        """
+        Initializes a binary store of a generated KG, from which it can be extended without regenerating it.
+        The store is made of shards, one per generation or extension, and is append-only:
+            - the triples of all shards are appended to a single binary file;
+            - the typing of the entities created by each shard is pickled to its own file;
+            - the state needed to extend the KG further (e.g. the random generator) is saved with the last shard.
+
+        Args:
+            self (object): The instance of the KGStore.
+            directory (str): The folder of the store.
+
+        Returns:
+            None
+        """
+        self.directory = directory
+
+    def exists(self):
+        """
+        Checks whether the store contains a KG.
+
+        Args:
+            self (object): The instance of the KGStore.
+
+        Returns:
+            bool: True if the store contains at least one shard, False otherwise.
+        """
+        return os.path.isfile(os.path.join(self.directory, MANIFEST_FILE))
+
+    def clear(self):
+        """
+        Removes the store.
+
+        Args:
+            self (object): The instance of the KGStore.
+
+        Returns:
+            None
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def load_manifest(self):
+        """
+        Loads the list of shards.
+
+        Args:
+            self (object): The instance of the KGStore.
+
+        Returns:
+            list: The information of each shard.
+        """
+        if not self.exists():
+            return []
+
+        with open(os.path.join(self.directory, MANIFEST_FILE), "r") as file:
+            return json.load(file)["shards"]
+
+    def append_shard(self, typing, triples, state, **info):
+        """
+        Appends a shard to the store. The manifest is written last, so that an interrupted write
+        leaves the store as it was before (triples beyond the manifest count are ignored).
+
+        Args:
+            self (object): The instance of the KGStore.
+            typing (dict): The entities created by the shard and their typing.
+            triples (np.ndarray): The encoded triples of the shard (see `encode_triples`).
+            state (dict): The state needed to extend the KG further.
+            info (dict): Additional information about the shard, e.g. its RDF file.
+
+        Returns:
+            None
+        """
+        shards = self.load_manifest()
+        index = len(shards)
+        os.makedirs(self.directory, exist_ok=True)
+
+        triples_file = os.path.join(self.directory, TRIPLES_FILE)
+        num_stored = sum(shard["num_triples"] for shard in shards)
+        with open(triples_file, "ab") as file:
+            file.truncate(num_stored * 3 * TRIPLE_DTYPE.itemsize)
+            triples.astype(TRIPLE_DTYPE, copy=False).tofile(file)
+
+        dump_pickle(typing, os.path.join(self.directory, f"typing_{index}.pkl"))
+        dump_pickle(state, os.path.join(self.directory, f"state_{index}.pkl"))
+
+        shards.append({"index": index, "num_entities": len(typing["entities"]), "num_triples": len(triples), **info})
+        manifest_file = os.path.join(self.directory, MANIFEST_FILE)
+        with open(f"{manifest_file}.tmp", "w") as file:
+            json.dump({"shards": shards}, file, indent=4)
+        os.replace(f"{manifest_file}.tmp", manifest_file)
+
+        # only the state of the last shard is needed
+        if index > 0:
+            os.remove(os.path.join(self.directory, f"state_{index - 1}.pkl"))
+
+    def load(self):
+        """
+        Loads the KG from the store.
+
+        Args:
+            self (object): The instance of the KGStore.
+
+        Returns:
+            tuple: The typing of every shard (list of dict), the triples (np.ndarray of shape (n, 3)),
+            the state (dict) and the manifest (list).
+        """
+        shards = self.load_manifest()
+        typings = [load_pickle(os.path.join(self.directory, f"typing_{shard['index']}.pkl")) for shard in shards]
+
+        num_triples = sum(shard["num_triples"] for shard in shards)
+        triples = np.fromfile(
+            os.path.join(self.directory, TRIPLES_FILE), dtype=TRIPLE_DTYPE, count=num_triples * 3
+        ).reshape(-1, 3)
+
+        state = load_pickle(os.path.join(self.directory, f"state_{shards[-1]['index']}.pkl"))
+
+        return typings, triples, state, shards
@@ -1,6 +1,14 @@
 import argparse
 import os
-from pygraft import create_json_template, create_yaml_template, generate_schema, generate_kg, generate
+from pygraft import (
+    create_json_template,
+    create_yaml_template,
+    generate_schema,
+    generate_kg,
+    extend_kg,
+    generate,
+    sweep,
+)
 
 
 def parse_arguments():
@@ -35,7 +43,14 @@ def parse_arguments():
         "--gen",
         type=str,
         default=None,
-        help="Which function to call. Options: generate_schema | generate_kg | generate",
+        help="Which function to call. Options: generate_schema | generate_kg | extend_kg | generate | sweep",
+    )
+    parser.add_argument(
+        "-r",
+        "--resume",
+        action="store_true",
+        default=False,
+        help="Resume the KG generation from the last checkpoint (see checkpoint_every).",
     )
 
     args = parser.parse_args()
@@ -68,9 +83,13 @@ def main():
     if args.gen == "generate_schema":
         generate_schema(args.config)
     if args.gen == "generate_kg":
-        generate_kg(args.config)
+        generate_kg(args.config, resume=args.resume)
+    if args.gen == "extend_kg":
+        extend_kg(args.config)
     if args.gen == "generate":
-        generate(args.config)
+        generate(args.config, resume=args.resume)
+    if args.gen == "sweep":
+        sweep(args.config)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+import numpy as np
+from pygraft.utils_kg import hash_triples
+
+MODES = ["consistent", "violating", "random"]
+
+
+class NegativeSampler:
+    def __init__(self, class_info, relation_info, typings, triples, rng=None):
+        """
+        Initializes a sampler of negative triples, which corrupts the head or the tail of positive triples.
+        Replacement entities are drawn according to the schema, in one of three modes:
+            - 'consistent': entities typed with the domain (resp. range) of the relation and with no class disjoint
+              with it, i.e. hard negatives that no schema constraint rules out;
+            - 'violating': entities typed with a class disjoint with the domain (resp. range) of the relation,
+              i.e. negatives that contradict the schema;
+            - 'random': any entity.
+        Candidate entities are precomputed once per relation and side, in a single flat array,
+        so that corrupting a batch of triples only takes a few vectorized operations.
+
+        Args:
+            self (object): The instance of the NegativeSampler.
+            class_info (dict): The class information of the schema.
+            relation_info (dict): The relation information of the schema.
+            typings (list): The typing of the entities of each shard of the KG store (see `KGStore.load`).
+            triples (np.ndarray): The encoded triples of the KG, of shape (n, 3).
+            rng (numpy.random.Generator): The random generator. If None, an unseeded one is created.
+
+        Returns:
+            None
+        """
+        self.rng = rng or np.random.default_rng()
+        self.entities = np.array([int(e[1:]) for typing in typings for e in typing["entities"]], dtype=np.int64)
+
+        # sorted hashes of the triples of the KG, to filter out negatives that are actually positives
+        self.keys = np.sort(hash_triples(triples))
+
+        class2members = {}
+        for typing in typings:
+            for e, classes in typing["ent2classes_transitive"].items():
+                for c in classes:
+                    class2members.setdefault(c, []).append(int(e[1:]))
+        self.class2members = {c: np.unique(members) for c, members in class2members.items()}
+        self.class2disjoints_extended = class_info["class2disjoints_extended"]
+
+        num_relations = max((int(r[1:]) for r in relation_info["relations"]), default=0) + 1
+        side2constraints = [relation_info["rel2dom"], relation_info["rel2range"]]
+        self.mode2pools = {mode: self.build_pools(mode, num_relations, side2constraints) for mode in MODES}
+
+    def build_pools(self, mode, num_relations, side2constraints):
+        """
+        Gathers the candidate entities of every relation and side in a single flat array.
+        Relations sharing the same constraint on a side share the same candidates.
+
+        Args:
+            self (object): The instance of the NegativeSampler.
+            mode (str): The sampling mode.
+            num_relations (int): The number of relations.
+            side2constraints (list): The domain and range of each relation.
+
+        Returns:
+            tuple: The candidates (np.ndarray), and the offsets and sizes of the candidates of relation r
+            on side s (0 for the head, 1 for the tail), i.e. pool[offsets[r, s] : offsets[r, s] + sizes[r, s]],
+            as np.ndarray of shape (num_relations, 2).
+        """
+        pools = []
+        offsets = np.zeros((num_relations, 2), dtype=np.int64)
+        sizes = np.zeros((num_relations, 2), dtype=np.int64)
+        class2position = {}
+        position = 0
+
+        for r in range(num_relations):
+            for s, rel2class in enumerate(side2constraints):
+                c = None if mode == "random" else rel2class.get(f"R{r}")
+                if c is None and mode == "violating":
+                    # nothing can violate an unconstrained side
+                    continue
+                if c not in class2position:
+                    pool = self.get_candidates(c, mode)
+                    class2position[c] = (position, len(pool))
+                    pools.append(pool)
+                    position += len(pool)
+                offsets[r, s], sizes[r, s] = class2position[c]
+
+        pool = np.concatenate(pools) if pools else np.empty(0, dtype=np.int64)
+
+        return pool, offsets, sizes
+
+    def get_candidates(self, c, mode):
+        """
+        Returns the entities that can replace the head or tail of a triple, given the class constraint on that side.
+
+        Args:
+            self (object): The instance of the NegativeSampler.
+            c (str): The domain or range of the relation, or None to get every entity.
+            mode (str): The sampling mode.
+
+        Returns:
+            np.ndarray: The candidate entities, sorted.
+        """
+        if c is None:
+            return np.unique(self.entities)
+
+        empty = np.empty(0, dtype=np.int64)
+        violating = [self.class2members.get(d, empty) for d in self.class2disjoints_extended.get(c, [])]
+        violating = np.unique(np.concatenate(violating)) if violating else empty
+        if mode == "violating":
+            return violating
+
+        return np.setdiff1d(self.class2members.get(c, empty), violating)
+
+    def contains(self, triples):
+        """
+        Checks which triples belong to the KG, using the hash index of its triples.
+        A hash collision (with a probability of about n / 2^64 per triple) can only make a triple wrongly reported
+        as part of the KG, so that filtered negatives are never positives.
+
+        Args:
+            self (object): The instance of the NegativeSampler.
+            triples (np.ndarray): The encoded triples, of shape (m, 3).
+
+        Returns:
+            np.ndarray: A boolean mask of the triples found in the KG.
+        """
+        if len(self.keys) == 0:
+            return np.zeros(len(triples), dtype=bool)
+
+        hashes = hash_triples(triples)
+        positions = np.minimum(np.searchsorted(self.keys, hashes), len(self.keys) - 1)
+
+        return self.keys[positions] == hashes
+
+    def corrupt(self, triples, mode):
+        """
+        Corrupts the head or the tail of each triple, chosen at random among the sides that have candidates.
+
+        Args:
+            self (object): The instance of the NegativeSampler.
+            triples (np.ndarray): The encoded triples, of shape (m, 3).
+            mode (str): The sampling mode.
+
+        Returns:
+            tuple: The indices of the corrupted triples (np.ndarray), as triples that have no candidate
+            on either side are dropped, and the corrupted triples (np.ndarray).
+        """
+        pool, offsets, sizes = self.mode2pools[mode]
+        relations = triples[:, 1]
+        side_sizes = sizes[relations]
+        all_rows = np.arange(len(triples))
+
+        sides = self.rng.integers(2, size=len(triples))
+        # fall back to the other side when the drawn one has no candidate
+        sides = np.where(side_sizes[all_rows, sides] > 0, sides, 1 - sides)
+        rows = np.flatnonzero(side_sizes[all_rows, sides] > 0)
+        sides = sides[rows]
+
+        num_candidates = side_sizes[rows, sides]
+        indices = offsets[relations[rows], sides] + (self.rng.random(len(rows)) * num_candidates).astype(np.int64)
+
+        negatives = triples[rows]
+        negatives[np.arange(len(rows)), 2 * sides] = pool[indices]
+
+        return rows, negatives
+
+    def sample(self, triples, mode="consistent", num_negatives=1, filtered=True, max_tries=10):
+        """
+        Samples negative triples by corrupting positive ones.
+
+        Args:
+            self (object): The instance of the NegativeSampler.
+            triples (np.ndarray): The encoded positive triples, of shape (m, 3).
+            mode (str): The sampling mode: 'consistent', 'violating' or 'random'.
+            num_negatives (int): The number of negatives per positive triple.
+            filtered (bool): Whether to redraw negatives that belong to the KG.
+            max_tries (int): The maximum number of draws per negative when filtering.
+                Negatives still in the KG after max_tries draws are dropped.
+
+        Raises:
+            ValueError: If the mode is unknown.
+
+        Returns:
+            np.ndarray: The negative triples, of shape (k, 3) with k <= m * num_negatives, in the order of
+            the positive triples they were drawn from.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown negative sampling mode '{mode}': expected one of {MODES}.")
+
+        triples = np.repeat(np.asarray(triples), num_negatives, axis=0)
+        if not filtered:
+            return self.corrupt(triples, mode)[1]
+
+        negatives = triples.copy()
+        valid = np.zeros(len(triples), dtype=bool)
+        pending = np.arange(len(triples))
+        for _ in range(max_tries):
+            rows, corrupted = self.corrupt(triples[pending], mode)
+            is_positive = self.contains(corrupted)
+
+            negatives[pending[rows[~is_positive]]] = corrupted[~is_positive]
+            valid[pending[rows[~is_positive]]] = True
+            pending = pending[rows[is_positive]]
+            if len(pending) == 0:
+                break
+
+        return negatives[valid]
@@ -0,0 +1,141 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+PROFILE_FILE = "profile.json"
+
+
+def get_peak_rss_mb():
+    """
+    Returns the peak resident set size of the current process so far.
+
+    Returns:
+        float: The peak RSS in megabytes, or None if it cannot be measured on this platform.
+    """
+    if resource is None:
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, and in kilobytes elsewhere
+    return round(peak_rss / (1 << 20) if sys.platform == "darwin" else peak_rss / (1 << 10), 1)
+
+
+class Profiler:
+    def __init__(self, trace_memory=False):
+        """
+        Initializes a profiler, which records the wall time, CPU time, memory use and throughput of
+        each stage of a generation, along with counters (e.g. the number of rejected triples per check).
+
+        Args:
+            self (object): The instance of the Profiler.
+            trace_memory (bool): Whether to also trace Python allocations with tracemalloc, which gives the peak memory
+                allocated during each stage but slows the generation down.
+
+        Returns:
+            None
+        """
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.counters = Counter()
+
+    @contextmanager
+    def stage(self, name, num_items=None):
+        """
+        Profiles a stage. The record of the stage is yielded, so that the stage can add its own measures to it,
+        e.g. its number of items once known.
+
+        Args:
+            self (object): The instance of the Profiler.
+            name (str): The name of the stage.
+            num_items (int): The number of items (e.g. triples) processed by the stage, to compute its throughput.
+
+        Yields:
+            dict: The record of the stage.
+        """
+        record = {"name": name, "num_items": num_items}
+        self.stages.append(record)
+
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            elif hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+
+        start_wall_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+        try:
+            yield record
+        finally:
+            wall_time = time.perf_counter() - start_wall_time
+            record["wall_time_s"] = round(wall_time, 6)
+            record["cpu_time_s"] = round(time.process_time() - start_cpu_time, 6)
+            record["peak_rss_mb"] = get_peak_rss_mb()
+            if self.trace_memory:
+                record["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / (1 << 20), 2)
+            if record["num_items"] is not None and wall_time > 0:
+                record["items_per_second"] = round(record["num_items"] / wall_time, 1)
+
+    def count(self, name, n=1):
+        """
+        Increments a counter.
+
+        Args:
+            self (object): The instance of the Profiler.
+            name (str): The name of the counter.
+            n (int): The increment.
+
+        Returns:
+            None
+        """
+        self.counters[name] += n
+
+    def to_dict(self):
+        """
+        Summarizes the profile.
+
+        Args:
+            self (object): The instance of the Profiler.
+
+        Returns:
+            dict: The stages, in the order they started, the counters and the total wall and CPU times.
+        """
+        # stages are not nested, so that their times add up
+        return {
+            "wall_time_s": round(sum(stage.get("wall_time_s", 0) for stage in self.stages), 6),
+            "cpu_time_s": round(sum(stage.get("cpu_time_s", 0) for stage in self.stages), 6),
+            "peak_rss_mb": get_peak_rss_mb(),
+            "stages": self.stages,
+            "counters": dict(self.counters),
+        }
+
+    def save(self, directory, section):
+        """
+        Saves the profile to the profile.json file of the given folder, under the given section
+        (e.g. 'schema' or 'kg'), so that the schema and KG generations of a folder share the same file.
+
+        Args:
+            self (object): The instance of the Profiler.
+            directory (str): The output folder.
+            section (str): The section of the file.
+
+        Returns:
+            None
+        """
+        profile_file = os.path.join(directory, PROFILE_FILE)
+        profile = {}
+        if os.path.isfile(profile_file):
+            with open(profile_file, "r") as file:
+                profile = json.load(file)
+
+        profile[section] = self.to_dict()
+        with open(profile_file, "w") as file:
+            json.dump(profile, file, indent=4)
@@ -1,3 +1,7 @@
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from .schema_constructor import SchemaBuilder
 from .utils import (
     get_most_recent_subfolder,
@@ -8,10 +12,25 @@ from .utils import (
     print_ascii_header,
     load_json_template,
     load_yaml_template,
+    get_stage_rngs,
 )
 from .class_generator import ClassGenerator
 from .relation_generator import RelationGenerator
 from .kg_generator import InstanceGenerator
+from .cache import ArtifactCache, get_schema_files, get_kg_files
+from .checkpoint import Checkpointer
+from .kg_store import KGStore
+from .negative_sampler import NegativeSampler
+from .profiler import Profiler
+from .utils_sweep import (
+    load_sweep,
+    get_schema_signature,
+    load_schema,
+    init_sweep_worker,
+    get_sweep_schema,
+    save_results,
+    RESULTS_FILE,
+)
 
 
 def create_template(extension="yml"):
@@ -63,21 +82,55 @@ def create_yaml_template():
     load_yaml_template()
 
 
-def generate_schema(path):
+def get_cache(config):
     """
-    Generates a schema based on the user's configuration file.
-    
+    Creates the artifact cache if it is enabled in the user's configuration.
+    Unseeded runs bypass the cache, as they are not reproducible: a cached artifact would replay a previous run
+    instead of drawing a new one.
+
     Args:
-        path (str): Path to the user's configuration file.
-        
+        config (dict): The configuration dictionary.
+
+    Returns:
+        ArtifactCache: The artifact cache, or None if caching is disabled or the run is not seeded.
+    """
+    if not config.get("cache", False):
+        return None
+
+    if config.get("seed") is None:
+        print("\nCache bypassed: set a seed to cache reproducible runs.\n")
+        return None
+
+    return ArtifactCache(
+        cache_dir=config.get("cache_dir", ".pygraft_cache"), max_size_mb=config.get("cache_max_size_mb", 1024)
+    )
+
+
+def run_schema_generation(config, cache=None):
+    """
+    Generates the schema (classes, relations and their serialization), or restores it from the cache.
+
+    Args:
+        config (dict): The configuration dictionary.
+        cache (ArtifactCache): The artifact cache. If None, the schema is always generated.
+
     Returns:
         None
     """
-    config = load_config(path)
-    check_schema_arguments(config)
-    config["schema_name"] = initialize_folder(config["schema_name"])
+    directory = f"output/{config['schema_name']}/"
+    profiler = Profiler(trace_memory=config.get("profile_memory", False))
 
-    print_ascii_header()
+    if cache is not None:
+        key = cache.schema_key(config)
+        with profiler.stage("restore_from_cache"):
+            metadata = cache.load(key, directory)
+        if metadata is not None:
+            print(f"\nSchema restored from cache ({key[:12]}).")
+            print(f"\n{'Consistent' if metadata['consistent'] else 'Inconsistent'} schema.\n")
+            profiler.save(directory, "schema")
+            return
+
+    rngs = get_stage_rngs(config.get("seed"))
 
     class_generator = ClassGenerator(
         num_classes=config["num_classes"],
@@ -86,6 +139,8 @@ def generate_schema(path):
         class_inheritance_ratio=config["class_inheritance_ratio"],
         avg_disjointness=config["avg_disjointness"],
         verbose=config["verbose"],
+        rng=rngs["classes"],
+        profiler=profiler,
     )
     class_info = class_generator.generate_class_schema()
 
@@ -105,32 +160,34 @@ def generate_schema(path):
         prop_asymmetric_relations=config["prop_asymmetric_relations"],
         prop_inverse_functional_relations=config["prop_inverse_functional_relations"],
         verbose=config["verbose"],
+        rng=rngs["relations"],
+        profiler=profiler,
     )
     relation_info = relation_generator.generate_relation_schema()
 
-    schema_builder = SchemaBuilder(class_info, relation_info, config["schema_name"], config["format"])
+    schema_builder = SchemaBuilder(
+        class_info, relation_info, config["schema_name"], config["format"], profiler=profiler
+    )
     schema_builder.building_pipeline()
+    profiler.save(schema_builder.directory, "schema")
 
+    if cache is not None:
+        cache.store(key, directory, get_schema_files(config["format"]), consistent=schema_builder.consistent)
 
-def generate_kg(path):
+
+def get_instance_generator(config, resume=False, **kwargs):
     """
-    Generates a knowledge graph based on the user's configuration file.
+    Creates the instance generator of the KG defined by the configuration.
 
     Args:
-        path (str): Path to the user's configuration file.
+        config (dict): The configuration dictionary.
+        resume (bool): Whether to resume the KG generation from the last checkpoint, if any.
+        kwargs (dict): Additional arguments of the InstanceGenerator, e.g. the schema information.
 
     Returns:
-        None
+        InstanceGenerator: The instance generator.
     """
-    config = load_config(path)
-    check_kg_arguments(config)
-    if config["schema_name"] is None:
-        most_recent_subfolder_name = get_most_recent_subfolder("output")
-        config["schema_name"] = most_recent_subfolder_name
-
-    print_ascii_header()
-
-    instance_generator = InstanceGenerator(
+    return InstanceGenerator(
         schema=config["schema_name"],
         num_entities=config["num_entities"],
         num_triples=config["num_triples"],
@@ -141,18 +198,197 @@ def generate_kg(path):
         avg_depth_specific_class=config["avg_depth_specific_class"],
         multityping=config["multityping"],
         avg_multityping=config["avg_multityping"],
+        entity_popularity_skew=config.get("entity_popularity_skew", 0.0),
+        time_budget_s=config.get("time_budget_s"),
+        checkpoint_every=config.get("checkpoint_every"),
+        id_format=config.get("id_format"),
+        split_ratios=config.get("split_ratios"),
+        split_remove_leakage=config.get("split_remove_leakage", False),
+        num_output_shards=config.get("num_output_shards"),
+        output_compression=config.get("output_compression"),
+        separate_types_file=config.get("separate_types_file", False),
+        kg_store=config.get("kg_store", False),
+        profile_memory=config.get("profile_memory", False),
+        resume=resume,
         format=config["format"],
         kg_check_reasoner=config["kg_check_reasoner"],
+        rng=get_stage_rngs(config.get("seed"))["kg"],
+        **kwargs,
     )
+
+
+def run_kg_generation(config, cache=None, resume=False):
+    """
+    Generates the KG from the schema stored in the output folder, or restores it from the cache.
+
+    Args:
+        config (dict): The configuration dictionary.
+        cache (ArtifactCache): The artifact cache. If None, the KG is always generated.
+        resume (bool): Whether to resume the KG generation from the last checkpoint, if any.
+
+    Returns:
+        None
+    """
+    directory = f"output/{config['schema_name']}/"
+
+    # the KG then depends on how fast it is generated
+    if cache is not None and config.get("time_budget_s") is not None:
+        print("\nCache bypassed for the KG: its content depends on the time budget.\n")
+        cache = None
+
+    if cache is not None:
+        key = cache.kg_key(config, directory)
+        profiler = Profiler(trace_memory=config.get("profile_memory", False))
+        with profiler.stage("restore_from_cache"):
+            metadata = cache.load(key, directory)
+        if metadata is not None:
+            print(f"\nKG restored from cache ({key[:12]}).")
+            if metadata["consistent"] is not None:
+                print(f"\n{'Consistent' if metadata['consistent'] else 'Inconsistent'} KG.\n")
+            profiler.save(directory, "kg")
+            return
+
+    instance_generator = get_instance_generator(config, resume=resume)
     instance_generator.generate_kg()
 
+    if cache is not None:
+        cache.store(
+            key,
+            directory,
+            get_kg_files(config),
+            consistent=instance_generator.consistent,
+        )
+
+
+def generate_schema(path):
+    """
+    Generates a schema based on the user's configuration file.
+    
+    Args:
+        path (str): Path to the user's configuration file.
+        
+    Returns:
+        None
+    """
+    config = load_config(path)
+    check_schema_arguments(config)
+    config["schema_name"] = initialize_folder(config["schema_name"])
 
-def generate(path):
+    print_ascii_header()
+
+    run_schema_generation(config, cache=get_cache(config))
+
+
+def generate_kg(path, resume=False):
+    """
+    Generates a knowledge graph based on the user's configuration file.
+
+    Args:
+        path (str): Path to the user's configuration file.
+        resume (bool): Whether to resume the KG generation from the last checkpoint, if any.
+
+    Returns:
+        None
+    """
+    config = load_config(path)
+    check_kg_arguments(config)
+    if config["schema_name"] is None:
+        most_recent_subfolder_name = get_most_recent_subfolder("output")
+        config["schema_name"] = most_recent_subfolder_name
+
+    print_ascii_header()
+
+    run_kg_generation(config, cache=get_cache(config), resume=resume)
+
+
+def extend_kg(path):
+    """
+    Extends the knowledge graph previously generated in the output folder, up to the number of entities
+    and triples of the user's configuration file. Only the new part of the KG is generated and written.
+
+    Args:
+        path (str): Path to the user's configuration file.
+
+    Returns:
+        None
+    """
+    config = load_config(path)
+    check_kg_arguments(config)
+    if config["schema_name"] is None:
+        most_recent_subfolder_name = get_most_recent_subfolder("output")
+        config["schema_name"] = most_recent_subfolder_name
+
+    print_ascii_header()
+
+    get_instance_generator(config).extend_kg()
+
+
+def iter_triples(path, batch_size=10000):
+    """
+    Lazily generates a knowledge graph based on the user's configuration file, from the schema in the output folder.
+    Batches of triples are yielded as soon as they are generated, and no file is written.
+
+    Args:
+        path (str): Path to the user's configuration file.
+        batch_size (int): The number of triples per batch.
+
+    Yields:
+        np.ndarray: Batches of triples of shape (batch_size, 3), where each triple (Eh, Rr, Et) is encoded
+        as the integers (h, r, t).
+    """
+    config = load_config(path)
+    check_kg_arguments(config)
+    if config["schema_name"] is None:
+        most_recent_subfolder_name = get_most_recent_subfolder("output")
+        config["schema_name"] = most_recent_subfolder_name
+
+    yield from get_instance_generator(config).iter_triples(batch_size)
+
+
+def get_negative_sampler(path):
+    """
+    Creates a sampler of negative triples for the knowledge graph generated in the output folder,
+    based on its schema and the typing of its entities.
+
+    Args:
+        path (str): Path to the user's configuration file.
+
+    Raises:
+        ValueError: If there is no KG store in the output folder.
+
+    Returns:
+        NegativeSampler: The negative sampler, see `NegativeSampler.sample`.
+    """
+    config = load_config(path)
+    if config["schema_name"] is None:
+        most_recent_subfolder_name = get_most_recent_subfolder("output")
+        config["schema_name"] = most_recent_subfolder_name
+
+    directory = f"output/{config['schema_name']}/"
+    store = KGStore(f"{directory}kg_store/")
+    if not store.exists():
+        raise ValueError(f"No KG store in {directory}: generate the KG with kg_store set to true first.")
+
+    with open(f"{directory}class_info.json", "r") as file:
+        class_info = json.load(file)
+    with open(f"{directory}relation_info.json", "r") as file:
+        relation_info = json.load(file)
+    typings, triples, _, _ = store.load()
+
+    return NegativeSampler(
+        class_info, relation_info, typings, triples, rng=get_stage_rngs(config.get("seed"))["negatives"]
+    )
+
+
+def generate(path, resume=False):
     """
     Generates a schema and knowledge graph based on the user's configuration file.
+    When caching is enabled, each stage is restored from the cache if its inputs have not changed.
+    When resuming, the schema of the interrupted run is kept and the KG generation restarts from its last checkpoint.
 
     Args:
         path (str): Path to the user's configuration file.
+        resume (bool): Whether to resume the KG generation from the last checkpoint, if any.
     
     Returns:
         None
@@ -160,54 +396,105 @@ def generate(path):
     config = load_config(path)
     check_schema_arguments(config)
     check_kg_arguments(config)
+    if resume and config["schema_name"] is None and os.path.isdir("output"):
+        config["schema_name"] = get_most_recent_subfolder("output")
     config["schema_name"] = initialize_folder(config["schema_name"])
 
     print_ascii_header()
 
-    class_generator = ClassGenerator(
-        num_classes=config["num_classes"],
-        max_hierarchy_depth=config["max_hierarchy_depth"],
-        avg_class_depth=config["avg_class_depth"],
-        class_inheritance_ratio=config["class_inheritance_ratio"],
-        avg_disjointness=config["avg_disjointness"],
-        verbose=config["verbose"],
-    )
-    class_info = class_generator.generate_class_schema()
+    cache = get_cache(config)
+    if not (resume and Checkpointer(f"output/{config['schema_name']}/checkpoint/").exists()):
+        run_schema_generation(config, cache=cache)
+    run_kg_generation(config, cache=cache, resume=resume)
 
-    relation_generator = RelationGenerator(
-        class_info=class_info,
-        num_relations=config["num_relations"],
-        relation_specificity=config["relation_specificity"],
-        prop_profiled_relations=config["prop_profiled_relations"],
-        profile_side=config["profile_side"],
-        prop_symmetric_relations=config["prop_symmetric_relations"],
-        prop_inverse_relations=config["prop_inverse_relations"],
-        prop_functional_relations=config["prop_functional_relations"],
-        prop_transitive_relations=config["prop_transitive_relations"],
-        prop_subproperties=config["prop_subproperties"],
-        prop_reflexive_relations=config["prop_reflexive_relations"],
-        prop_irreflexive_relations=config["prop_irreflexive_relations"],
-        prop_asymmetric_relations=config["prop_asymmetric_relations"],
-        prop_inverse_functional_relations=config["prop_inverse_functional_relations"],
-        verbose=config["verbose"],
-    )
-    relation_info = relation_generator.generate_relation_schema()
 
-    schema_builder = SchemaBuilder(class_info, relation_info, config["schema_name"], config["format"])
-    schema_builder.building_pipeline()
+def run_sweep_kg(config):
+    """
+    Generates the KG of a run of a sweep, in a worker process, from the schema received by the worker.
 
-    instance_generator = InstanceGenerator(
-        schema=config["schema_name"],
-        num_entities=config["num_entities"],
-        num_triples=config["num_triples"],
-        relation_balance_ratio=config["relation_balance_ratio"],
-        fast_gen=config["fast_gen"],
-        oversample=config["oversample"],
-        prop_untyped_entities=config["prop_untyped_entities"],
-        avg_depth_specific_class=config["avg_depth_specific_class"],
-        multityping=config["multityping"],
-        avg_multityping=config["avg_multityping"],
-        format=config["format"],
-        kg_check_reasoner=config["kg_check_reasoner"],
+    Args:
+        config (dict): The configuration of the run.
+
+    Returns:
+        dict: The timing and statistics of the run.
+    """
+    start_time = time.perf_counter()
+    class_info, relation_info = get_sweep_schema(config["schema_directory"])
+    directory = f"output/{config['schema_name']}/"
+    os.makedirs(directory, exist_ok=True)
+
+    instance_generator = get_instance_generator(
+        config, class_info=class_info, relation_info=relation_info, schema_directory=config["schema_directory"]
     )
     instance_generator.generate_kg()
+
+    with open(f"{directory}kg_info.json", "r") as file:
+        statistics = json.load(file)["statistics"]
+
+    return {
+        "schema": config["schema_label"],
+        "kg": config["kg_label"],
+        "folder": directory,
+        "wall_time_s": round(time.perf_counter() - start_time, 3),
+        "consistent": instance_generator.consistent,
+        **statistics,
+    }
+
+
+def sweep(path):
+    """
+    Runs a parameter sweep described by a sweep specification (see `load_sweep`).
+    Each distinct schema is generated once, then the KGs of all runs are generated in parallel
+    by a pool of processes, which receive the schemas once, when they start.
+    The timing and statistics of every run are collected into output/<sweep_name>/results.csv.
+
+    Args:
+        path (str): Path to the sweep specification.
+
+    Returns:
+        list: The results of each run.
+    """
+    spec, runs = load_sweep(path)
+    sweep_name = spec["sweep_name"]
+
+    print_ascii_header()
+
+    signature2directory = {}
+    for config in runs:
+        check_schema_arguments(config)
+        check_kg_arguments(config)
+        signature = get_schema_signature(config)
+
+        if signature not in signature2directory:
+            # schemas only differing by their format are written to distinct folders
+            schema_name = f"{sweep_name}/{config['schema_label']}"
+            if f"output/{schema_name}/" in signature2directory.values():
+                schema_name += f"_{config['format']}"
+            schema_config = dict(config, schema_name=initialize_folder(schema_name))
+            run_schema_generation(schema_config, cache=get_cache(schema_config))
+            signature2directory[signature] = f"output/{schema_config['schema_name']}/"
+
+        config["schema_directory"] = signature2directory[signature]
+        config["schema_name"] = f"{sweep_name}/{config['schema_label']}/{config['kg_label']}"
+
+    schemas = {directory: load_schema(directory) for directory in signature2directory.values()}
+    results = []
+
+    with ProcessPoolExecutor(
+        max_workers=spec.get("num_workers"), initializer=init_sweep_worker, initargs=(schemas,)
+    ) as executor:
+        futures = {executor.submit(run_sweep_kg, config): config for config in runs}
+        for future in as_completed(futures):
+            config = futures[future]
+            try:
+                result = future.result()
+            except Exception as error:
+                result = {"schema": config["schema_label"], "kg": config["kg_label"], "error": repr(error)}
+            print(f"\nSweep run {result['schema']} x {result['kg']} done.\n")
+            results.append(result)
+
+    results.sort(key=lambda result: (result["schema"], result["kg"]))
+    save_results(results, f"output/{sweep_name}/{RESULTS_FILE}")
+    print(f"\nSweep results written to output/{sweep_name}/{RESULTS_FILE}.\n")
+
+    return results
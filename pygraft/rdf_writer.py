@@ -0,0 +1,631 @@
+import gzip
+import hashlib
+import itertools
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+import traceback
+from xml.sax.saxutils import quoteattr
+from pygraft.checkpoint import encode_triples
+
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RDFS = "http://www.w3.org/2000/01/rdf-schema#"
+OWL = "http://www.w3.org/2002/07/owl#"
+DCTERMS = "http://purl.org/dc/terms/"
+SCHEMA = "http://pygraf.t/"
+
+NAMESPACES = {"dcterms": DCTERMS, "owl": OWL, "rdf": RDF, "rdfs": RDFS, "sc": SCHEMA}
+
+# formats that can be written without building an rdflib graph
+STREAMING_FORMATS = {"xml", "ttl", "nt"}
+
+LOCAL_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_-]*$")
+
+# file extension added by each compression
+COMPRESSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+SHARD_MANIFEST_FILE = "manifest.json"
+
+
+def get_shard_files(name, format, num_shards, compression=None):
+    """
+    Returns the names of the files of a sharded output, e.g. 'full_graph/part-00000.nt.gz'.
+
+    Args:
+        name (str): The base name of the output, e.g. 'full_graph'.
+        format (str): The output format.
+        num_shards (int): The number of shards.
+        compression (str): The compression of the shards: "gzip", "zstd" or None.
+
+    Returns:
+        list: The file names of the shards, followed by the name of the manifest.
+    """
+    extension = ("rdf" if format == "xml" else format) + COMPRESSIONS[compression]
+    files = [f"{name}/part-{i:05d}.{extension}" for i in range(num_shards)]
+
+    return files + [f"{name}/{SHARD_MANIFEST_FILE}"]
+
+
+def open_output(file_path, compression=None):
+    """
+    Opens a binary file for writing, optionally compressed.
+
+    Args:
+        file_path (str): The path of the file.
+        compression (str): The compression: "gzip", "zstd" (requires the zstandard package) or None.
+
+    Raises:
+        ValueError: If the compression is unknown.
+
+    Returns:
+        io.BufferedIOBase: The file.
+    """
+    if compression is None:
+        return open(file_path, "wb")
+
+    if compression == "gzip":
+        # the default level (9) is several times slower for a marginal gain on N-Triples-like text,
+        # and the modification time is left out of the header so that shards (and their checksums) are reproducible
+        return gzip.GzipFile(file_path, "wb", compresslevel=6, mtime=0)
+
+    if compression == "zstd":
+        import zstandard
+
+        return zstandard.open(file_path, "wb")
+
+    raise ValueError(f"Unknown compression: {compression}. Valid compressions: gzip, zstd")
+
+
+def get_file_checksum(file_path):
+    """
+    Computes the SHA-256 checksum of a file.
+
+    Args:
+        file_path (str): The path of the file.
+
+    Returns:
+        str: The hexadecimal checksum.
+    """
+    checksum = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            checksum.update(chunk)
+
+    return checksum.hexdigest()
+
+
+class BackgroundWriter:
+    def __init__(self, file, chunk_size=1 << 20, queue_size=8):
+        """
+        Initializes a text writer that hands the encoding, compression and writing of its output to a background thread,
+        so that they can run while the text is being formatted (zlib and file writes release the GIL).
+        Text is buffered into chunks of about chunk_size characters, passed to the thread through a bounded queue:
+        when the thread falls behind, writing blocks until a chunk is consumed, which caps memory use
+        to about queue_size chunks.
+
+        Args:
+            self (object): The instance of the BackgroundWriter.
+            file (io.BufferedIOBase): The binary file to write to, closed along with the writer.
+            chunk_size (int): The number of characters per chunk.
+            queue_size (int): The maximum number of chunks waiting to be written.
+
+        Returns:
+            None
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self.num_buffered = 0
+        self.closed = False
+        self.error = None
+        # time spent by the thread encoding, compressing and writing, and by the producer waiting for the thread
+        self.io_time = 0.0
+        self.blocked_time = 0.0
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """
+        Writes the chunks of the queue until the end-of-output marker (None) is received.
+        After an error, chunks are still consumed (and dropped), so that the producer never blocks on a full queue.
+
+        Args:
+            self (object): The instance of the BackgroundWriter.
+
+        Returns:
+            None
+        """
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                return
+
+            if self.error is None:
+                start = time.perf_counter()
+                try:
+                    self.file.write(chunk.encode("utf-8"))
+                except Exception as error:
+                    self.error = error
+                self.io_time += time.perf_counter() - start
+
+    def put(self, chunk):
+        """
+        Hands a chunk to the thread, waiting for room in the queue if needed.
+
+        Args:
+            self (object): The instance of the BackgroundWriter.
+            chunk (str): The chunk, or None to mark the end of the output.
+
+        Returns:
+            None
+        """
+        start = time.perf_counter()
+        self.queue.put(chunk)
+        self.blocked_time += time.perf_counter() - start
+
+    def write(self, text):
+        """
+        Buffers text, and hands it to the thread once the buffer exceeds the chunk size.
+
+        Args:
+            self (object): The instance of the BackgroundWriter.
+            text (str): The text.
+
+        Raises:
+            Exception: Any error raised by the thread while writing a previous chunk.
+
+        Returns:
+            None
+        """
+        self.chunks.append(text)
+        self.num_buffered += len(text)
+
+        if self.num_buffered >= self.chunk_size:
+            if self.error is not None:
+                raise self.error
+            self.put("".join(self.chunks))
+            self.chunks = []
+            self.num_buffered = 0
+
+    def close(self):
+        """
+        Hands the remaining text to the thread, waits for it to write everything, then closes the file.
+
+        Args:
+            self (object): The instance of the BackgroundWriter.
+
+        Raises:
+            Exception: Any error raised by the thread while writing.
+
+        Returns:
+            None
+        """
+        if self.closed:
+            return
+
+        self.closed = True
+        try:
+            if self.chunks:
+                self.put("".join(self.chunks))
+                self.chunks = []
+        finally:
+            self.put(None)
+            start = time.perf_counter()
+            self.thread.join()
+            self.blocked_time += time.perf_counter() - start
+            self.file.close()
+
+        if self.error is not None:
+            raise self.error
+
+
+class RDFWriter:
+    def __init__(self, file_path, format, buffer_size=1 << 20, compression=None):
+        """
+        Initializes a streaming RDF writer.
+        Triples are written to the file as they come, grouped by subject, through a large write buffer
+        flushed by a background thread (see `BackgroundWriter`).
+
+        Args:
+            self (object): The instance of the RDFWriter.
+            file_path (str): The path of the output file.
+            format (str): The output format. Can be "xml", "ttl" or "nt".
+            buffer_size (int): The size of the write buffer, in bytes.
+            compression (str): The compression of the file: "gzip", "zstd" or None.
+
+        Returns:
+            None
+        """
+        if format not in STREAMING_FORMATS:
+            valid_formats = ", ".join(sorted(STREAMING_FORMATS))
+            raise ValueError(f"Unknown streaming format: {format}. Valid formats: {valid_formats}")
+
+        self.format = format
+        self.file = BackgroundWriter(open_output(file_path, compression), chunk_size=buffer_size)
+        self.write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_header(self):
+        """
+        Writes the namespace declarations.
+
+        Args:
+            self (object): The instance of the RDFWriter.
+
+        Returns:
+            None
+        """
+        if self.format == "xml":
+            declarations = "".join(f"\n   xmlns:{prefix}={quoteattr(iri)}" for prefix, iri in NAMESPACES.items())
+            self.file.write(f'<?xml version="1.0" encoding="utf-8"?>\n<rdf:RDF{declarations}\n>\n')
+        elif self.format == "ttl":
+            self.file.write("".join(f"@prefix {prefix}: <{iri}> .\n" for prefix, iri in NAMESPACES.items()))
+
+    def write_subject(self, subject, predicate_objects):
+        """
+        Writes all the triples sharing the same subject.
+
+        Args:
+            self (object): The instance of the RDFWriter.
+            subject (str): The IRI of the subject.
+            predicate_objects (list): A list of (predicate IRI, object IRI) pairs.
+
+        Returns:
+            None
+        """
+        if not predicate_objects:
+            return
+
+        if self.format == "nt":
+            self.file.write("".join(f"<{subject}> <{p}> <{o}> .\n" for p, o in predicate_objects))
+
+        elif self.format == "ttl":
+            statements = " ;\n    ".join(
+                f"{'a' if p == RDF + 'type' else self.turtle_term(p)} {self.turtle_term(o)}"
+                for p, o in predicate_objects
+            )
+            self.file.write(f"\n{self.turtle_term(subject)} {statements} .\n")
+
+        else:
+            properties = "".join(f"    <{self.qname(p)} rdf:resource={quoteattr(o)}/>\n" for p, o in predicate_objects)
+            self.file.write(f"  <rdf:Description rdf:about={quoteattr(subject)}>\n{properties}  </rdf:Description>\n")
+
+    def write_triple(self, subject, predicate, object):
+        """
+        Writes a single triple.
+
+        Args:
+            self (object): The instance of the RDFWriter.
+            subject (str): The IRI of the subject.
+            predicate (str): The IRI of the predicate.
+            object (str): The IRI of the object.
+
+        Returns:
+            None
+        """
+        self.write_subject(subject, [(predicate, object)])
+
+    def close(self):
+        """
+        Closes the RDF/XML root element (if needed) and flushes the file to disk.
+
+        Args:
+            self (object): The instance of the RDFWriter.
+
+        Returns:
+            None
+        """
+        if self.file.closed:
+            return
+
+        if self.format == "xml":
+            self.file.write("</rdf:RDF>\n")
+
+        self.file.close()
+
+    def qname(self, iri):
+        """
+        Compacts an IRI into a qualified name, as required for RDF/XML predicates.
+
+        Args:
+            self (object): The instance of the RDFWriter.
+            iri (str): The IRI.
+
+        Raises:
+            ValueError: If the IRI does not belong to a known namespace.
+
+        Returns:
+            str: The qualified name, e.g. 'rdfs:subClassOf'.
+        """
+        for prefix, namespace in NAMESPACES.items():
+            if iri.startswith(namespace) and LOCAL_NAME.match(iri[len(namespace) :]):
+                return f"{prefix}:{iri[len(namespace):]}"
+
+        raise ValueError(f"Cannot write {iri} as an RDF/XML predicate: unknown namespace.")
+
+    def turtle_term(self, iri):
+        """
+        Returns the Turtle notation of an IRI, i.e. a prefixed name when possible.
+
+        Args:
+            self (object): The instance of the RDFWriter.
+            iri (str): The IRI.
+
+        Returns:
+            str: The Turtle term.
+        """
+        try:
+            return self.qname(iri)
+        except ValueError:
+            return f"<{iri}>"
+
+
+def write_shard(file_path, format, compression, triples, ent2types, tail_entities, axioms=()):
+    """
+    Writes a shard of a KG as a standalone RDF file. Meant to be run in a writer process,
+    hence its compact input: triples are encoded as integers, and grouped by head.
+
+    Args:
+        file_path (str): The path of the shard.
+        format (str): The output format.
+        compression (str): The compression of the shard: "gzip", "zstd" or None.
+        triples (np.ndarray): The encoded triples (h, r, t) of the shard, of shape (n, 3), grouped by head.
+        ent2types (dict): The classes each entity of the shard must be typed with, by entity number.
+        tail_entities (list): The numbers of the entities only observed as tails, to type in this shard.
+        axioms (list): The schema axioms to write first, as (subject, predicate-objects) pairs.
+
+    Returns:
+        dict: The file name of the shard, its numbers of triples and typing triples, its size and its checksum.
+    """
+    rdf_type = RDF + "type"
+    num_typing_triples = 0
+
+    with RDFWriter(file_path, format, compression=compression) as writer:
+        for subject, predicate_objects in axioms:
+            writer.write_subject(subject, predicate_objects)
+
+        for h, h_triples in itertools.groupby(triples.tolist(), key=lambda triple: triple[0]):
+            types = ent2types.get(h, [])
+            num_typing_triples += len(types)
+            predicate_objects = [(rdf_type, SCHEMA + c) for c in types]
+            predicate_objects.extend((f"{SCHEMA}R{r}", f"{SCHEMA}E{t}") for _, r, t in h_triples)
+            writer.write_subject(f"{SCHEMA}E{h}", predicate_objects)
+
+        for t in tail_entities:
+            types = ent2types.get(t, [])
+            num_typing_triples += len(types)
+            writer.write_subject(f"{SCHEMA}E{t}", [(rdf_type, SCHEMA + c) for c in types])
+
+    return get_shard_info(file_path, len(triples), num_typing_triples)
+
+
+def get_shard_info(file_path, num_triples, num_typing_triples):
+    """
+    Describes a written shard, as listed in the manifest of a sharded output.
+
+    Args:
+        file_path (str): The path of the shard.
+        num_triples (int): The number of instance triples of the shard.
+        num_typing_triples (int): The number of rdf:type triples of the shard.
+
+    Returns:
+        dict: The file name of the shard, its numbers of triples and typing triples, its size and its checksum.
+    """
+    return {
+        "file": os.path.basename(file_path),
+        "num_triples": num_triples,
+        "num_typing_triples": num_typing_triples,
+        "size": os.path.getsize(file_path),
+        "sha256": get_file_checksum(file_path),
+    }
+
+
+def write_triple_batches(batches, results, file_paths, format, compression, ent2types, axioms=()):
+    """
+    Writes the batches of encoded triples received from a queue to one or more RDF files, as they come,
+    until the end-of-output marker (None) is received. Meant to be run in a writer process (see `KGStreamWriter`).
+    The triples of head h go to file h % len(file_paths), so that all the triples of a subject are in the same file,
+    and each entity e is typed once, in file e % len(file_paths), the first time it is observed.
+    After an error, batches are still consumed (and dropped), so that the producer never blocks on a full queue.
+
+    Args:
+        batches (multiprocessing.Queue): The queue of batches of encoded triples (np.ndarray of shape (n, 3)).
+        results (multiprocessing.Queue): The queue to which the outcome is put once the output is complete:
+            the information of each file (see `get_shard_info`) and the CPU time spent writing, or the error raised.
+        file_paths (list): The paths of the files.
+        format (str): The output format.
+        compression (str): The compression of the files: "gzip", "zstd" or None.
+        ent2types (dict): The classes each entity must be typed with, by entity number.
+        axioms (list): The schema axioms to write first to the first file, as (subject, predicate-objects) pairs.
+
+    Returns:
+        None
+    """
+    rdf_type = RDF + "type"
+    # CPU time rather than wall time, which would include the time the process waits for batches or for a CPU
+    start = time.process_time()
+    error = None
+
+    try:
+        num_files = len(file_paths)
+        writers = [RDFWriter(file_path, format, compression=compression) for file_path in file_paths]
+        num_triples, num_typing_triples = [0] * num_files, [0] * num_files
+        observed = set()
+
+        for subject, predicate_objects in axioms:
+            writers[0].write_subject(subject, predicate_objects)
+    except Exception:
+        error = traceback.format_exc()
+
+    while True:
+        batch = batches.get()
+        if batch is None:
+            break
+        if error is not None:
+            continue
+
+        try:
+            for h, r, t in batch.tolist():
+                for e in (h, t):
+                    if e not in observed:
+                        observed.add(e)
+                        types = ent2types.get(e, [])
+                        num_typing_triples[e % num_files] += len(types)
+                        writers[e % num_files].write_subject(f"{SCHEMA}E{e}", [(rdf_type, SCHEMA + c) for c in types])
+                num_triples[h % num_files] += 1
+                writers[h % num_files].write_triple(f"{SCHEMA}E{h}", f"{SCHEMA}R{r}", f"{SCHEMA}E{t}")
+        except Exception:
+            error = traceback.format_exc()
+
+    if error is None:
+        try:
+            for writer in writers:
+                writer.close()
+            files = [get_shard_info(*info) for info in zip(file_paths, num_triples, num_typing_triples)]
+        except Exception:
+            error = traceback.format_exc()
+
+    if error is not None:
+        results.put({"error": error})
+    else:
+        results.put({"files": files, "write_time": time.process_time() - start})
+
+
+class KGStreamWriter:
+    def __init__(self, file_paths, format, compression, ent2types, axioms=(), batch_size=1 << 14, queue_size=8):
+        """
+        Initializes a writer of the triples of a KG as they are generated: triples are buffered into batches,
+        encoded as integers and handed through a bounded queue to a writer process, which formats, compresses
+        and writes them (see `write_triple_batches`) while generation continues.
+        When the writer process falls behind, adding triples blocks until a batch is consumed,
+        which caps memory use to about queue_size batches.
+
+        Args:
+            self (object): The instance of the KGStreamWriter.
+            file_paths (list): The paths of the output files.
+            format (str): The output format.
+            compression (str): The compression of the files: "gzip", "zstd" or None.
+            ent2types (dict): The classes each entity must be typed with, by entity number.
+            axioms (list): The schema axioms to write first, as (subject, predicate-objects) pairs.
+            batch_size (int): The number of triples per batch.
+            queue_size (int): The maximum number of batches waiting to be written.
+
+        Returns:
+            None
+        """
+        self.batch_size = batch_size
+        self.triples = []
+        # time spent by the producer handing triples to the writer process, including the time spent waiting for room
+        # in the queue, and time spent after generation waiting for the writer process to finish
+        self.send_time, self.wait_time, self.drain_time = 0.0, 0.0, 0.0
+
+        self.batches = multiprocessing.Queue(maxsize=queue_size)
+        self.results = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=write_triple_batches,
+            args=(self.batches, self.results, file_paths, format, compression, ent2types, axioms),
+            daemon=True,
+        )
+        self.process.start()
+
+    def add(self, triple):
+        """
+        Adds a triple to the current batch, and hands the batch to the writer process once it is full.
+
+        Args:
+            self (object): The instance of the KGStreamWriter.
+            triple (tuple): The triple (h, r, t).
+
+        Returns:
+            None
+        """
+        self.triples.append(triple)
+
+        if len(self.triples) >= self.batch_size:
+            start = time.perf_counter()
+            self.put(encode_triples(self.triples))
+            self.triples = []
+            self.send_time += time.perf_counter() - start
+
+    def put(self, batch):
+        """
+        Hands a batch to the writer process, waiting for room in the queue if needed.
+
+        Args:
+            self (object): The instance of the KGStreamWriter.
+            batch (np.ndarray): The encoded triples, or None to mark the end of the output.
+
+        Raises:
+            RuntimeError: If the writer process stopped.
+
+        Returns:
+            None
+        """
+        start = time.perf_counter()
+        while True:
+            try:
+                self.batches.put(batch, timeout=1)
+                break
+            except queue.Full:
+                if not self.process.is_alive():
+                    raise RuntimeError("The KG writer process stopped unexpectedly.")
+        self.wait_time += time.perf_counter() - start
+
+    def close(self):
+        """
+        Hands the remaining triples to the writer process and waits for it to complete the output.
+
+        Args:
+            self (object): The instance of the KGStreamWriter.
+
+        Raises:
+            RuntimeError: If the writer process failed or stopped.
+
+        Returns:
+            dict: The information of each file (see `get_shard_info`) and the CPU time the writer process spent writing.
+        """
+        start = time.perf_counter()
+        if self.triples:
+            self.put(encode_triples(self.triples))
+            self.triples = []
+        self.put(None)
+
+        result = None
+        while result is None:
+            # the process may have put its result just before exiting, hence the last attempt once it is not alive
+            is_alive = self.process.is_alive()
+            try:
+                result = self.results.get(timeout=1)
+            except queue.Empty:
+                if not is_alive:
+                    raise RuntimeError("The KG writer process stopped unexpectedly.")
+        self.process.join()
+        self.drain_time = time.perf_counter() - start
+
+        if "error" in result:
+            raise RuntimeError(f"The KG writer process failed:\n{result['error']}")
+
+        return result
+
+    def abort(self):
+        """
+        Stops the writer process, leaving its output incomplete.
+
+        Args:
+            self (object): The instance of the KGStreamWriter.
+
+        Returns:
+            None
+        """
+        self.process.terminate()
+        self.process.join()
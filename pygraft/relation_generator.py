@@ -1,10 +1,60 @@
 import numpy as np
-import random
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import json
 import itertools
+import functools
 import pkg_resources
+from types import MappingProxyType
 from tabulate import tabulate
+from pygraft.utils import random_choice, random_sample
+from pygraft.profiler import Profiler
+
+
+@functools.lru_cache(maxsize=None)
+def load_one_rel_compatibilities():
+    """
+    Loads and compiles the valid combinations of relation properties.
+    The file is only read once per process; the returned tables are read-only and shared.
+
+    Returns:
+        tuple: The valid combinations (as frozensets), and a mapping from each property to the patterns
+               a relation can feature before the property is added to it.
+    """
+    file_path = pkg_resources.resource_filename("pygraft", "property_checks/combinations.json")
+
+    with open(file_path, "r") as file:
+        data = json.load(file)
+
+    one_rel_compatibilities = tuple(frozenset(key.split(",")) for key, value in data.items() if value == "True")
+
+    property2base_patterns = defaultdict(list)
+    for combi in one_rel_compatibilities:
+        for property in combi:
+            property2base_patterns[property].append(combi - {property})
+
+    return one_rel_compatibilities, MappingProxyType({k: tuple(v) for k, v in property2base_patterns.items()})
+
+
+@functools.lru_cache(maxsize=None)
+def load_inverseof_compatibilities():
+    """
+    Loads and compiles the pairs of patterns which are compatible as inverse relations.
+    The file is only read once per process; the returned table is read-only and shared.
+
+    Returns:
+        MappingProxyType: A mapping from each pattern (as a frozenset) to the compatible patterns.
+    """
+    file_path = pkg_resources.resource_filename("pygraft", "property_checks/compat_p1p2_inverseof.txt")
+    compat_inverseof = defaultdict(dict)
+
+    with open(file_path, "r") as file:
+        for line in file:
+            patterns, _, value = line.strip().rpartition(": ")
+            if value == '"True"':
+                first_pattern, second_pattern = patterns.split("|")
+                compat_inverseof[frozenset(first_pattern.split(","))][frozenset(second_pattern.split(","))] = None
+
+    return MappingProxyType({k: tuple(v) for k, v in compat_inverseof.items()})
 
 
 class RelationGenerator:
@@ -32,6 +82,7 @@ class RelationGenerator:
             prop_reflexive_relations (float): The desired proportion of reflexive relations.
             prop_irreflexive_relations (float): The desired proportion of irreflexive relations.
             prop_asymmetric_relations (float): The desired proportion of asymmetric relations.
+            rng (numpy.random.Generator): The random generator. If None, an unseeded one is created.
 
         Returns:
             None
@@ -66,6 +117,8 @@ class RelationGenerator:
             prop_reflexive_relations (float): The desired proportion of reflexive relations.
             prop_irreflexive_relations (float): The desired proportion of irreflexive relations.
             prop_asymmetric_relations (float): The desired proportion of asymmetric relations.
+            rng (numpy.random.Generator): The random generator. If None, an unseeded one is created.
+            profiler (Profiler): The profiler of the generation. If None, a new one is created.
 
         Returns:
             None
@@ -76,6 +129,8 @@ class RelationGenerator:
         self.prop_profiled_relations = kwargs.get("prop_profiled_relations")
         self.profile_side = kwargs.get("profile_side")
         self.verbose = kwargs.get("verbose")
+        self.rng = kwargs.get("rng") or np.random.default_rng()
+        self.profiler = kwargs.get("profiler") or Profiler()
 
     def init_property_props(self, **kwargs):
         """
@@ -126,8 +181,10 @@ class RelationGenerator:
             None
         """
         self.relations = [f"R{i}" for i in range(1, self.num_relations + 1)]
+        self.rel2index = {r: i for i, r in enumerate(self.relations)}
         self.rel2dom = {}
         self.rel2range = {}
+        self.specificity_sum = 0
         self.unprofiled_relations = {}
         self.rel2inverse = {}
         self.inverseof_relations = []
@@ -142,12 +199,14 @@ class RelationGenerator:
         Returns:
             relation_info (dict): The assembled relation information.
         """
-        self.generate_relations()
+        with self.profiler.stage("generate_relations", num_items=self.num_relations):
+            self.generate_relations()
 
         if self.verbose:
             self.print_schema()
 
-        relation_info = self.assemble_relation_info()
+        with self.profiler.stage("assemble_relation_info"):
+            relation_info = self.assemble_relation_info()
 
         return relation_info
 
@@ -222,14 +281,16 @@ class RelationGenerator:
         self.rel2patterns = {
             r: set() for r in self.relations
         }  # contains current ObjectProperties for each generated relation
-        self.pattern2rels = {tuple(sorted(p)): set() for p in self.one_rel_compatibilities}
+        self.pattern2rels = defaultdict(set, {frozenset(): set(self.relations)})  # reverse index of rel2patterns
 
-        self.reflexive_relations = random.sample(
-            self.relations, k=int(len(self.relations) * self.prop_reflexive_relations)
+        self.reflexive_relations = random_sample(
+            self.rng, self.relations, k=int(len(self.relations) * self.prop_reflexive_relations)
         )
         self.update_rel2patterns("owl:Reflexive")
-        self.irreflexive_relations = random.sample(
-            list(set(self.relations) - set(self.reflexive_relations)),
+        reflexive_relations = set(self.reflexive_relations)
+        self.irreflexive_relations = random_sample(
+            self.rng,
+            [r for r in self.relations if r not in reflexive_relations],
             k=int(len(self.relations) * self.prop_irreflexive_relations),
         )
         self.update_rel2patterns("owl:Irreflexive")
@@ -245,17 +306,20 @@ class RelationGenerator:
         self.class2disjoints_extended = self.class_info["class2disjoints_extended"]
         self.layer2classes = self.class_info["layer2classes"]
         self.class2layer = self.class_info["class2layer"]
+        self.partition_classes()
 
         # Reflexivity is incompatible with domain and range assertions
-        self.unprofiled_relations["both"] = [r for r, p in self.rel2patterns.items() if "owl:Reflexive" not in p]
-        self.unprofiled_relations["dom"] = [r for r, p in self.rel2patterns.items() if "owl:Reflexive" not in p]
-        self.unprofiled_relations["range"] = [r for r, p in self.rel2patterns.items() if "owl:Reflexive" not in p]
-        self.num_relations_wo_reflexive = len(self.unprofiled_relations["both"])
+        non_reflexive_relations = [r for r, p in self.rel2patterns.items() if "owl:Reflexive" not in p]
+        self.unprofiled_relations["both"] = OrderedDict.fromkeys(non_reflexive_relations)
+        self.unprofiled_relations["dom"] = OrderedDict.fromkeys(non_reflexive_relations)
+        self.unprofiled_relations["range"] = OrderedDict.fromkeys(non_reflexive_relations)
+        self.num_relations_wo_reflexive = len(non_reflexive_relations)
 
         self.current_profile_ratio = 0.0
 
-        while self.current_profile_ratio < self.prop_profiled_relations:
+        while self.current_profile_ratio < self.prop_profiled_relations and self.has_unprofiled_relations():
             self.add_one_relation_profile()
+            self.profiler.count("relation_profile_attempts")
             self.current_profile_ratio = (len(self.rel2dom) + len(self.rel2range)) / (
                 2 * self.num_relations_wo_reflexive
             )
@@ -289,6 +353,21 @@ class RelationGenerator:
         elif self.profile_side == "partial":
             self.add_partial_relation_profile()
 
+    def has_unprofiled_relations(self):
+        """
+        Checks whether some relations can still be profiled given the value of `profile_side`.
+
+        Args:
+            self (object): The instance of the RelationGenerator.
+
+        Returns:
+            bool: True if at least one relation can still be profiled, False otherwise.
+        """
+        if self.profile_side == "both":
+            return bool(self.unprofiled_relations["both"])
+
+        return bool(self.unprofiled_relations["dom"] or self.unprofiled_relations["range"])
+
     def add_partial_relation_profile(self):
         """
         Generates a partial relation profile by assigning a domain/range to a relation.
@@ -308,55 +387,50 @@ class RelationGenerator:
         """
         current_rel_specificity = self.calculate_relation_specificity()
         sampled_class = self.sample_class(current_rel_specificity)
-        domain_or_range = "domain" if random.random() < 0.5 else "range"
+        domain_or_range = "domain" if self.rng.random() < 0.5 else "range"
+
+        if not self.unprofiled_relations["dom"]:
+            domain_or_range = "range"
+        elif not self.unprofiled_relations["range"]:
+            domain_or_range = "domain"
 
         if domain_or_range == "domain":
-            rel = self.unprofiled_relations["dom"].pop(0)
+            rel = self.unprofiled_relations["dom"].popitem(last=False)[0]
             rel2patterns = self.rel2patterns[rel]
-            self.rel2dom[rel] = sampled_class
+            self.set_domain(rel, sampled_class)
 
             if "owl:Transitive" in rel2patterns or "owl:Symmetric" in rel2patterns:
-                self.rel2range[rel] = sampled_class
+                self.set_range(rel, sampled_class)
                 if rel in self.unprofiled_relations["range"]:
-                    self.unprofiled_relations["range"].remove(rel)
+                    del self.unprofiled_relations["range"][rel]
                     if rel in self.rel2inverse:
                         inverse_rel = self.rel2inverse[rel]
-                        self.unprofiled_relations["dom"].remove(
-                            inverse_rel
-                        ) if inverse_rel in self.unprofiled_relations["dom"] else None
-                        self.rel2dom[inverse_rel] = self.rel2range[rel]
+                        self.unprofiled_relations["dom"].pop(inverse_rel, None)
+                        self.set_domain(inverse_rel, self.rel2range[rel])
 
             if rel in self.rel2inverse:
                 inverse_rel = self.rel2inverse[rel]
-                # if inverse_rel in self.unprofiled_relations["range"] and "owl:Reflexive" not in self.rel2patterns[inverse_rel]:
-                self.unprofiled_relations["range"].remove(inverse_rel) if inverse_rel in self.unprofiled_relations[
-                    "range"
-                ] else None
-                self.rel2range[inverse_rel] = self.rel2dom[rel]
+                self.unprofiled_relations["range"].pop(inverse_rel, None)
+                self.set_range(inverse_rel, self.rel2dom[rel])
 
         else:
-            rel = self.unprofiled_relations["range"].pop(0)
+            rel = self.unprofiled_relations["range"].popitem(last=False)[0]
             rel2patterns = self.rel2patterns[rel]
-            self.rel2range[rel] = sampled_class
+            self.set_range(rel, sampled_class)
 
             if "owl:Transitive" in rel2patterns or "owl:Symmetric" in rel2patterns:
-                self.rel2dom[rel] = sampled_class
+                self.set_domain(rel, sampled_class)
                 if rel in self.unprofiled_relations["dom"]:
-                    self.unprofiled_relations["dom"].remove(rel)
+                    del self.unprofiled_relations["dom"][rel]
                     if rel in self.rel2inverse:
                         inverse_rel = self.rel2inverse[rel]
-                        self.unprofiled_relations["range"].remove(
-                            inverse_rel
-                        ) if inverse_rel in self.unprofiled_relations["range"] else None
-                        self.rel2range[inverse_rel] = self.rel2dom[rel]
+                        self.unprofiled_relations["range"].pop(inverse_rel, None)
+                        self.set_range(inverse_rel, self.rel2dom[rel])
 
             if rel in self.rel2inverse:
                 inverse_rel = self.rel2inverse[rel]
-                # if inverse_rel in self.unprofiled_relations["dom"] and "owl:Reflexive" not in self.rel2patterns[inverse_rel]:
-                self.unprofiled_relations["dom"].remove(inverse_rel) if inverse_rel in self.unprofiled_relations[
-                    "dom"
-                ] else None
-                self.rel2dom[inverse_rel] = self.rel2range[rel]
+                self.unprofiled_relations["dom"].pop(inverse_rel, None)
+                self.set_domain(inverse_rel, self.rel2range[rel])
 
     def add_complete_relation_profile(self):
         """
@@ -370,42 +444,72 @@ class RelationGenerator:
         """
         current_rel_specificity = self.calculate_relation_specificity()
         sampled_domain = self.sample_class(current_rel_specificity)
-        rel = self.unprofiled_relations["both"].pop(0)
+        rel = self.unprofiled_relations["both"].popitem(last=False)[0]
         rel2patterns = self.rel2patterns[rel]
 
         if "owl:Reflexive" not in rel2patterns:
-            self.rel2dom[rel] = sampled_domain
+            self.set_domain(rel, sampled_domain)
             current_rel_specificity = self.calculate_relation_specificity()
             if "owl:Transitive" in rel2patterns or "owl:Symmetric" in rel2patterns:
-                self.rel2range[rel] = sampled_domain
+                self.set_range(rel, sampled_domain)
             else:
                 sampled_range = self.sample_class_constrained(current_rel_specificity, sampled_domain)
-                self.rel2range[rel] = sampled_range
+                self.set_range(rel, sampled_range)
 
             if rel in self.rel2inverse:
                 inverse_rel = self.rel2inverse[rel]
+                self.unprofiled_relations["both"].pop(inverse_rel, None)
+                self.set_domain(inverse_rel, self.rel2range[rel])
+                self.set_range(inverse_rel, self.rel2dom[rel])
 
-                if inverse_rel in self.unprofiled_relations["both"]:
-                    self.unprofiled_relations["both"].remove(inverse_rel)
+    def set_domain(self, rel, c):
+        """
+        Sets the domain of a relation and updates the running sum of domain and range layers.
 
-                self.rel2dom[inverse_rel] = self.rel2range[rel]
-                self.rel2range[inverse_rel] = self.rel2dom[rel]
+        Args:
+            self (object): The instance of the RelationGenerator.
+            rel (str): The relation.
+            c (str): The domain class.
 
-    def calculate_relation_specificity(self):
+        Returns:
+            None
         """
-        Calculates the specificity of relations.
+        if rel in self.rel2dom:
+            self.specificity_sum -= self.class2layer[self.rel2dom[rel]]
+        self.rel2dom[rel] = c
+        self.specificity_sum += self.class2layer[c]
+
+    def set_range(self, rel, c):
+        """
+        Sets the range of a relation and updates the running sum of domain and range layers.
 
         Args:
             self (object): The instance of the RelationGenerator.
+            rel (str): The relation.
+            c (str): The range class.
 
         Returns:
             None
         """
-        domains = list(self.rel2dom.values())
-        ranges = list(self.rel2range.values())
-        both = domains + ranges
+        if rel in self.rel2range:
+            self.specificity_sum -= self.class2layer[self.rel2range[rel]]
+        self.rel2range[rel] = c
+        self.specificity_sum += self.class2layer[c]
+
+    def calculate_relation_specificity(self):
+        """
+        Calculates the specificity of relations, i.e. the average layer of the domains and ranges assigned so far.
+        The layers are summed up as domains and ranges are assigned (see `set_domain` and `set_range`).
 
-        return np.mean([self.class2layer[c] for c in both])
+        Args:
+            self (object): The instance of the RelationGenerator.
+
+        Returns:
+            float: The relation specificity, or NaN if no domain or range has been assigned yet.
+        """
+        num_profiles = len(self.rel2dom) + len(self.rel2range)
+
+        return self.specificity_sum / num_profiles if num_profiles else np.nan
 
     def sample_class(self, current_rel_specificity):
         """
@@ -422,11 +526,13 @@ class RelationGenerator:
         """
         potential_classes = self.filter_classes(current_rel_specificity)
 
-        return random.choice(potential_classes)
+        return random_choice(self.rng, potential_classes)
 
     def sample_class_constrained(self, current_rel_specificity, other_class):
         """
         Returns a compatible class based on the current relational specificity and other class.
+        If every class of the selected layers is disjoint with the other class, the class is sampled
+        from the other layers instead.
 
         Args:
             self (object): The instance of the RelationGenerator.
@@ -436,47 +542,135 @@ class RelationGenerator:
         Returns:
             str: A compatible class.
         """
-        compatible_classes = []
+        band = self.filter_band(current_rel_specificity)
+        compatible_classes = self.get_compatible_classes(other_class)
 
-        while not compatible_classes:
-            potential_classes = self.filter_classes(current_rel_specificity)
-            compatible_classes = list(set(potential_classes) - set(self.class2disjoints_extended.get(other_class, [])))
+        if not compatible_classes[band]:
+            band = "generic" if band == "specific" else "specific"
 
-        return random.choice(compatible_classes)
+        return random_choice(self.rng, compatible_classes[band])
 
-    def filter_classes(self, current_rel_specificity):
+    def get_compatible_classes(self, c):
         """
-        Filters classes based on the current relational specificity.
+        Returns the classes which are not disjoint with a given class, for both bands of layers.
+        Tables are lazily memoized: they are computed the first time a class is drawn as a domain
+        and reused afterwards, since precomputing them for every class would take O(num_classes^2) memory.
+        `partition_classes` checks beforehand that every class has at least one compatible class.
+
+        Args:
+            self (object): The instance of the RelationGenerator.
+            c (str): The class.
+
+        Returns:
+            dict: A dictionary mapping "specific" and "generic" to lists of compatible classes.
+        """
+        if c not in self.class2compatible_classes:
+            disjoint_classes = self.get_disjoint_classes(c)
+            self.class2compatible_classes[c] = {
+                band: [cl for cl in classes if cl not in disjoint_classes]
+                for band, classes in self.band2classes.items()
+            }
+
+        return self.class2compatible_classes[c]
+
+    def get_disjoint_classes(self, c):
+        """
+        Returns the classes a given class is disjoint with, including the class itself if it is disjoint
+        with one of its superclasses, as it then has no instance.
+
+        Args:
+            self (object): The instance of the RelationGenerator.
+            c (str): The class.
+
+        Returns:
+            set: The disjoint classes.
+        """
+        disjoint_classes = set(self.class2disjoints_extended.get(c, []))
+        if disjoint_classes.intersection(self.class_info["transitive_class2superclasses"].get(c, [])):
+            disjoint_classes.add(c)
+
+        return disjoint_classes
+
+    def partition_classes(self):
+        """
+        Splits classes once and for all between the layers above and below the user-specified relation specificity:
+        "specific" classes lie strictly deeper than int(relation_specificity), "generic" classes do not.
+        Also checks, before any relation is profiled, that no class is disjoint with every class
+        (itself included, see `get_disjoint_classes`), so that a range can always be assigned to a relation whatever its domain (see `get_compatible_classes`).
+
+        Args:
+            self (object): The instance of the RelationGenerator.
+
+        Raises:
+            ValueError: If a class is disjoint with every class.
+
+        Returns:
+            None
+        """
+        self.band2classes = {
+            "specific": list(
+                itertools.chain.from_iterable(
+                    cl for layer, cl in self.layer2classes.items() if layer > int(self.relation_specificity)
+                )
+            ),
+            "generic": list(
+                itertools.chain.from_iterable(
+                    cl for layer, cl in self.layer2classes.items() if layer <= int(self.relation_specificity)
+                )
+            ),
+        }
+        self.class2compatible_classes = {}
+
+        classes = set(itertools.chain.from_iterable(self.band2classes.values()))
+        for c in classes:
+            if classes.issubset(self.get_disjoint_classes(c)):
+                raise ValueError(
+                    f"Every class is disjoint with {c}: no range can be assigned to a relation with domain {c}."
+                )
+
+    def filter_band(self, current_rel_specificity):
+        """
+        Selects the band of layers to sample classes from, based on the current relational specificity.
+        An empty band (e.g. when relation_specificity exceeds the hierarchy depth) is never selected.
 
         Args:
             self (object): The instance of the RelationGenerator.
             current_rel_specificity (float): The current relational specificity.
 
         Returns:
-            list: A list of filtered classes.
+            str: Either "specific" or "generic".
         """
         if current_rel_specificity < self.relation_specificity:
-            filtered_classes = [
-                cl for layer, cl in self.layer2classes.items() if layer > int(self.relation_specificity)
-            ]
-            if random.random() < 0.1:  # add some noise
-                filtered_classes = [
-                    cl for layer, cl in self.layer2classes.items() if layer <= int(self.relation_specificity)
-                ]
+            band = "specific"
+            if self.rng.random() < 0.1:  # add some noise
+                band = "generic"
         else:
-            filtered_classes = [
-                cl for layer, cl in self.layer2classes.items() if layer <= int(self.relation_specificity)
-            ]
-            if random.random() < 0.1:  # add some noise
-                filtered_classes = [
-                    cl for layer, cl in self.layer2classes.items() if layer > int(self.relation_specificity)
-                ]
+            band = "generic"
+            if self.rng.random() < 0.1:  # add some noise
+                band = "specific"
+
+        if not self.band2classes[band]:
+            band = "generic" if band == "specific" else "specific"
 
-        return list(itertools.chain.from_iterable(filtered_classes))
+        return band
+
+    def filter_classes(self, current_rel_specificity):
+        """
+        Filters classes based on the current relational specificity.
+
+        Args:
+            self (object): The instance of the RelationGenerator.
+            current_rel_specificity (float): The current relational specificity.
+
+        Returns:
+            list: A list of filtered classes.
+        """
+        return self.band2classes[self.filter_band(current_rel_specificity)]
 
     def get_one_rel_compatibilities(self):
         """
         Gets all valid combinations of relation properties.
+        The compiled tables are shared by all RelationGenerator instances (see `load_one_rel_compatibilities`).
 
         Args:
             self (object): The instance of the RelationGenerator.
@@ -484,17 +678,12 @@ class RelationGenerator:
         Returns:
             None
         """
-        file_path = pkg_resources.resource_filename("pygraft", "property_checks/combinations.json")
-
-        with open(file_path, "r") as file:
-            data = json.load(file)
-
-        compatibilities = [key for key, value in data.items() if value == "True"]
-        self.one_rel_compatibilities = [op.split(",") for op in compatibilities]
+        self.one_rel_compatibilities, self.property2base_patterns = load_one_rel_compatibilities()
 
     def get_inverseof_compatibilities(self):
         """
         Gets all valid combinations of inverse relations.
+        The compiled table is shared by all RelationGenerator instances (see `load_inverseof_compatibilities`).
 
         Args:
             self (object): The instance of the RelationGenerator.
@@ -502,22 +691,7 @@ class RelationGenerator:
         Returns:
             None
         """
-        self.compat_inverseof = {}
-        file_path = pkg_resources.resource_filename("pygraft", "property_checks/compat_p1p2_inverseof.txt")
-
-        with open(file_path, "r") as file:
-            for line in file:
-                line = line.strip()
-                if "True" in line:
-                    line = line.split(" ")
-                    line[0] = line[0][:-1]
-                    line = line[0].split("|")
-                    v1 = frozenset(line[0].strip().split(","))
-                    v2 = frozenset(line[1].strip().split(","))
-                    if v1 not in self.compat_inverseof:
-                        self.compat_inverseof[v1] = [v2]
-                    else:
-                        self.compat_inverseof[v1].append(v2)
+        self.compat_inverseof = load_inverseof_compatibilities()
 
     def update_rel2patterns(self, property):
         """
@@ -538,26 +712,45 @@ class RelationGenerator:
             "owl:Transitive": getattr(self, "transitive_relations", set()),
         }
 
-        if property in property_mappings:
-            self.rel2patterns = {
-                rel: property_set | {property} if rel in property_mappings[property] else property_set
-                for rel, property_set in self.rel2patterns.items()
-            }
-
-        self.update_pattern2rels()
+        for rel in property_mappings.get(property, []):
+            self.add_pattern(rel, property)
 
-    def update_pattern2rels(self):
+    def add_pattern(self, rel, property):
         """
-        Updates self.pattern2rels dictionary.
+        Adds a property to the patterns of a relation and moves the relation accordingly
+        in self.pattern2rels, so that both mappings are kept in sync in constant time.
 
         Args:
             self (object): The instance of the RelationGenerator.
+            rel (str): The relation.
+            property (str): The property to add.
 
         Returns:
             None
         """
-        self.pattern2rels = defaultdict(set)
-        _ = [self.pattern2rels[frozenset(value)].add(key) for key, value in self.rel2patterns.items()]
+        patterns = self.rel2patterns[rel]
+        old_patterns = frozenset(patterns)
+        self.pattern2rels[old_patterns].discard(rel)
+        if not self.pattern2rels[old_patterns]:
+            del self.pattern2rels[old_patterns]
+
+        patterns.add(property)
+        self.pattern2rels[frozenset(patterns)].add(rel)
+
+    def get_relations_with_patterns(self, *patterns):
+        """
+        Returns the relations whose patterns are exactly one of the given sets of patterns, read from self.pattern2rels.
+
+        Args:
+            self (object): The instance of the RelationGenerator.
+            patterns (frozenset): The sets of patterns.
+
+        Returns:
+            list: The relations, in the order of self.relations, so that sampling does not depend on set ordering.
+        """
+        relations = set().union(*[self.pattern2rels.get(p, set()) for p in patterns])
+
+        return sorted(relations, key=self.rel2index.__getitem__)
 
     def add_property(self, property):
         """
@@ -570,143 +763,169 @@ class RelationGenerator:
         Returns:
             None
         """
-        # get all valid combinations featuring the desired property
-        combinations_with_property = list(filter(lambda combi: property in combi, self.one_rel_compatibilities))
-        # remove the desired property so that later on we ensure to sample relation s.t. adding a property is legit
-        combinations_without_property = [
-            list(filter(lambda item: item != property, combi)) for combi in combinations_with_property
-        ]
-        # get all relations having one of the valid combinations
-        relation_pool = set().union(
-            *[self.pattern2rels.get(frozenset(combi), set()) for combi in combinations_without_property]
-        )
+        # get all relations having one of the valid combinations (without the desired property), so that
+        # adding the property to them is legit
+        relation_pool = self.get_relations_with_patterns(*self.property2base_patterns.get(property, ()))
 
         if property == "owl:Functional":
             self.functional_relations = []
-            potential_relations = [key for key, values in self.rel2patterns.items() if values == set()]
+            potential_relations = self.get_relations_with_patterns(frozenset())
             while (
                 len(self.functional_relations) < self.prop_functional_relations * self.num_relations
                 and potential_relations
             ):
                 new_functional_relation = potential_relations.pop()
                 self.functional_relations.append(new_functional_relation)
-                self.rel2patterns[new_functional_relation] = set(self.rel2patterns[new_functional_relation]) | {
-                    "owl:Functional"
-                }
+                self.add_pattern(new_functional_relation, "owl:Functional")
 
         if property == "owl:InverseFunctional":
             self.inversefunctional_relations = []
-            X = random.uniform(0.25, 0.75)
-            potential_relations = [key for key, values in self.rel2patterns.items() if not values]
+            X = self.rng.uniform(0.25, 0.75)
+            potential_relations = self.get_relations_with_patterns(frozenset())
             while (
                 len(self.inversefunctional_relations) < X * self.prop_inverse_functional_relations * self.num_relations
                 and potential_relations
             ):
                 new_inversefunctional_relation = potential_relations.pop()
                 self.inversefunctional_relations.append(new_inversefunctional_relation)
-                self.rel2patterns[new_inversefunctional_relation] = set(
-                    self.rel2patterns[new_inversefunctional_relation]
-                ) | {"owl:InverseFunctional"}
+                self.add_pattern(new_inversefunctional_relation, "owl:InverseFunctional")
 
-            potential_relations = [key for key, values in self.rel2patterns.items() if not values - {"owl:Functional"}]
-            potential_relations = [r for r in potential_relations if r not in self.inversefunctional_relations]
+            # relations made inverse functional above are no longer in these buckets
+            potential_relations = self.get_relations_with_patterns(frozenset(), frozenset({"owl:Functional"}))
             while (
                 len(self.inversefunctional_relations) < self.prop_inverse_functional_relations * self.num_relations
                 and potential_relations
             ):
                 new_inversefunctional_relation = potential_relations.pop()
                 self.inversefunctional_relations.append(new_inversefunctional_relation)
-                self.rel2patterns[new_inversefunctional_relation] = set(
-                    self.rel2patterns[new_inversefunctional_relation]
-                ) | {"owl:InverseFunctional"}
+                self.add_pattern(new_inversefunctional_relation, "owl:InverseFunctional")
 
         if property == "rdfs:subPropertyOf":
-            self.prop2superprop = {}
-            self.subproperties = []
-            rels = self.relations[:]
-            for r1 in rels:
-                for r2 in rels:
-                    if (
-                        r1 != r2
-                        and r1 not in self.prop2superprop
-                        and r2 not in self.prop2superprop
-                        and self.rel2inverse.get(r1) != r2
-                        and self.rel2inverse.get(r2) != r1
-                        and self.rel2patterns[r1] == self.rel2patterns[r2]
-                    ):
-                        if (
-                            r1 not in self.rel2dom
-                            and r1 not in self.rel2range
-                            and r2 not in self.rel2dom
-                            and r1 not in self.rel2range
-                        ):
-                            self.prop2superprop[r1] = r2
-                            self.subproperties.append(r1)
-                            break
-                        if r1 in self.rel2dom and r1 in self.rel2range and r2 in self.rel2dom and r1 in self.rel2range:
-                            # 1
-                            if self.rel2dom.get(r1) == self.rel2dom.get(r2) and self.rel2range.get(
-                                r1
-                            ) == self.rel2range.get(r2):
-                                self.prop2superprop[r1] = r2
-                                self.subproperties.append(r1)
-                                break
-                            # 2
-                            elif (
-                                self.rel2dom.get(r1) == self.rel2dom.get(r2)
-                                and self.rel2range.get(r2)
-                                in self.class_info["transitive_class2superclasses"][self.rel2range.get(r1)]
-                            ):
-                                self.prop2superprop[r1] = r2
-                                self.subproperties.append(r1)
-                                break
-                            # 3
-                            elif (
-                                self.rel2range.get(r1) == self.rel2range.get(r2)
-                                and self.rel2dom.get(r2)
-                                in self.class_info["transitive_class2superclasses"][self.rel2dom.get(r1)]
-                            ):
-                                self.prop2superprop[r1] = r2
-                                self.subproperties.append(r1)
-                                break
-                            # 4
-                            elif (
-                                self.rel2dom.get(r2)
-                                in self.class_info["transitive_class2superclasses"][self.rel2dom.get(r1)]
-                                and self.rel2range.get(r2)
-                                in self.class_info["transitive_class2superclasses"][self.rel2range.get(r1)]
-                            ):
-                                self.prop2superprop[r1] = r2
-                                self.subproperties.append(r1)
-                                break
-
-                if 2 * len(self.prop2superprop) >= self.prop_subproperties * self.num_relations:
-                    return
+            self.add_subpropertyof()
 
         if property == "owl:Symmetric":
             sample_size = int(len(self.relations) * self.prop_symmetric_relations)
             if sample_size > len(relation_pool):
                 sample_size = len(relation_pool)
-            self.symmetric_relations = random.sample(list(relation_pool), k=sample_size)
+            self.symmetric_relations = random_sample(self.rng, relation_pool, k=sample_size)
 
         if property == "owl:Asymmetric":
             sample_size = int(len(self.relations) * self.prop_asymmetric_relations)
             if sample_size > len(relation_pool):
                 sample_size = len(relation_pool)
-            self.asymmetric_relations = random.sample(list(relation_pool), k=sample_size)
+            self.asymmetric_relations = random_sample(self.rng, relation_pool, k=sample_size)
 
         if property == "owl:Transitive":
             sample_size = int(len(self.relations) * self.prop_transitive_relations)
             if sample_size > len(relation_pool):
                 sample_size = len(relation_pool)
-            self.transitive_relations = random.sample(list(relation_pool), k=sample_size)
+            self.transitive_relations = random_sample(self.rng, relation_pool, k=sample_size)
 
         # update rel2patterns
         self.update_rel2patterns(property)
 
+    def add_subpropertyof(self):
+        """
+        Pairs relations as sub-properties of other relations featuring the same patterns.
+        A relation r2 can be the super-property of r1 if both are unprofiled, or if the domain (resp. range) of r2
+        is the domain (resp. range) of r1 or one of its superclasses.
+        Candidate super-properties are indexed by (patterns, domain, range), so that each relation only looks up
+        the entries matching its patterns and the superclasses of its domain and range.
+
+        Args:
+            self (object): The instance of the RelationGenerator.
+
+        Returns:
+            None
+        """
+        self.prop2superprop = {}
+        self.subproperties = []
+        profile2rels = defaultdict(list)
+
+        for r in self.relations:
+            profile = self.get_relation_profile(r)
+            if profile is not None:
+                profile2rels[profile].append(r)
+
+        for r in self.relations:
+            if 2 * len(self.prop2superprop) >= self.prop_subproperties * self.num_relations:
+                break
+
+            profile = self.get_relation_profile(r)
+            if profile is None:
+                continue
+
+            patterns, r2dom, r2range = profile
+            if r2dom is None:
+                candidate_profiles = [profile]
+            else:
+                dom_superclasses = [r2dom] + self.class_info["transitive_class2superclasses"][r2dom]
+                range_superclasses = [r2range] + self.class_info["transitive_class2superclasses"][r2range]
+                candidate_profiles = [
+                    (patterns, dom, range_) for dom, range_ in itertools.product(dom_superclasses, range_superclasses)
+                ]
+
+            super_rel = self.find_superproperty(r, candidate_profiles, profile2rels)
+            if super_rel is not None:
+                self.prop2superprop[r] = super_rel
+                self.subproperties.append(r)
+
+    def get_relation_profile(self, rel):
+        """
+        Returns the key under which a relation is indexed as a candidate super-property.
+
+        Args:
+            self (object): The instance of the RelationGenerator.
+            rel (str): The relation.
+
+        Returns:
+            tuple: The (patterns, domain, range) key, with None domain and range for unprofiled relations,
+                   or None if the relation is only partially profiled.
+        """
+        r2dom, r2range = self.rel2dom.get(rel), self.rel2range.get(rel)
+
+        if (r2dom is None) != (r2range is None):
+            return None
+
+        return frozenset(self.rel2patterns[rel]), r2dom, r2range
+
+    def find_superproperty(self, rel, candidate_profiles, profile2rels):
+        """
+        Finds the first relation (in the order of self.relations) which can be the super-property of a relation.
+
+        Args:
+            self (object): The instance of the RelationGenerator.
+            rel (str): The relation looking for a super-property.
+            candidate_profiles (list): The (patterns, domain, range) keys compatible with the relation.
+            profile2rels (dict): The candidate super-properties indexed by (patterns, domain, range).
+
+        Returns:
+            str: The super-property, or None if no relation qualifies.
+        """
+        super_rel = None
+
+        for profile in candidate_profiles:
+            candidates = profile2rels.get(profile, [])
+            i = 0
+            while i < len(candidates):
+                candidate = candidates[i]
+                if candidate in self.prop2superprop:
+                    # sub-properties never become super-properties
+                    del candidates[i]
+                elif candidate == rel or self.rel2inverse.get(rel) == candidate:
+                    i += 1
+                else:
+                    if super_rel is None or self.rel2index[candidate] < self.rel2index[super_rel]:
+                        super_rel = candidate
+                    break
+
+        return super_rel
+
     def add_inverseof(self):
         """
         Determines and adds inverse relations based on observed patterns and compatibility.
+        Relations without pattern are paired first. Other relations are then paired by drawing
+        from precomputed pairs of compatible patterns, so that no draw is ever rejected.
 
         Args:
             self (object): The instance of the RelationGenerator.
@@ -714,10 +933,7 @@ class RelationGenerator:
         Returns:
             None
         """
-        observed_patterns = [frozenset(op) for op in self.rel2patterns.values()]
         running_inverseof_prop = 0.0
-        attempt = 0
-        warning_msg = 0
 
         # first with relations without pattern
         unpatterned_relations = [r for r in self.relations if not self.rel2patterns[r]]
@@ -731,45 +947,86 @@ class RelationGenerator:
             self.pair_inverseof(first_rel, second_rel)
             running_inverseof_prop = self.calculate_inverseof()
 
-        while running_inverseof_prop < self.prop_inverse_relations:
-            attempt += 1
-            try:
-                first_pattern = random.choice(observed_patterns)
-                compatible_patterns = set(self.compat_inverseof[frozenset(first_pattern)])
-                possible_pattern = set(observed_patterns).intersection(compatible_patterns)
-                second_pattern = random.choice(list(possible_pattern))
-                first_rel = random.choice(list(self.pattern2rels[frozenset(first_pattern)]))
-                second_rel = random.choice(list(self.pattern2rels[frozenset(second_pattern)]))
+        if running_inverseof_prop >= self.prop_inverse_relations:
+            return
+
+        pattern_pairs, pattern2candidates = self.get_inverseof_candidates()
+
+        while running_inverseof_prop < self.prop_inverse_relations and pattern_pairs:
+            idx = self.rng.integers(len(pattern_pairs))
+            first_pattern, second_pattern = pattern_pairs[idx]
+            first_pool, second_pool = pattern2candidates[first_pattern], pattern2candidates[second_pattern]
+
+            if len(first_pool) < (2 if first_pattern == second_pattern else 1) or not second_pool:
+                # exhausted pair of patterns
+                pattern_pairs[idx] = pattern_pairs[-1]
+                pattern_pairs.pop()
+                continue
+
+            first_rel = self.pop_random(first_pool)
+            second_rel = self.pop_random(second_pool)
+            self.pair_inverseof(first_rel, second_rel)
+            running_inverseof_prop = self.calculate_inverseof()
+
+        if running_inverseof_prop < self.prop_inverse_relations:
+            self.prop_inverse_relations = running_inverseof_prop
+            print(
+                f"Proportion of inverse relations reduced to {round(running_inverseof_prop, 2)} "
+                "due to incompatibilities with other properties: no compatible pair of relations is left."
+            )
+
+    def get_inverseof_candidates(self):
+        """
+        Builds the relations that can still be paired as inverses, grouped by pattern,
+        and the pairs of patterns which are compatible as inverses.
+        Reflexive, irreflexive and symmetric relations are excluded, as well as pairs of asymmetric relations.
+
+        Args:
+            self (object): The instance of the RelationGenerator.
+
+        Returns:
+            tuple: A list of (first_pattern, second_pattern) pairs, and a dictionary mapping each pattern
+                   to the relations featuring it.
+        """
+        excluded_properties = {"owl:Reflexive", "owl:Irreflexive", "owl:Symmetric"}
+        pattern2candidates = defaultdict(list)
+
+        for r in self.relations:
+            patterns = frozenset(self.rel2patterns[r])
+            if r not in self.rel2inverse and patterns and not patterns & excluded_properties:
+                pattern2candidates[patterns].append(r)
+
+        pattern_pairs = []
+        seen_pairs = set()
 
+        for first_pattern in pattern2candidates:
+            for second_pattern in self.compat_inverseof.get(first_pattern, []):
+                pair_key = frozenset([first_pattern, second_pattern])
                 if (
-                    first_rel != second_rel
-                    and first_rel not in self.rel2inverse
-                    and second_rel not in self.rel2inverse
-                    and "owl:Reflexive" not in self.rel2patterns[first_rel]
-                    and "owl:Reflexive" not in self.rel2patterns[second_rel]
-                    and "owl:Irreflexive" not in self.rel2patterns[first_rel]
-                    and "owl:Irreflexive" not in self.rel2patterns[second_rel]
-                    and "owl:Symmetric" not in self.rel2patterns[first_rel]
-                    and "owl:Symmetric" not in self.rel2patterns[second_rel]
-                    and not (
-                        "owl:Asymmetric" in self.rel2patterns[first_rel]
-                        and "owl:Asymmetric" in self.rel2patterns[second_rel]
-                    )
+                    second_pattern in pattern2candidates
+                    and pair_key not in seen_pairs
+                    and not ("owl:Asymmetric" in first_pattern and "owl:Asymmetric" in second_pattern)
                 ):
-                    self.pair_inverseof(first_rel, second_rel)
-                    running_inverseof_prop = self.calculate_inverseof()
-                    attempt = 0
-                else:
-                    attempt += 1
-                    if attempt > 1000:
-                        self.prop_inverse_relations -= 0.005
-                        attempt = 0
-                        warning_msg = 1
-            except:
-                continue
+                    seen_pairs.add(pair_key)
+                    pattern_pairs.append((first_pattern, second_pattern))
+
+        return pattern_pairs, pattern2candidates
+
+    def pop_random(self, pool):
+        """
+        Removes and returns a random element of a list in constant time.
+
+        Args:
+            self (object): The instance of the RelationGenerator.
+            pool (list): The list to pop from.
+
+        Returns:
+            str: The removed element.
+        """
+        idx = self.rng.integers(len(pool))
+        pool[idx], pool[-1] = pool[-1], pool[idx]
 
-        if warning_msg:
-            print("Proportion of inverse relations reduced due to incompatibilities with other properties.")
+        return pool.pop()
 
     def pair_inverseof(self, rel, inv_rel):
         """
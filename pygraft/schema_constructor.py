@@ -9,10 +9,110 @@ from tqdm.auto import tqdm
 import os
 from datetime import datetime
 from pygraft.utils import reasoner
+from pygraft.profiler import Profiler
+from pygraft.rdf_writer import RDFWriter, STREAMING_FORMATS, SCHEMA, DCTERMS
+from pygraft.rdf_writer import RDF as RDF_NS, RDFS as RDFS_NS, OWL as OWL_NS
+
+# OWL property type of each relation pattern, in the order they are written
+PATTERN2PROPERTY_TYPE = {
+    "owl:Symmetric": OWL_NS + "SymmetricProperty",
+    "owl:Asymmetric": OWL_NS + "AsymmetricProperty",
+    "owl:Reflexive": OWL_NS + "ReflexiveProperty",
+    "owl:Irreflexive": OWL_NS + "IrreflexiveProperty",
+    "owl:Transitive": OWL_NS + "TransitiveProperty",
+    "owl:Functional": OWL_NS + "FunctionalProperty",
+    "owl:InverseFunctional": OWL_NS + "InverseFunctionalProperty",
+}
+
+
+def ontology_axioms():
+    """
+    Yields the ontology header: the OWL ontology declaration and its CC0 license.
+
+    Returns:
+        generator: (subject, [(predicate, object), ...]) tuples of IRIs.
+    """
+    yield SCHEMA, [
+        (RDF_NS + "type", OWL_NS + "Ontology"),
+        (DCTERMS + "license", "https://creativecommons.org/publicdomain/zero/1.0/"),
+    ]
+
+
+def class_axioms(class_info):
+    """
+    Yields the axioms describing each class: its type, its direct superclass and its disjoint classes.
+
+    Args:
+        class_info (dict): A dictionary containing class information.
+
+    Returns:
+        generator: (subject, [(predicate, object), ...]) tuples of IRIs, one per class.
+    """
+    class2superclass = class_info["direct_class2superclass"]
+    class2disjoints = class_info["class2disjoints"]
+
+    for c in class_info["classes"]:
+        predicate_objects = [(RDF_NS + "type", OWL_NS + "Class")]
+
+        if c in class2superclass:
+            sp = class2superclass[c]
+            sp_URI = OWL_NS + "Thing" if sp == "owl:Thing" else SCHEMA + str(sp)
+            predicate_objects.append((RDFS_NS + "subClassOf", sp_URI))
+
+        for c2 in class2disjoints.get(c, ()):
+            predicate_objects.append((OWL_NS + "disjointWith", SCHEMA + str(c2)))
+
+        yield SCHEMA + str(c), predicate_objects
+
+
+def relation_axioms(relation_info):
+    """
+    Yields the axioms describing each relation.
+
+    Each relation is declared as an owl:ObjectProperty, typed with the OWL property types of its patterns,
+    and described by its domain and range (unless it is reflexive), its inverse and its superproperty.
+
+    Args:
+        relation_info (dict): A dictionary containing relation information.
+
+    Returns:
+        generator: (subject, [(predicate, object), ...]) tuples of IRIs, one per relation.
+    """
+    rel2patterns = relation_info["rel2patterns"]
+    rel2dom = relation_info["rel2dom"]
+    rel2range = relation_info["rel2range"]
+    rel2inverse = relation_info["rel2inverse"]
+    rel2superrel = relation_info["rel2superrel"]
+
+    for r in relation_info["relations"]:
+        patterns = rel2patterns.get(r, ())
+        predicate_objects = [(RDF_NS + "type", OWL_NS + "ObjectProperty")]
+
+        for pattern, property_type in PATTERN2PROPERTY_TYPE.items():
+            if pattern not in patterns:
+                continue
+            if pattern == "owl:Reflexive" and r in rel2dom and r in rel2range and rel2dom[r] == rel2range[r]:
+                continue
+            predicate_objects.append((RDF_NS + "type", property_type))
+
+        # https://oborel.github.io/obo-relations/reflexivity/: "Reflexivity is incompatible with domain and range assertions."
+        if "owl:Reflexive" not in patterns:
+            if r in rel2dom:
+                predicate_objects.append((RDFS_NS + "domain", SCHEMA + str(rel2dom[r])))
+            if r in rel2range:
+                predicate_objects.append((RDFS_NS + "range", SCHEMA + str(rel2range[r])))
+
+        if r in rel2inverse:
+            predicate_objects.append((OWL_NS + "inverseOf", SCHEMA + str(rel2inverse[r])))
+
+        if r in rel2superrel:
+            predicate_objects.append((RDFS_NS + "subPropertyOf", SCHEMA + str(rel2superrel[r])))
+
+        yield SCHEMA + str(r), predicate_objects
 
 
 class SchemaBuilder:
-    def __init__(self, class_info, relation_info, folder_name, format):
+    def __init__(self, class_info, relation_info, folder_name, format, profiler=None):
         """
         Initializes the SchemaBuilder class.
 
@@ -21,7 +121,8 @@ class SchemaBuilder:
             class_info (dict): A dictionary containing class information.
             relation_info (dict): A dictionary containing relation information.
             folder_name (str): The name of the folder to be created. If None, a folder with the current date and time will be created.
-            format (str): The format of the output file. Can be either "xml" or "ttl".
+            format (str): The format of the output file. Can be "xml", "ttl", "nt" or any other format supported by rdflib.
+            profiler (Profiler): The profiler of the generation. If None, a new one is created.
 
         Returns:
             None
@@ -29,6 +130,7 @@ class SchemaBuilder:
         self.class_info = class_info
         self.relation_info = relation_info
         self.format = format
+        self.profiler = profiler or Profiler()
         self.initialize_folder(folder_name)
         self.save_dict()
 
@@ -67,14 +169,14 @@ class SchemaBuilder:
 
         for k, v in self.relation_info.items():
             if k == "rel2patterns":
-                rel_info["rel2patterns"] = {r: list(p) for r, p in self.relation_info[k].items()}
+                rel_info["rel2patterns"] = {r: sorted(p) for r, p in self.relation_info[k].items()}
             elif k != "pattern2rels":
                 rel_info[k] = v
 
         with open(f"{self.directory}relation_info.json", "w") as file:
             json.dump(rel_info, file, indent=4)
 
-        class_dict = {k: list(v) if isinstance(v, set) else v for k, v in self.class_info.items()}
+        class_dict = {k: sorted(v) if isinstance(v, set) else v for k, v in self.class_info.items()}
 
         with open(f"{self.directory}class_info.json", "w") as file:
             json.dump(class_dict, file, indent=4)
@@ -83,11 +185,11 @@ class SchemaBuilder:
         """
         Initializes and builds the pipeline for creating the graph.
 
-        This function initializes a new graph object and sets up the necessary namespaces for ontology, RDF, and RDFS.
-        It binds the namespaces to the graph and adds the OWL ontology to the graph.
-        It also adds the CC0 license URI to the ontology.
-        After setting up the namespaces and ontology, it calls helper functions to add classes, relations, and test the schema.
-        Finally, it prints a message indicating that the schema has been created.
+        The schema axioms (ontology header, classes and relations) are generated straight from class_info
+        and relation_info. For the "xml", "ttl" and "nt" formats, they are streamed to the output file through
+        an RDFWriter, so memory use stays flat as the schema grows. Other formats fall back to building
+        an rdflib graph that is serialized at the end.
+        Finally, it runs the reasoner on the resulting schema and records its verdict.
 
         Args:
             self (object): The instance of the SchemaBuilder.
@@ -95,36 +197,42 @@ class SchemaBuilder:
         Returns:
             None
         """
-        self.graph = Graph()
-
-        owl = Namespace("http://www.w3.org/2002/07/owl")
-        rdf = Namespace("http://www.w3.org/1999/02/22-rdf-syntax-ns")
-        rdfs = Namespace("http://www.w3.org/2000/01/rdf-schema")
-        self.schema = Namespace("http://pygraf.t/")
+        with self.profiler.stage("write_schema"):
+            if self.format in STREAMING_FORMATS:
+                self.write_schema()
+            else:
+                self.graph = Graph()
+                self.graph.bind("owl", OWL)
+                self.graph.bind("rdf", RDF)
+                self.graph.bind("rdfs", RDFS)
+                self.graph.bind("sc", Namespace(SCHEMA))
+
+                self.add_axioms(ontology_axioms())
+                self.add_classes()
+                self.add_relations()
+
+                self.graph.serialize(self.get_schema_file(), format=self.format)
 
-        self.graph.bind("owl", owl)
-        self.graph.bind("rdf", rdf)
-        self.graph.bind("rdfs", rdfs)
-        self.graph.bind("sc", self.schema)
+        print(f"\nSchema created.")
 
-        ontology_uri = URIRef(self.schema)
-        self.graph.add((ontology_uri, RDF.type, OWL.Ontology))
-        cc0_license_uri = URIRef("https://creativecommons.org/publicdomain/zero/1.0/")
-        self.graph.add((URIRef(ontology_uri), URIRef("http://purl.org/dc/terms/license"), cc0_license_uri))
+        with self.profiler.stage("schema_reasoner"):
+            self.consistent = reasoner(resource_file=self.get_schema_file(), resource="schema")
 
-        self.add_classes()
-        self.add_relations()
+    def get_schema_file(self):
+        """
+        Returns the path of the schema file.
 
-        print(f"\nSchema created.")
+        Args:
+            self (object): The instance of the SchemaBuilder.
 
-        ontology_file = (
-            f"{self.directory}schema.rdf" if self.format == "xml" else f"{self.directory}schema.{self.format}"
-        )
-        reasoner(resource_file=ontology_file, resource="schema")
+        Returns:
+            str: The path of the schema file.
+        """
+        return f"{self.directory}schema.rdf" if self.format == "xml" else f"{self.directory}schema.{self.format}"
 
-    def add_classes(self):
+    def write_schema(self):
         """
-        Adds classes to the graph based on the given class info.
+        Streams the schema axioms to the schema file, without materializing any graph in memory.
 
         Args:
             self (object): The instance of the SchemaBuilder.
@@ -132,41 +240,69 @@ class SchemaBuilder:
         Returns:
             None
         """
-        classes = self.class_info["classes"]
-        class2superclass = self.class_info["direct_class2superclass"]
-        class2disjoints = self.class_info["class2disjoints"]
-
-        for c in tqdm(classes, desc="Writing classes", unit="classes", colour="red"):
-            class_URI = URIRef(self.schema + str(c))
+        with RDFWriter(self.get_schema_file(), self.format) as writer:
+            for subject, predicate_objects in ontology_axioms():
+                writer.write_subject(subject, predicate_objects)
+
+            for subject, predicate_objects in tqdm(
+                class_axioms(self.class_info),
+                total=len(self.class_info["classes"]),
+                desc="Writing classes",
+                unit="classes",
+                colour="red",
+            ):
+                writer.write_subject(subject, predicate_objects)
+            print("\n")
+
+            for subject, predicate_objects in tqdm(
+                relation_axioms(self.relation_info),
+                total=len(self.relation_info["relations"]),
+                desc="Writing relations",
+                unit="relations",
+                colour="red",
+            ):
+                writer.write_subject(subject, predicate_objects)
+            print("\n")
+
+    def add_axioms(self, axioms):
+        """
+        Adds axioms to the rdflib graph.
 
-            self.graph.add((class_URI, RDF.type, OWL.Class))
+        Args:
+            self (object): The instance of the SchemaBuilder.
+            axioms (iterable): An iterable of (subject, [(predicate, object), ...]) tuples of IRIs.
 
-            if c in class2superclass:
-                sp = class2superclass[c]
+        Returns:
+            None
+        """
+        for subject, predicate_objects in axioms:
+            for predicate, object in predicate_objects:
+                self.graph.add((URIRef(subject), URIRef(predicate), URIRef(object)))
 
-                if sp == "owl:Thing":
-                    self.graph.add((class_URI, RDFS.subClassOf, OWL.Thing))
-                else:
-                    self.graph.add((class_URI, RDFS.subClassOf, URIRef(self.schema + str(sp))))
+    def add_classes(self):
+        """
+        Adds classes to the rdflib graph based on the given class info.
 
-            if c in class2disjoints:
-                for c2 in class2disjoints[c]:
-                    self.graph.add((class_URI, OWL.disjointWith, URIRef(self.schema + str(c2))))
+        Args:
+            self (object): The instance of the SchemaBuilder.
 
+        Returns:
+            None
+        """
+        self.add_axioms(
+            tqdm(
+                class_axioms(self.class_info),
+                total=len(self.class_info["classes"]),
+                desc="Writing classes",
+                unit="classes",
+                colour="red",
+            )
+        )
         print("\n")
 
     def add_relations(self):
         """
-        Adds relations to the graph based on the provided relation information.
-
-        This function iterates through each relation and performs the following steps:
-        1. Creates a relation URI using the schema and the relation ID.
-        2. Adds the rdf:type property to the relation URI with a value of OWL.ObjectProperty.
-        3. If the relation has associated patterns, it adds the corresponding OWL property types to the relation URI.
-        4. If the relation is not reflexive, it adds the domain and range assertions to the relation URI.
-        5. If the relation has an inverse, it adds the inverseOf property to the relation URI.
-        6. If the relation has a superrelation, it adds the subPropertyOf property to the relation URI.
-        7. Serializes the graph to the specified output file.
+        Adds relations to the rdflib graph based on the provided relation information.
 
         Args:
             self (object): The instance of the SchemaBuilder.
@@ -174,65 +310,17 @@ class SchemaBuilder:
         Returns:
             None
         """
-        relations = self.relation_info["relations"]
-        rel2patterns = self.relation_info["rel2patterns"]
-        rel2dom = self.relation_info["rel2dom"]
-        rel2range = self.relation_info["rel2range"]
-        rel2inverse = self.relation_info["rel2inverse"]
-        rel2superrel = self.relation_info["rel2superrel"]
-
-        for r in tqdm(relations, desc="Writing relations", unit="relations", colour="red"):
-            relation_URI = URIRef(self.schema + str(r))
-
-            # rdf:type
-            self.graph.add((relation_URI, RDF.type, OWL.ObjectProperty))
-
-            if r in rel2patterns:
-                for object_property in rel2patterns[r]:
-                    if object_property == "owl:Symmetric":
-                        self.graph.add((relation_URI, RDF.type, OWL.SymmetricProperty))
-                    if object_property == "owl:Asymmetric":
-                        self.graph.add((relation_URI, RDF.type, OWL.AsymmetricProperty))
-                    if object_property == "owl:Reflexive":
-                        if r in rel2dom and r in rel2range:
-                            if rel2dom[r] == rel2range[r]:
-                                continue
-                            else:
-                                self.graph.add((relation_URI, RDF.type, OWL.ReflexiveProperty))
-                        else:
-                            self.graph.add((relation_URI, RDF.type, OWL.ReflexiveProperty))
-                    if object_property == "owl:Irreflexive":
-                        self.graph.add((relation_URI, RDF.type, OWL.IrreflexiveProperty))
-                    if object_property == "owl:Transitive":
-                        self.graph.add((relation_URI, RDF.type, OWL.TransitiveProperty))
-                    if object_property == "owl:Functional":
-                        self.graph.add((relation_URI, RDF.type, OWL.FunctionalProperty))
-                    if object_property == "owl:InverseFunctional":
-                        self.graph.add((relation_URI, RDF.type, OWL.InverseFunctionalProperty))
-
-            if r in rel2dom and "owl:Reflexive" not in rel2patterns[r]:
-                # https://oborel.github.io/obo-relations/reflexivity/: "Reflexivity is incompatible with domain and range assertions."
-                domain_URI = URIRef(self.schema + str(rel2dom[r]))
-                self.graph.add((relation_URI, RDFS.domain, domain_URI))
-
-            if r in rel2range and "owl:Reflexive" not in rel2patterns[r]:
-                # https://oborel.github.io/obo-relations/reflexivity/: "Reflexivity is incompatible with domain and range assertions."
-                range_URI = URIRef(self.schema + str(rel2range[r]))
-                self.graph.add((relation_URI, RDFS.range, range_URI))
-
-            if r in rel2inverse:
-                r_inv = URIRef(self.schema + str(rel2inverse[r]))
-                self.graph.add((relation_URI, OWL.inverseOf, r_inv))
-
-            if r in rel2superrel:
-                superrel = URIRef(self.schema + str(rel2superrel[r]))
-                self.graph.add((relation_URI, RDFS.subPropertyOf, superrel))
-
+        self.add_axioms(
+            tqdm(
+                relation_axioms(self.relation_info),
+                total=len(self.relation_info["relations"]),
+                desc="Writing relations",
+                unit="relations",
+                colour="red",
+            )
+        )
         print("\n")
 
-        output_file = f"{self.directory}schema.rdf" if self.format == "xml" else f"{self.directory}schema.{self.format}"
-        self.graph.serialize(output_file, format=self.format)
-
     def test_schema(self):
         """
         Tests the schema by loading the ontology file and running a reasoner.
@@ -243,10 +331,7 @@ class SchemaBuilder:
         Returns:
             None
         """
-        ontology_file = (
-            f"{self.directory}schema.rdf" if self.format == "xml" else f"{self.directory}schema.{self.format}"
-        )
-        ontology = get_ontology(ontology_file)
+        ontology = get_ontology(self.get_schema_file())
 
         try:
             with ontology.load():
@@ -1,5 +1,7 @@
 import pickle
 import json
+import importlib.util
+import numpy as np
 import pathlib
 from owlready2 import *
 from art import *
@@ -23,6 +25,58 @@ def print_ascii_header():
     print("\n")
 
 
+# pipeline stages drawing random numbers, each from its own independent stream
+STAGES = ["classes", "relations", "kg", "negatives"]
+
+
+def get_stage_rngs(seed=None):
+    """
+    Creates one random generator (PCG64) per pipeline stage, all derived from the same seed.
+    Streams are spawned in a fixed order, so that a stage always gets the same stream for a given seed,
+    whether or not the other stages are run.
+
+    Args:
+        seed (int): The seed. If None, fresh entropy is drawn from the OS.
+
+    Returns:
+        dict: A dictionary mapping each stage to its numpy.random.Generator.
+    """
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(STAGES))
+    return {stage: np.random.Generator(np.random.PCG64(ss)) for stage, ss in zip(STAGES, seed_sequences)}
+
+
+def random_choice(rng, seq):
+    """
+    Returns a random element of a non-empty sequence.
+    Much faster than rng.choice on Python lists, which converts the whole list to an array on each call.
+
+    Args:
+        rng (numpy.random.Generator): The random generator.
+        seq (list): The sequence.
+
+    Returns:
+        object: The selected element.
+    """
+    return seq[rng.integers(len(seq))]
+
+
+def random_sample(rng, seq, k):
+    """
+    Returns k distinct random elements of a sequence.
+    The sequence must be in a reproducible order (e.g. not built from a set of strings),
+    since the result depends on the position of each element.
+
+    Args:
+        rng (numpy.random.Generator): The random generator.
+        seq (list): The sequence.
+        k (int): The number of elements to select.
+
+    Returns:
+        list: The selected elements.
+    """
+    return [seq[i] for i in rng.choice(len(seq), size=k, replace=False)]
+
+
 def initialize_folder(folder_name):
     """
     Initializes a folder for output files.
@@ -101,6 +155,7 @@ def check_schema_arguments(config):
     Raises:
         AssertionError: If the proportions of owl:Asymmetric and owl:Symmetric relations sum to more than 1,
                         or if the proportions of owl:Irreflexive and owl:Reflexive relations sum to more than 1.
+        AssertionError: If the average disjointness is set higher than 0.5.
         AssertionError: If the current PyGraft version does not handle rdfs:subPropertyOf, owl:FunctionalProperty,
                         and owl:InverseFunctionalProperty at the same time.
 
@@ -116,6 +171,9 @@ def check_schema_arguments(config):
     assert (
         config["avg_class_depth"] < config["max_hierarchy_depth"]
     ), "The average class depth value cannot be set higher than the class hierarchy depth."
+    assert (
+        config["avg_disjointness"] <= 0.5
+    ), "The average disjointness cannot be set higher than 0.5, i.e. every class being disjoint with another class."
 
     assert (
         config["prop_subproperties"] == 0.0
@@ -145,6 +203,40 @@ def check_kg_arguments(config):
     if config["multityping"] == False:
         config["avg_multityping"] = 1.0
 
+    assert (
+        config.get("time_budget_s") is None or config["time_budget_s"] > 0
+    ), "The time budget must be strictly positive, or null for no time limit."
+
+    assert (
+        config.get("checkpoint_every") is None or config["checkpoint_every"] > 0
+    ), "The checkpoint interval must be a strictly positive number of triples, or null to disable checkpoints."
+
+    assert config.get("id_format") in [None, "tsv", "npy"], "The ID export format must be 'tsv', 'npy' or null."
+
+    assert config.get("split_ratios") is None or (
+        len(config["split_ratios"]) == 3
+        and min(config["split_ratios"]) >= 0
+        and abs(sum(config["split_ratios"]) - 1) < 1e-6
+    ), "The split ratios must be 3 non-negative proportions (train, valid, test) summing up to 1, or null."
+
+    assert config.get("num_output_shards") is None or (
+        isinstance(config["num_output_shards"], int) and config["num_output_shards"] > 0
+    ), "The number of output shards must be a strictly positive integer, or null to write a single file."
+
+    assert config.get("output_compression") in [
+        None,
+        "gzip",
+        "zstd",
+    ], "The output compression must be 'gzip', 'zstd' or null."
+
+    assert config.get("output_compression") is None or config.get(
+        "num_output_shards"
+    ), "Output compression only applies to sharded outputs: set num_output_shards."
+
+    assert config.get("output_compression") != "zstd" or importlib.util.find_spec(
+        "zstandard"
+    ), "zstd compression requires the zstandard package (pip install zstandard)."
+
     # Define default value to run pygraft.utils.reasoner
     if "kg_check_reasoner" in config.keys():
         print(f"\nkg_check_reasoner {config['kg_check_reasoner']}.\n")
@@ -165,7 +257,7 @@ def reasoner(resource_file=None, infer_property_values=False, debug=False, keep_
         resource (str): The name of the resource.
 
     Returns:
-        None
+        bool: Whether the resource is consistent.
     """
     graph = get_ontology(resource_file).load()
     try:
@@ -174,9 +266,11 @@ def reasoner(resource_file=None, infer_property_values=False, debug=False, keep_
         )
         print(f"\nConsistent {resource}.\n")
         graph.destroy()
+        return True
     except OwlReadyInconsistentOntologyError:
         print(f"\nInconsistent {resource}.\n")
         graph.destroy()
+        return False
 
 
 def save_dict_to_text(data_dict, file_path):
@@ -232,18 +326,17 @@ def save_set_uris_to_text(set_uris, file_path):
 
 def save_set_ids_to_text(set_ids, file_path):
     """
-    Saves a set of triples to a text file.
+    Saves a set of triples to a text file, through a large write buffer.
 
     Args:
-        set_ids (set): The set of triples to be saved.
+        set_ids (iterable): The triples to be saved.
         file_path (str): The path to the file.
 
     Returns:
         None
     """
-    with open(file_path, "w") as file:
-        for t in set_ids:
-            file.write(f"""{t[0]}\t{t[1]}\t{t[2]}\n""")
+    with open(file_path, "w", buffering=1 << 20) as file:
+        file.writelines(f"{t[0]}\t{t[1]}\t{t[2]}\n" for t in set_ids)
 
 
 def load_json(file_path):
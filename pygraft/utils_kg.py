@@ -1,13 +1,14 @@
 import numpy as np
 
 
-def generate_weight_vector(size, spread):
+def generate_weight_vector(size, spread, rng=None):
     """
     Generates a weight vector of size `size` with random values between 0 and 1.
 
     Args:
         size (int): The size of the weight vector.
         spread (float): The spread of the weight vector.
+        rng (numpy.random.Generator): The random generator. If None, an unseeded one is created.
 
     Returns:
         A weight vector of size `size` with random values between 0 and 1.
@@ -15,7 +16,8 @@ def generate_weight_vector(size, spread):
     if not 0 <= spread <= 1:
         raise ValueError("Spread parameter must be between 0 and 1.")
 
-    weights = [np.random.rand() for _ in range(size)]
+    rng = rng or np.random.default_rng()
+    weights = rng.random(size).tolist()
     total_weight = sum(weights)
     weights = [weight / total_weight for weight in weights]
     balanced_weights = [weight * (1 - spread) + (spread / size) for weight in weights]
@@ -23,7 +25,7 @@ def generate_weight_vector(size, spread):
     return balanced_weights
 
 
-def generate_random_numbers(mean, std_dev, size):
+def generate_random_numbers(mean, std_dev, size, rng=None):
     """
     Generates random numbers from a normal distribution with mean `mean` and standard deviation `std_dev`.
 
@@ -31,12 +33,14 @@ def generate_random_numbers(mean, std_dev, size):
         mean (float): The mean of the normal distribution.
         std_dev (float): The standard deviation of the normal distribution.
         size (int): The size of the output array.
+        rng (numpy.random.Generator): The random generator. If None, an unseeded one is created.
     
     Returns:
         An array of random numbers from a normal distribution with mean `mean` and standard deviation `std_dev`.
     """
     # Generate random numbers from a normal distribution
-    numbers = np.random.normal(mean, std_dev, size)
+    rng = rng or np.random.default_rng()
+    numbers = rng.normal(mean, std_dev, size)
     # Normalize the numbers so their sum is equal to 1
     normalized_numbers = numbers / np.sum(numbers)
     # Clip the numbers between a small positive value and 1
@@ -169,3 +173,195 @@ def filter_symmetric(arr):
         if row.tolist() not in result and row[::-1].tolist() not in result:
             result.append(row.tolist())
     return np.array(result)
+
+
+def redistribute_budgets(budgets, capacities):
+    """
+    Caps budgets by capacities and redistributes the excess among the uncapped entries,
+    proportionally to their budgets (or to their remaining capacities if none of them had a budget),
+    until either all the excess is redistributed or every entry is capped.
+
+    Args:
+        budgets (list): The initial budgets.
+        capacities (list): The maximum budget of each entry.
+
+    Returns:
+        np.ndarray: The redistributed budgets.
+    """
+    budgets = np.asarray(budgets, dtype=float)
+    capacities = np.asarray(capacities, dtype=float)
+    allocated = np.minimum(budgets, capacities)
+    excess = budgets.sum() - allocated.sum()
+
+    while excess > 1e-9:
+        uncapped = allocated < capacities
+        if not uncapped.any():
+            break
+
+        shares = np.where(uncapped, budgets, 0.0)
+        if shares.sum() == 0:
+            shares = np.where(uncapped, capacities - allocated, 0.0)
+
+        new_allocated = np.minimum(allocated + excess * shares / shares.sum(), capacities)
+        excess -= (new_allocated - allocated).sum()
+        allocated = new_allocated
+
+    return allocated
+
+
+def build_alias_table(weights):
+    """
+    Builds the probability and alias tables of Walker's alias method (Vose's variant), in O(n).
+
+    Args:
+        weights (np.ndarray): The non-negative weights of the n outcomes.
+
+    Returns:
+        tuple: The probability table (np.ndarray of floats) and the alias table (np.ndarray of ints).
+    """
+    n = len(weights)
+    scaled = (weights * (n / weights.sum())).tolist()
+    prob = [1.0] * n
+    alias = list(range(n))
+    small = [i for i, w in enumerate(scaled) if w < 1.0]
+    large = [i for i, w in enumerate(scaled) if w >= 1.0]
+
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] += scaled[s] - 1.0
+        (small if scaled[l] < 1.0 else large).append(l)
+
+    # outcomes left in either list (up to rounding errors) are always accepted, i.e. prob = 1
+    return np.array(prob), np.array(alias)
+
+
+class AliasSampler:
+    def __init__(self, weights=None, rng=None, size=None, batch_size=1024):
+        """
+        Initializes a weighted sampler based on Walker's alias method.
+        After an O(n) setup, each draw costs O(1), whatever the skewness of the weights.
+        Draws are generated by batches and buffered, so that drawing one index at a time stays cheap.
+
+        Args:
+            self (object): The instance of the AliasSampler.
+            weights (list): The non-negative weights of the outcomes. If None, outcomes are uniformly distributed.
+            rng (numpy.random.Generator): The random generator. If None, an unseeded one is created.
+            size (int): The number of outcomes, only needed when weights is None.
+            batch_size (int): The number of indices drawn at once to fill the buffer.
+
+        Raises:
+            ValueError: If there is no outcome, or if the weights are negative or sum up to 0.
+
+        Returns:
+            None
+        """
+        self.rng = rng or np.random.default_rng()
+        self.batch_size = batch_size
+
+        if weights is None:
+            self.size = size
+            self.prob, self.alias = None, None
+        else:
+            weights = np.asarray(weights, dtype=float)
+            if (weights < 0).any() or not weights.sum() > 0:
+                raise ValueError("Weights must be non-negative and sum up to a positive value.")
+            self.size = len(weights)
+            self.prob, self.alias = build_alias_table(weights)
+
+        if not self.size:
+            raise ValueError("Cannot sample from an empty set of outcomes.")
+
+        self.buffer = np.empty(0, dtype=np.int64)
+        self.position = 0
+
+    def sample_batch(self, k):
+        """
+        Draws k indices.
+
+        Args:
+            self (object): The instance of the AliasSampler.
+            k (int): The number of indices to draw.
+
+        Returns:
+            np.ndarray: The drawn indices.
+        """
+        indices = self.rng.integers(self.size, size=k)
+
+        if self.prob is not None:
+            accepted = self.rng.random(k) < self.prob[indices]
+            indices = np.where(accepted, indices, self.alias[indices])
+
+        return indices
+
+    def sample(self):
+        """
+        Draws one index.
+
+        Args:
+            self (object): The instance of the AliasSampler.
+
+        Returns:
+            int: The drawn index.
+        """
+        if self.position == len(self.buffer):
+            self.buffer = self.sample_batch(self.batch_size)
+            self.position = 0
+
+        self.position += 1
+
+        return int(self.buffer[self.position - 1])
+
+
+def zipf_weights(size, skew, rng=None):
+    """
+    Generates Zipf-like popularity weights: the outcome of rank k has weight 1 / k^skew.
+    Ranks are randomly assigned to outcomes.
+
+    Args:
+        size (int): The number of outcomes.
+        skew (float): The Zipf exponent. 0 gives uniform weights; the higher, the more skewed.
+        rng (numpy.random.Generator): The random generator. If None, an unseeded one is created.
+
+    Returns:
+        np.ndarray: The weights.
+    """
+    rng = rng or np.random.default_rng()
+    ranks = rng.permutation(size) + 1
+
+    return ranks.astype(float) ** -skew
+
+
+def splitmix64(x):
+    """
+    Hashes 64-bit unsigned integers with the SplitMix64 finalizer, element-wise.
+
+    Args:
+        x (np.ndarray): The integers, as np.uint64.
+
+    Returns:
+        np.ndarray: The hashes, as np.uint64.
+    """
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+
+    return x ^ (x >> np.uint64(31))
+
+
+def hash_triples(triples, salt=0):
+    """
+    Hashes integer triples into well-mixed 64-bit values, which do not depend on the order of the triples.
+
+    Args:
+        triples (np.ndarray): The triples, of shape (n, 3).
+        salt (int): A value mixed into every hash, e.g. to vary the hashes with the random seed.
+
+    Returns:
+        np.ndarray: The hashes, as np.uint64.
+    """
+    hashes = splitmix64(triples[:, 0].astype(np.uint64) ^ np.uint64(salt))
+    hashes = splitmix64(hashes ^ triples[:, 1].astype(np.uint64))
+
+    return splitmix64(hashes ^ triples[:, 2].astype(np.uint64))
@@ -1,3 +1,4 @@
+import numpy as np
 from collections import defaultdict
 
 
@@ -185,3 +186,34 @@ def generate_class2layer(layer2classes):
             class2layer[c] = layer
 
     return class2layer
+
+
+def masks_to_indices(masks, num_bits, chunk_size=1024):
+    """
+    Decodes integer bitsets into the positions of their set bits.
+    Bitsets are unpacked by chunks of rows with NumPy rather than bit by bit.
+
+    Args:
+        masks (list): The bitsets, where bit i stands for the class of index i.
+        num_bits (int): The number of bits of each bitset, i.e. the number of classes.
+        chunk_size (int): The number of bitsets decoded at once.
+
+    Returns:
+        list: A list containing the sorted positions of the set bits of each bitset.
+    """
+    row_words = (num_bits + 63) // 64
+    decoded = []
+
+    for start in range(0, len(masks), chunk_size):
+        chunk = masks[start : start + chunk_size]
+        buffer = b"".join(mask.to_bytes(8 * row_words, "little") for mask in chunk)
+        packed = np.frombuffer(buffer, dtype="<u8").reshape(len(chunk), row_words)
+        # only unpack the non-zero 64-bit words, which keeps sparse bitsets cheap
+        word_rows, word_cols = np.nonzero(packed)
+        words = packed[word_rows, word_cols].view(np.uint8).reshape(-1, 8)
+        set_words, offsets = np.nonzero(np.unpackbits(words, axis=1, bitorder="little"))
+        rows, positions = word_rows[set_words], word_cols[set_words] * 64 + offsets
+        bounds = np.searchsorted(rows, np.arange(1, len(chunk)))
+        decoded.extend(indices.tolist() for indices in np.split(positions, bounds))
+
+    return decoded
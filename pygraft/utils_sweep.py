@@ -0,0 +1,128 @@
+import csv
+import itertools
+import json
+import os
+from pygraft.cache import SCHEMA_PARAMS
+from pygraft.utils import load_config
+
+RESULTS_FILE = "results.csv"
+
+# the schemas of the sweep, set in each worker process by init_sweep_worker
+_schemas = {}
+
+
+def load_sweep(path):
+    """
+    Loads a sweep specification and expands it into the configurations of its runs.
+    A sweep specification is a JSON or YAML file with the following keys:
+        - base: the path of the base configuration file, relative to the specification file;
+        - schemas: a list of overrides of the base configuration, one per schema (default: [{}]);
+        - kgs: a list of overrides of the base configuration, one per KG (default: [{}]);
+        - num_workers: the number of KGs generated in parallel (default: the number of CPUs);
+        - sweep_name: the name of the output folder (default: the name of the specification file).
+    Every schema is paired with every KG. Overrides may be named with a "name" key
+    (default: S1, S2, ... for schemas and G1, G2, ... for KGs).
+
+    Args:
+        path (str): The path of the sweep specification.
+
+    Returns:
+        tuple: The sweep specification (dict) and the configuration of each run (list of dict).
+    """
+    spec = load_config(path)
+    base = load_config(os.path.join(os.path.dirname(os.path.abspath(path)), spec["base"]))
+    spec.setdefault("sweep_name", os.path.splitext(os.path.basename(path))[0])
+
+    schemas = [dict(s) for s in spec.get("schemas") or [{}]]
+    kgs = [dict(k) for k in spec.get("kgs") or [{}]]
+    for i, s in enumerate(schemas):
+        s.setdefault("name", f"S{i + 1}")
+    for i, k in enumerate(kgs):
+        k.setdefault("name", f"G{i + 1}")
+
+    runs = []
+    for s, k in itertools.product(schemas, kgs):
+        config = {**base, **s, **k}
+        config["schema_label"], config["kg_label"] = s["name"], k["name"]
+        del config["name"]
+        runs.append(config)
+
+    return spec, runs
+
+
+def get_schema_signature(config):
+    """
+    Returns the parameters which determine a schema, so that runs sharing a schema can be grouped.
+
+    Args:
+        config (dict): The configuration dictionary.
+
+    Returns:
+        str: The signature of the schema.
+    """
+    return json.dumps({p: config.get(p) for p in SCHEMA_PARAMS + ["seed"]}, sort_keys=True, default=str)
+
+
+def load_schema(schema_directory):
+    """
+    Reads the class and relation information of a schema.
+
+    Args:
+        schema_directory (str): The folder containing the schema files.
+
+    Returns:
+        tuple: The class information (dict) and the relation information (dict).
+    """
+    with open(os.path.join(schema_directory, "class_info.json"), "r") as file:
+        class_info = json.load(file)
+    with open(os.path.join(schema_directory, "relation_info.json"), "r") as file:
+        relation_info = json.load(file)
+
+    return class_info, relation_info
+
+
+def init_sweep_worker(schemas):
+    """
+    Initializes a worker process of a sweep with the schemas of the sweep.
+    Each worker receives its own copy of the schemas once, when it starts, instead of once per run.
+
+    Args:
+        schemas (dict): The class and relation information of each schema, by schema folder.
+
+    Returns:
+        None
+    """
+    global _schemas
+    _schemas = schemas
+
+
+def get_sweep_schema(schema_directory):
+    """
+    Returns the class and relation information of a schema, as received by the current worker process.
+
+    Args:
+        schema_directory (str): The folder containing the schema files.
+
+    Returns:
+        tuple: The class information (dict) and the relation information (dict).
+    """
+    return _schemas[schema_directory]
+
+
+def save_results(results, results_file):
+    """
+    Writes the results of a sweep to a CSV file, one row per run.
+
+    Args:
+        results (list): The results of each run.
+        results_file (str): The path of the CSV file.
+
+    Returns:
+        None
+    """
+    fieldnames = list(dict.fromkeys(key for result in results for key in result))
+
+    with open(results_file, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(results)
@@ -39,6 +39,9 @@ setup(
       'art',
       'tqdm'
       ],
+  extras_require={
+      'zstd': ['zstandard'],
+  },
   python_requires='>=3.7',
   classifiers=[
     'Development Status :: 4 - Beta',
@@ -0,0 +1,104 @@
+import os
+import pytest
+import pygraft
+from pygraft.class_generator import ClassGenerator
+from pygraft.relation_generator import RelationGenerator
+from pygraft.schema_constructor import SchemaBuilder
+from pygraft.pygraft import get_instance_generator
+from pygraft.utils import load_config, get_stage_rngs
+
+TEMPLATE_FILE = os.path.join(os.path.dirname(pygraft.__file__), "examples", "template.yml")
+
+CLASS_PARAMS = ["num_classes", "max_hierarchy_depth", "avg_class_depth", "class_inheritance_ratio", "avg_disjointness"]
+RELATION_PARAMS = [
+    "num_relations",
+    "relation_specificity",
+    "prop_profiled_relations",
+    "profile_side",
+    "prop_symmetric_relations",
+    "prop_inverse_relations",
+    "prop_functional_relations",
+    "prop_transitive_relations",
+    "prop_subproperties",
+    "prop_reflexive_relations",
+    "prop_irreflexive_relations",
+    "prop_asymmetric_relations",
+    "prop_inverse_functional_relations",
+]
+
+
+def make_config(**overrides):
+    """
+    Returns a small, seeded configuration based on the template, writing N-Triples without the KG reasoner.
+
+    Args:
+        overrides (dict): The parameters to override.
+
+    Returns:
+        dict: The configuration dictionary.
+    """
+    config = load_config(TEMPLATE_FILE)
+    config.update(
+        schema_name="test",
+        format="nt",
+        seed=42,
+        verbose=False,
+        num_classes=20,
+        num_relations=20,
+        num_entities=500,
+        num_triples=3000,
+        kg_check_reasoner=False,
+    )
+    config.update(overrides)
+
+    return config
+
+
+def build_schema(config):
+    """
+    Generates the schema of a configuration to its output folder, as `generate_schema` does
+    but without running the reasoner, which requires Java.
+
+    Args:
+        config (dict): The configuration dictionary.
+
+    Returns:
+        None
+    """
+    rngs = get_stage_rngs(config["seed"])
+    class_info = ClassGenerator(
+        **{p: config[p] for p in CLASS_PARAMS}, verbose=False, rng=rngs["classes"]
+    ).generate_class_schema()
+    relation_info = RelationGenerator(
+        class_info=class_info, **{p: config[p] for p in RELATION_PARAMS}, verbose=False, rng=rngs["relations"]
+    ).generate_relation_schema()
+    SchemaBuilder(class_info, relation_info, config["schema_name"], config["format"]).write_schema()
+
+
+def generate_kg(config, **kwargs):
+    """
+    Generates the KG of a configuration from the schema in its output folder.
+
+    Args:
+        config (dict): The configuration dictionary.
+        kwargs (dict): Additional arguments of the InstanceGenerator, e.g. resume.
+
+    Returns:
+        InstanceGenerator: The instance generator, once the KG is generated.
+    """
+    instance_generator = get_instance_generator(config, **kwargs)
+    instance_generator.generate_kg()
+
+    return instance_generator
+
+
+@pytest.fixture
+def schema_config(tmp_path, monkeypatch):
+    """
+    Returns the configuration of a schema generated in a temporary working directory.
+    """
+    monkeypatch.chdir(tmp_path)
+    config = make_config()
+    build_schema(config)
+
+    return config
@@ -0,0 +1,100 @@
+import os
+import pytest
+from pygraft.cache import ArtifactCache, get_kg_files
+from pygraft.kg_generator import InstanceGenerator
+from pygraft.pygraft import get_cache, run_kg_generation
+
+
+@pytest.fixture
+def generations(monkeypatch):
+    """
+    Records the configuration of each KG actually generated, i.e. not restored from the cache.
+    """
+    generate_kg = InstanceGenerator.generate_kg
+    generated = []
+
+    def recorded_generate_kg(self):
+        generated.append(self.num_triples)
+        generate_kg(self)
+
+    monkeypatch.setattr(InstanceGenerator, "generate_kg", recorded_generate_kg)
+
+    return generated
+
+
+def read_kg_files(config):
+    directory = f"output/{config['schema_name']}/"
+    files = {}
+    for file_name in get_kg_files(config):
+        with open(os.path.join(directory, file_name), "rb") as file:
+            files[file_name] = file.read()
+
+    return files
+
+
+def test_identical_config_restores_identical_files(schema_config, generations):
+    schema_config.update(kg_store=True, split_ratios=[0.8, 0.1, 0.1])
+    cache = ArtifactCache()
+    run_kg_generation(schema_config, cache=cache)
+    generated_files = read_kg_files(schema_config)
+    for file_name in generated_files:
+        os.remove(f"output/{schema_config['schema_name']}/{file_name}")
+
+    run_kg_generation(dict(schema_config), cache=cache)
+
+    assert generations == [schema_config["num_triples"]]
+    assert read_kg_files(schema_config) == generated_files
+
+
+def test_changed_kg_parameter_misses(schema_config, generations):
+    cache = ArtifactCache()
+    run_kg_generation(schema_config, cache=cache)
+
+    run_kg_generation(dict(schema_config, num_triples=2000), cache=cache)
+
+    assert generations == [3000, 2000]
+
+
+def test_changed_schema_file_misses(schema_config, generations):
+    cache = ArtifactCache()
+    directory = f"output/{schema_config['schema_name']}/"
+    key = cache.kg_key(schema_config, directory)
+    run_kg_generation(schema_config, cache=cache)
+
+    with open(f"{directory}schema.nt", "a") as file:
+        file.write("<http://pygraf.t/C1> <http://www.w3.org/2000/01/rdf-schema#comment> <http://pygraf.t/changed> .\n")
+    run_kg_generation(schema_config, cache=cache)
+
+    assert cache.kg_key(schema_config, directory) != key
+    assert len(generations) == 2
+
+
+def test_unseeded_and_time_budget_runs_bypass_cache(schema_config, generations):
+    assert get_cache(dict(schema_config, cache=True, seed=None)) is None
+    assert isinstance(get_cache(dict(schema_config, cache=True)), ArtifactCache)
+
+    cache = ArtifactCache()
+    config = dict(schema_config, time_budget_s=60)
+    run_kg_generation(config, cache=cache)
+    run_kg_generation(config, cache=cache)
+
+    assert len(generations) == 2
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_evict_removes_least_recently_used_entries(tmp_path):
+    artifacts = tmp_path / "artifacts"
+    artifacts.mkdir()
+    (artifacts / "kg.nt").write_bytes(b"0" * 400_000)
+    cache = ArtifactCache(cache_dir=str(tmp_path / "cache"), max_size_mb=1)
+
+    cache.store("first", str(artifacts), ["kg.nt"])
+    cache.store("second", str(artifacts), ["kg.nt"])
+    os.utime(os.path.join(cache.cache_dir, "first"), (100, 100))
+    os.utime(os.path.join(cache.cache_dir, "second"), (200, 200))
+    # loading an entry makes it the most recently used one
+    assert cache.load("first", str(tmp_path / "restored")) is not None
+
+    cache.store("third", str(artifacts), ["kg.nt"])
+
+    assert sorted(os.listdir(cache.cache_dir)) == ["first", "third"]
@@ -0,0 +1,32 @@
+import pytest
+from pygraft.kg_generator import InstanceGenerator
+from conftest import generate_kg
+
+
+class Interruption(Exception):
+    pass
+
+
+def test_resume_equals_uninterrupted_run(schema_config, monkeypatch):
+    schema_config["checkpoint_every"] = 500
+    kg_file = f"output/{schema_config['schema_name']}/full_graph.nt"
+    generate_kg(schema_config)
+    with open(kg_file, "rb") as file:
+        uninterrupted = file.read()
+
+    save_checkpoint = InstanceGenerator.save_checkpoint
+    num_checkpoints = []
+
+    def interrupted_save_checkpoint(self):
+        save_checkpoint(self)
+        num_checkpoints.append(1)
+        if len(num_checkpoints) == 3:
+            raise Interruption()
+
+    with monkeypatch.context() as patch, pytest.raises(Interruption):
+        patch.setattr(InstanceGenerator, "save_checkpoint", interrupted_save_checkpoint)
+        generate_kg(schema_config)
+
+    generate_kg(schema_config, resume=True)
+    with open(kg_file, "rb") as file:
+        assert file.read() == uninterrupted
@@ -0,0 +1,47 @@
+import pytest
+from pygraft.kg_store import KGStore, CompactTripleSet
+from pygraft.pygraft import get_instance_generator
+from conftest import generate_kg
+
+
+def test_extend_kg_only_appends(schema_config):
+    schema_config["kg_store"] = True
+    generate_kg(schema_config)
+    directory = f"output/{schema_config['schema_name']}/"
+    with open(f"{directory}full_graph.nt", "rb") as file:
+        base_file = file.read()
+    store = KGStore(f"{directory}kg_store/")
+    _, base_triples, _, _ = store.load()
+
+    extension_config = dict(schema_config, num_entities=600, num_triples=4000)
+    get_instance_generator(extension_config).extend_kg()
+
+    typings, triples, _, shards = store.load()
+    with open(f"{directory}full_graph.nt", "rb") as file:
+        assert file.read() == base_file
+    assert [shard["file"] for shard in shards] == ["full_graph.nt", "full_graph_1.nt"]
+    assert (triples[: len(base_triples)] == base_triples).all()
+    assert len(triples) > len(base_triples)
+    assert not {tuple(t) for t in base_triples.tolist()} & {tuple(t) for t in triples[len(base_triples) :].tolist()}
+    assert sum(len(typing["entities"]) for typing in typings) == 600
+
+
+def test_extend_kg_requires_store(schema_config):
+    generate_kg(schema_config)
+
+    with pytest.raises(ValueError, match="kg_store"):
+        get_instance_generator(dict(schema_config, num_triples=4000)).extend_kg()
+
+
+def test_compact_triple_set_matches_set():
+    triples = [(f"E{h}", f"R{r}", f"E{t}") for h in range(1, 30) for r in range(3) for t in range(1, 30, 7)]
+    compact = CompactTripleSet(30, 3, min_buffer_size=8)
+    seen = set()
+
+    for triple in triples + triples[::3]:
+        assert (triple in compact) == (triple in seen)
+        compact.add(triple)
+        seen.add(triple)
+        assert len(compact) == len(seen)
+
+    assert ("E1", "R0", "E2") not in compact
@@ -0,0 +1,42 @@
+import json
+from pygraft.kg_generator import InstanceGenerator
+from conftest import generate_kg
+
+SCHEMA = "http://pygraf.t/"
+
+
+def read_instance_triples(kg_file):
+    triples = set()
+    with open(kg_file, "r") as file:
+        for line in file:
+            h, r, t = (term[1:-1] for term in line.split()[:3])
+            if h.startswith(SCHEMA + "E") and r.startswith(SCHEMA + "R"):
+                triples.add((h[len(SCHEMA) :], r[len(SCHEMA) :], t[len(SCHEMA) :]))
+
+    return triples
+
+
+def test_kg_written_during_generation(schema_config):
+    instance_generator = generate_kg(schema_config)
+    directory = f"output/{schema_config['schema_name']}/"
+
+    assert read_instance_triples(f"{directory}full_graph.nt") == instance_generator.kg
+    with open(f"{directory}profile.json", "r") as file:
+        stages = json.load(file)["kg"]["stages"]
+    record = next(stage for stage in stages if stage["name"] == "write_kg")
+    saved_time = record["serial_write_time_s"] - record["write_wall_time_s"]
+    assert abs(record["overlap_saved_time_s"] - saved_time) < 1e-3
+
+
+def test_kg_written_again_if_checks_remove_triples(schema_config, monkeypatch):
+    run_checks = InstanceGenerator.run_checks
+
+    def lossy_run_checks(self):
+        run_checks(self)
+        self.kg.discard(min(self.kg))
+
+    monkeypatch.setattr(InstanceGenerator, "run_checks", lossy_run_checks)
+    instance_generator = generate_kg(schema_config)
+
+    kg_file = f"output/{schema_config['schema_name']}/full_graph.nt"
+    assert read_instance_triples(kg_file) == instance_generator.kg
@@ -0,0 +1,38 @@
+import json
+import pytest
+import numpy as np
+from pygraft.kg_store import KGStore
+from pygraft.negative_sampler import MODES, NegativeSampler
+from conftest import generate_kg
+
+
+@pytest.fixture
+def sampler_and_triples(schema_config):
+    schema_config["kg_store"] = True
+    generate_kg(schema_config)
+    directory = f"output/{schema_config['schema_name']}/"
+    with open(f"{directory}class_info.json", "r") as file:
+        class_info = json.load(file)
+    with open(f"{directory}relation_info.json", "r") as file:
+        relation_info = json.load(file)
+    typings, triples, _, _ = KGStore(f"{directory}kg_store/").load()
+
+    return NegativeSampler(class_info, relation_info, typings, triples, rng=np.random.default_rng(0)), triples
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_filtered_negatives_are_never_positives(sampler_and_triples, mode):
+    sampler, triples = sampler_and_triples
+    positives = {tuple(t) for t in triples.tolist()}
+
+    negatives = sampler.sample(triples, mode=mode, num_negatives=5)
+
+    assert len(negatives) > 0
+    assert not {tuple(t) for t in negatives.tolist()} & positives
+
+
+def test_unknown_mode_raises(sampler_and_triples):
+    sampler, triples = sampler_and_triples
+
+    with pytest.raises(ValueError, match="mode"):
+        sampler.sample(triples, mode="hard")
@@ -0,0 +1,47 @@
+import pytest
+from pygraft.class_generator import ClassGenerator
+from pygraft.relation_generator import RelationGenerator
+from pygraft.utils import get_stage_rngs
+from conftest import CLASS_PARAMS, RELATION_PARAMS, make_config
+
+
+def generate_class_info(config):
+    return ClassGenerator(
+        **{p: config[p] for p in CLASS_PARAMS}, verbose=False, rng=get_stage_rngs(config["seed"])["classes"]
+    ).generate_class_schema()
+
+
+def make_relation_generator(config, class_info):
+    return RelationGenerator(
+        class_info=class_info,
+        **{p: config[p] for p in RELATION_PARAMS},
+        verbose=False,
+        rng=get_stage_rngs(config["seed"])["relations"],
+    )
+
+
+def test_class_disjoint_with_every_other_class_raises():
+    config = make_config()
+    class_info = generate_class_info(config)
+    # a subclass disjoint with every other class, its superclass included, has no instance and no compatible range
+    c = next(c for c in class_info["classes"] if class_info["class2layer"][c] > 1)
+    class2disjoints_extended = class_info["class2disjoints_extended"]
+    class2disjoints_extended[c] = [other for other in class_info["classes"] if other != c]
+    for other in class2disjoints_extended[c]:
+        class2disjoints_extended[other] = class2disjoints_extended.get(other, []) + [c]
+
+    with pytest.raises(ValueError, match=f"Every class is disjoint with {c}"):
+        make_relation_generator(config, class_info).generate_relation_schema()
+
+
+def test_relation_specificity_above_hierarchy_depth():
+    config = make_config()
+    class_info = generate_class_info(config)
+    config["relation_specificity"] = class_info["hierarchy_depth"] + 2
+
+    relation_info = make_relation_generator(config, class_info).generate_relation_schema()
+
+    classes = set(class_info["classes"])
+    assert relation_info["rel2dom"] or relation_info["rel2range"]
+    assert set(relation_info["rel2dom"].values()) <= classes
+    assert set(relation_info["rel2range"].values()) <= classes
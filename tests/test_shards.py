@@ -0,0 +1,43 @@
+import os
+import json
+import gzip
+import hashlib
+from pygraft.rdf_writer import SHARD_MANIFEST_FILE
+from conftest import generate_kg
+
+
+def load_manifest(config):
+    kg_folder = f"output/{config['schema_name']}/full_graph/"
+    with open(os.path.join(kg_folder, SHARD_MANIFEST_FILE), "r") as file:
+        return kg_folder, json.load(file)
+
+
+def test_shard_manifest_matches_files(schema_config):
+    schema_config.update(num_output_shards=4, output_compression="gzip")
+    instance_generator = generate_kg(schema_config)
+    kg_folder, manifest = load_manifest(schema_config)
+
+    assert len(manifest["shards"]) == 4
+    assert manifest["num_triples"] == len(instance_generator.kg)
+    assert sum(shard["num_triples"] for shard in manifest["shards"]) == len(instance_generator.kg)
+    for shard in manifest["shards"]:
+        path = os.path.join(kg_folder, shard["file"])
+        with open(path, "rb") as file:
+            content = file.read()
+        assert shard["size"] == len(content)
+        assert shard["sha256"] == hashlib.sha256(content).hexdigest()
+        # each shard is a standalone, complete gzip file
+        assert gzip.decompress(content)
+
+
+def test_shard_checksums_are_reproducible(schema_config):
+    schema_config.update(num_output_shards=4, output_compression="gzip")
+    generate_kg(schema_config)
+    _, first_manifest = load_manifest(schema_config)
+
+    generate_kg(schema_config)
+    _, second_manifest = load_manifest(schema_config)
+
+    assert [shard["sha256"] for shard in first_manifest["shards"]] == [
+        shard["sha256"] for shard in second_manifest["shards"]
+    ]
@@ -0,0 +1,38 @@
+import json
+from conftest import generate_kg
+
+
+def load_split(directory, name):
+    return {tuple(int(x) for x in line.split("\t")) for line in open(f"{directory}{name}.txt")}
+
+
+def test_split_covers_kg_without_leakage(schema_config):
+    schema_config.update(split_ratios=[0.8, 0.1, 0.1], split_remove_leakage=True)
+    instance_generator = generate_kg(schema_config)
+    directory = f"output/{schema_config['schema_name']}/"
+    splits = {name: load_split(directory, name) for name in ["train", "valid", "test"]}
+
+    assert sum(len(split) for split in splits.values()) == len(instance_generator.kg)
+    assert len(set.union(*splits.values())) == len(instance_generator.kg)
+    assert splits["valid"] and splits["test"]
+
+    train_entities = {e for h, _, t in splits["train"] for e in (h, t)}
+    train_relations = {r for _, r, _ in splits["train"]}
+    for name in ["valid", "test"]:
+        assert {e for h, _, t in splits[name] for e in (h, t)} <= train_entities
+        assert {r for _, r, _ in splits[name]} <= train_relations
+
+    with open(f"{directory}relation_info.json", "r") as file:
+        relation_info = json.load(file)
+    rel2id = {line.split("\t")[1].strip(): int(line.split("\t")[0]) for line in open(f"{directory}relations.tsv")}
+    counterparts = {rel2id[r]: rel2id[r] for r in relation_info["symmetric_relations"]}
+    counterparts.update({rel2id[r]: rel2id[inv_r] for r, inv_r in relation_info["rel2inverse"].items()})
+    assert counterparts
+
+    triple2split = {triple: name for name, split in splits.items() for triple in split}
+    num_counterparts = 0
+    for (h, r, t), name in triple2split.items():
+        if r in counterparts and (t, counterparts[r], h) in triple2split:
+            num_counterparts += 1
+            assert triple2split[(t, counterparts[r], h)] == name
+    assert num_counterparts > 0
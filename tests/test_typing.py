@@ -0,0 +1,67 @@
+import json
+from collections import defaultdict
+from pygraft.kg_generator import InstanceGenerator
+from conftest import generate_kg
+
+SCHEMA = "http://pygraf.t/"
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+
+
+def read_entity_types(rdf_file):
+    """
+    Returns the rdf:type assertions of the entities of an N-Triples file, as a list of classes per entity.
+    """
+    ent2types = defaultdict(list)
+    with open(rdf_file, "r") as file:
+        for line in file:
+            s, p, o = (term[1:-1] for term in line.split()[:3])
+            if p == RDF_TYPE and s.startswith(SCHEMA + "E"):
+                ent2types[s[len(SCHEMA) :]].append(o[len(SCHEMA) :])
+
+    return ent2types
+
+
+def test_types_are_schema_classes(schema_config, monkeypatch):
+    schema_config["multityping"] = False
+    extend_superclasses = InstanceGenerator.extend_superclasses
+
+    def extend_with_disjoint_class(self):
+        extend_superclasses(self)
+        # an entity typed with two disjoint classes, so that check_multityping has to keep only one of them
+        for e, classes in self.ent2classes_specific.items():
+            disjoint_classes = self.class2disjoints_extended.get(classes[0])
+            if disjoint_classes:
+                self.ent2classes_specific[e] = classes + disjoint_classes[:1]
+                self.ent2classes_transitive[e] = self.ent2classes_transitive[e] + disjoint_classes[:1]
+                break
+
+    monkeypatch.setattr(InstanceGenerator, "extend_superclasses", extend_with_disjoint_class)
+    instance_generator = generate_kg(schema_config)
+    directory = f"output/{schema_config['schema_name']}/"
+    with open(f"{directory}class_info.json", "r") as file:
+        classes = set(json.load(file)["classes"])
+
+    assert instance_generator.badly_typed
+    ent2types = read_entity_types(f"{directory}full_graph.nt")
+    assert ent2types
+    for types in ent2types.values():
+        assert len(types) == 1
+        assert set(types) <= classes
+
+
+def test_separate_types_file_types_each_observed_entity_once(schema_config):
+    schema_config["separate_types_file"] = True
+    instance_generator = generate_kg(schema_config)
+    directory = f"output/{schema_config['schema_name']}/"
+
+    assert not read_entity_types(f"{directory}full_graph.nt")
+    ent2types = read_entity_types(f"{directory}types.nt")
+    observed = {e for h, _, t in instance_generator.kg for e in (h, t)}
+    expected = {
+        e: instance_generator.ent2classes_specific[e]
+        for e in observed
+        if instance_generator.ent2classes_specific.get(e)
+    }
+    assert set(ent2types) == set(expected)
+    for e, types in ent2types.items():
+        assert sorted(types) == sorted(expected[e])